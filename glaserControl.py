@@ -0,0 +1,221 @@
+# glaserControl.py       Version  1.0     19-Oct-2026
+#
+# The control-rate engine of theGlaser.  Instead of writing every incoming OSC value to
+# the audio samples right away (which causes zipper noise when position-driven values
+# arrive in bursts), theGlaser hands values to the engine as targets.  The engine keeps
+# the latest target of every (parameter, audio sample) pair - later values simply replace
+# earlier ones - and, on every control tick (e.g. 100 times per second), ramps each audio
+# sample linearly toward its target over the slew time.  So, no matter how fast OSC
+# arrives, each parameter of an audio sample is written at most once per tick (and not at
+# all when its value does not change).
+#
+# Parameters are "volume" (0 - 127), "frequency" (in Hz), and "panning" (0 - 127).
+#
+# Usage:
+#
+#     engine = ControlRateEngine(audioList, rate = 100, slewTime = 50)
+#     engine.setTarget("volume", 0, 127)            # ramp sample 0 to full volume in 50 ms
+#     engine.setTarget("panning", 1, 0, 2000)       # ramp sample 1 to the left in 2 seconds
+#     engine.setValue("volume", 2, 0)               # silence sample 2 right away
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from threading import Thread, Lock
+import time
+
+
+class ControlRateEngine():
+
+   PARAMETERS = ["volume", "frequency", "panning"]
+
+   def __init__(self, audioList, rate = 100, slewTime = 50, tickListener = None):
+
+      self.audioList = audioList      # the audio samples controlled by the engine
+      self.rate = rate                # control ticks per second
+      self.slewTime = slewTime        # default time to reach a new target (in milliseconds)
+      self.tickListener = tickListener   # optional function called after every tick (e.g., a KuatroSoundMapping)
+
+      self.ramps = {}        # maps (parameter, audioIndex) to the ramp toward its target, [startValue, target, startTime, duration]
+      self.current = {}      # maps (parameter, audioIndex) to the value last written to the audio sample
+      self.lock = Lock()
+
+      # counters
+      self.ticks = 0
+      self.writes = 0              # parameter values written to audio samples
+      self.targetsReceived = 0     # targets received (most are superseded before they are reached)
+
+      # setup thread to run the control ticks
+      self.isRunning = True
+      self.engineThread = Thread(target = self.run)
+      self.engineThread.setDaemon(True)
+      self.engineThread.start()
+
+
+   def setTarget(self, parameter, audioIndex, value, slewTime = None):
+      '''Sets the value parameter of audio sample audioIndex should ramp to, in slewTime
+         milliseconds (or the default slew time).  Replaces any earlier target.'''
+
+      if slewTime is None:
+         slewTime = self.slewTime
+
+      key = (parameter, audioIndex)
+      now = time.time()
+
+      self.lock.acquire()
+      try:
+         self.targetsReceived = self.targetsReceived + 1
+
+         ramp = self.ramps.get(key)
+         if ramp and ramp[1] == value and ramp[3] == slewTime / 1000.0:
+            return                                       # already on its way to this target
+
+         startValue = self.__getValue__(key, now)
+         self.ramps[key] = [startValue, value, now, slewTime / 1000.0]
+      finally:
+         self.lock.release()
+
+
+   def setValue(self, parameter, audioIndex, value):
+      '''Writes a parameter of audio sample audioIndex right away (not on the next tick), and
+         cancels its ramp (e.g., to silence an audio sample before it starts playing)'''
+
+      key = (parameter, audioIndex)
+      value = self.__roundValue__(parameter, value)
+
+      self.lock.acquire()
+      try:
+         if key in self.ramps:
+            del self.ramps[key]
+         self.current[key] = value
+      finally:
+         self.lock.release()
+
+      self.__writeParameter__(self.audioList[audioIndex], parameter, value)
+      self.writes = self.writes + 1
+
+
+   def setTargets(self, parameter, values, slewTime = None):
+      '''Sets many targets of one parameter; values maps an audio sample index to its target'''
+
+      for audioIndex, value in values.items():
+         self.setTarget(parameter, audioIndex, value, slewTime)
+
+
+   def getTarget(self, parameter, audioIndex):
+      '''Returns the target of a parameter (or its current value, if it has no target)'''
+
+      key = (parameter, audioIndex)
+
+      self.lock.acquire()
+      try:
+         if key in self.ramps:
+            return self.ramps[key][1]
+         return self.__getValue__(key, time.time())
+      finally:
+         self.lock.release()
+
+
+   def tick(self):
+      '''Moves every ramping parameter one step closer to its target (one write per parameter per audio sample)'''
+
+      now = time.time()
+      writes = []
+
+      self.lock.acquire()
+      try:
+         for key, ramp in self.ramps.items():
+            value = self.__getValue__(key, now)
+
+            if now >= ramp[2] + ramp[3]:   # target reached
+               del self.ramps[key]
+
+            value = self.__roundValue__(key[0], value)
+            if self.current.get(key) != value:
+               self.current[key] = value
+               writes.append((key, value))
+      finally:
+         self.lock.release()
+
+      for (parameter, audioIndex), value in writes:
+         self.__writeParameter__(self.audioList[audioIndex], parameter, value)
+
+      self.ticks = self.ticks + 1
+      self.writes = self.writes + len(writes)
+
+      if self.tickListener:
+         try:
+            self.tickListener()
+         except Exception, e:          # (a failing listener must not stop the writes of later ticks)
+            print "Error in control tick listener"
+            print e
+
+
+   def run(self):
+      '''Runs the control ticks (via a seperate thread)'''
+
+      delay = 1.0 / self.rate
+      nextTick = time.time() + delay
+
+      while self.isRunning:
+         time.sleep(max(0, nextTick - time.time()))
+         nextTick = max(nextTick + delay, time.time())   # do not try to catch up on ticks missed while busy
+
+         try:
+            self.tick()
+         except Exception, e:          # (keep ticking; e.g., a bad value written to an audio sample)
+            print "Error in control tick"
+            print e
+
+
+   def stop(self):
+      '''Stops the control ticks'''
+
+      self.isRunning = False
+
+
+   def __getValue__(self, key, now):
+      '''Returns the value of a parameter at time now (somewhere on its ramp)'''
+
+      ramp = self.ramps.get(key)
+
+      if ramp is None:     # not ramping, so it is where we last put it (or where the audio sample says it is)
+         if key not in self.current:
+            self.current[key] = self.__readParameter__(self.audioList[key[1]], key[0])
+         return self.current[key]
+
+      startValue, target, startTime, duration = ramp
+      if duration <= 0 or now >= startTime + duration:
+         return target
+
+      return startValue + (target - startValue) * (now - startTime) / duration
+
+
+   def __roundValue__(self, parameter, value):
+      '''Volume and panning are integers; frequency is not'''
+
+      if parameter == "frequency":
+         return float(value)
+      return int(round(value))
+
+
+   def __readParameter__(self, audioSample, parameter):
+      '''Returns the current value of a parameter of an audio sample'''
+
+      if parameter == "volume":
+         return audioSample.getVolume()
+      elif parameter == "frequency":
+         return audioSample.getFrequency()
+      elif parameter == "panning":
+         return audioSample.getPanning()
+
+
+   def __writeParameter__(self, audioSample, parameter, value):
+      '''Writes a parameter of an audio sample'''
+
+      if parameter == "volume":
+         audioSample.setVolume(value)
+      elif parameter == "frequency":
+         audioSample.setFrequency(value)
+      elif parameter == "panning":
+         audioSample.setPanning(value)
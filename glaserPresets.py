@@ -0,0 +1,110 @@
+# glaserPresets.py       Version  1.0     19-Oct-2026
+#
+# Mixer presets of theGlaser.  A preset is a snapshot of every fader (volume, frequency and
+# panning of every audio sample) and of the transport state of every audio sample ("stopped",
+# "playing", "looping", or "paused").  Presets are kept by name in a PresetBank, which may be
+# stored in a file (with pickle), so that the presets of an installation survive a restart.
+#
+# theGlaser recalls a preset by morphing to it, i.e. the control-rate engine ramps every
+# parameter from its current value to the preset value over the morph time (see theGlaser.py,
+# /glaser/morph).
+#
+# A preset is a plain dictionary, so preset files do not depend on the code that wrote them:
+#
+#     {"volume" : [v1, v2, ...], "frequency" : [f1, f2, ...], "panning" : [p1, p2, ...],
+#      "transport" : ["looping", "stopped", ...]}
+#
+# Usage:
+#
+#     presets = PresetBank("installation.presets.p")
+#     presets.save("intro", preset)
+#     preset = presets.get("intro")
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from threading import Lock
+import pickle
+import os
+
+TRANSPORT_STATES = ["stopped", "playing", "looping", "paused"]
+
+
+class PresetBank():
+   '''Keeps mixer presets by name, and (optionally) stores them in a file'''
+
+   def __init__(self, filename = None):
+
+      self.filename = filename     # file the presets are stored in (None keeps them in memory only)
+      self.presets = {}            # maps a preset name to its preset
+      self.lock = Lock()
+
+      if self.filename and os.path.exists(self.filename):
+         self.load()
+
+
+   def save(self, name, preset):
+      '''Saves preset under name (replacing any earlier preset with that name), and stores the bank'''
+
+      self.lock.acquire()
+      try:
+         self.presets[str(name)] = preset
+      finally:
+         self.lock.release()
+
+      if self.filename:
+         self.store()
+
+
+   def get(self, name):
+      '''Returns the preset saved under name (or None)'''
+
+      return self.presets.get(str(name))
+
+
+   def getNames(self):
+      '''Returns the names of all presets, sorted'''
+
+      names = self.presets.keys()
+      names.sort()
+      return names
+
+
+   def remove(self, name):
+      '''Removes the preset saved under name, and stores the bank'''
+
+      self.lock.acquire()
+      try:
+         if str(name) in self.presets:
+            del self.presets[str(name)]
+      finally:
+         self.lock.release()
+
+      if self.filename:
+         self.store()
+
+
+   def load(self):
+      '''Reads the presets from the file'''
+
+      presetFile = open(self.filename, "rb")
+      try:
+         self.presets = pickle.load(presetFile)
+      finally:
+         presetFile.close()
+
+      print "Loaded", len(self.presets), "presets from", self.filename
+
+
+   def store(self):
+      '''Writes the presets to the file'''
+
+      self.lock.acquire()
+      try:
+         presetFile = open(self.filename, "wb")
+         try:
+            pickle.dump(self.presets, presetFile)
+         finally:
+            presetFile.close()
+      finally:
+         self.lock.release()
@@ -0,0 +1,293 @@
+# glaserSamples.py       Version  1.0     19-Oct-2026
+#
+# Lazy loading of the audio samples of theGlaser.  Creating an AudioSample decodes the whole
+# audio file, so building every AudioSample up front makes startup wait on decoding all of
+# them, and keeps all of them in memory.  Instead, theGlaser may be given sample descriptors
+# (a SampleDescriptor, or simply a filename).  Each descriptor becomes a LazyAudioSample,
+# which behaves like an AudioSample but only decodes its file when it is first played or
+# looped (or when asked to prefetch).
+#
+# Decoded samples are kept in a SampleCache, which has a memory cap.  When decoding another
+# sample would go over the cap, the least recently used samples are released - except the
+# ones that are playing (or paused), or being started, which are never evicted.  A released
+# sample is stopped, keeps its volume, frequency and panning, and is decoded again the next
+# time it is needed.
+#
+# Usage:
+#
+#     cache = SampleCache(256 * 1024 * 1024)      # 256 MB
+#     sample = LazyAudioSample(SampleDescriptor("sounds/state0_mix_loop.wav"), cache)
+#     sample.prefetch()                           # optional, decodes in the background
+#     sample.loop()
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from music import AudioSample, A4
+from threading import Thread, Lock
+import os
+
+
+class SampleDescriptor():
+   '''Describes an audio sample without decoding it (the arguments are those of AudioSample)'''
+
+   def __init__(self, filename, actualPitch = A4, volume = 127, voices = 1):
+
+      self.filename = filename
+      self.actualPitch = actualPitch   # MIDI pitch (0 - 127) or frequency (in Hz) of the recorded sound
+      self.volume = volume
+      self.voices = voices             # more than 1 makes theGlaser preload a VoicePool (see glaserVoices.py)
+
+
+class SampleCache():
+   '''Keeps decoded audio samples, up to maxBytes, and evicts the least recently used ones'''
+
+   DECODED_BYTES_PER_FILE_BYTE = 2.0   # estimate of decoded size (16-bit audio files are decoded to 32-bit samples)
+
+   def __init__(self, maxBytes = 256 * 1024 * 1024):
+
+      self.maxBytes = maxBytes     # memory cap of the decoded samples (estimated)
+      self.entries = []            # LazyAudioSamples currently decoded, least recently used first
+      self.usedBytes = 0
+      self.lock = Lock()
+
+      # counters
+      self.hits = 0                # samples needed that were already decoded
+      self.misses = 0              # samples that had to be decoded
+      self.evictions = 0           # samples released to stay under the memory cap
+
+
+   def estimateSize(self, filename):
+      '''Returns the estimated memory used by the decoded audio file'''
+
+      try:
+         return int(os.path.getsize(filename) * SampleCache.DECODED_BYTES_PER_FILE_BYTE)
+      except OSError:
+         return 0
+
+
+   def touch(self, sample):
+      '''Marks sample as the most recently used one.  Returns True if it is decoded.'''
+
+      self.lock.acquire()
+      try:
+         if sample in self.entries:
+            self.entries.remove(sample)
+            self.entries.append(sample)
+            self.hits = self.hits + 1
+            return True
+         return False
+      finally:
+         self.lock.release()
+
+
+   def pin(self, sample):
+      '''Keeps sample from being evicted (while it is being started), until it is unpinned'''
+
+      self.lock.acquire()
+      try:
+         sample.pins = sample.pins + 1
+      finally:
+         self.lock.release()
+
+
+   def unpin(self, sample):
+
+      self.lock.acquire()
+      try:
+         sample.pins = sample.pins - 1
+      finally:
+         self.lock.release()
+
+
+   def add(self, sample):
+      '''Adds a newly decoded sample, and releases least recently used samples until the
+         cache is under its memory cap again (or only playing samples are left)'''
+
+      self.lock.acquire()
+      try:
+         self.misses = self.misses + 1
+         self.entries.append(sample)
+         self.usedBytes = self.usedBytes + sample.sizeBytes
+
+         for candidate in self.entries[:]:        # least recently used first
+            if self.usedBytes <= self.maxBytes:
+               break
+            if candidate is sample or candidate.isInUse():
+               continue                             # never evict a playing sample (or one being started)
+            self.entries.remove(candidate)
+            self.usedBytes = self.usedBytes - candidate.sizeBytes
+            self.evictions = self.evictions + 1
+            candidate.release()                     # (under the lock, so it can not be pinned and started meanwhile)
+
+         overCap = self.usedBytes > self.maxBytes
+      finally:
+         self.lock.release()
+
+      if overCap:
+         print "Sample cache is over its cap (" + str(self.usedBytes) + " bytes); all other samples are playing"
+
+
+   def getStats(self):
+      '''Returns a dictionary with the cache counters'''
+
+      return {"samples" : len(self.entries), "usedBytes" : self.usedBytes, "maxBytes" : self.maxBytes,
+              "hits" : self.hits, "misses" : self.misses, "evictions" : self.evictions}
+
+
+class LazyAudioSample():
+   '''An AudioSample that is decoded on first use, and may be released by its SampleCache when it is not playing'''
+
+   def __init__(self, descriptor, cache):
+
+      if isinstance(descriptor, basestring):     # a filename is the simplest descriptor
+         descriptor = SampleDescriptor(descriptor)
+
+      self.descriptor = descriptor
+      self.cache = cache
+      self.sizeBytes = cache.estimateSize(descriptor.filename)
+
+      self.audioSample = None      # the decoded AudioSample (None while not decoded)
+      self.paused = False          # paused samples are not evicted either (they would lose their position)
+      self.pins = 0                # threads starting the sample (pinned samples are not evicted, see SampleCache.pin)
+      self.loadLock = Lock()
+
+      # parameters are kept here, so they survive a release (and can be set before decoding)
+      self.volume = descriptor.volume
+      self.frequency = self.__pitchToFrequency__(descriptor.actualPitch)
+      self.panning = 63            # center
+
+
+   ###### Loading ######
+
+   def load(self):
+      '''Decodes the audio file (if not decoded already) and returns the AudioSample'''
+
+      audioSample = self.audioSample
+      if audioSample is not None and self.cache.touch(self):
+         return audioSample
+
+      decoded = False
+
+      self.loadLock.acquire()      # only one thread decodes the file
+      try:
+         if self.audioSample is None:
+            audioSample = AudioSample(self.descriptor.filename, self.descriptor.actualPitch, self.volume)
+            audioSample.setFrequency(self.frequency)
+            audioSample.setPanning(self.panning)
+            self.audioSample = audioSample
+            decoded = True
+         audioSample = self.audioSample
+      finally:
+         self.loadLock.release()
+
+      if decoded:
+         self.cache.add(self)      # (outside the lock, since adding may release other samples)
+
+      return audioSample
+
+
+   def prefetch(self):
+      '''Decodes the audio file in the background, so that the first play starts without delay'''
+
+      if self.audioSample is None:
+         thread = Thread(target = self.load)
+         thread.setDaemon(True)
+         thread.start()
+
+
+   def release(self):
+      '''Stops and releases the decoded AudioSample (called by the SampleCache)'''
+
+      audioSample = self.audioSample
+      self.audioSample = None
+      if audioSample is not None:
+         audioSample.stop()        # (so no sound is left playing that stop() could not reach)
+
+
+   def isLoaded(self):
+      return self.audioSample is not None
+
+
+   def isInUse(self):
+      '''Returns True if the sample is playing (or paused), i.e. must not be released'''
+
+      if self.pins > 0:
+         return True
+      audioSample = self.audioSample
+      return audioSample is not None and (self.paused or audioSample.isPlaying())
+
+
+   ###### AudioSample methods ######
+
+   def start(self, action):
+      '''Decodes the sample (if needed) and calls action with the AudioSample, e.g. to play it.  The sample is
+         pinned from before it is decoded until it is playing, so it can not be evicted in between.'''
+
+      self.cache.pin(self)
+      try:
+         action(self.load())
+      finally:
+         self.cache.unpin(self)
+
+   def play(self):
+      self.paused = False
+      self.start(lambda audioSample: audioSample.play())
+
+   def loop(self):
+      self.paused = False
+      self.start(lambda audioSample: audioSample.loop())
+
+   def stop(self):
+      self.paused = False
+      if self.audioSample is not None:
+         self.audioSample.stop()
+
+   def pause(self):
+      if self.audioSample is not None:
+         self.audioSample.pause()
+         self.paused = True
+
+   def resume(self):
+      if self.paused:
+         self.start(lambda audioSample: audioSample.resume())
+         self.paused = False       # (only now, so it is not evicted before it resumes)
+
+   def isPlaying(self):
+      audioSample = self.audioSample
+      return audioSample is not None and audioSample.isPlaying()
+
+   def setVolume(self, volume):
+      self.volume = volume
+      audioSample = self.audioSample
+      if audioSample is not None:
+         audioSample.setVolume(volume)
+
+   def getVolume(self):
+      return self.volume
+
+   def setFrequency(self, frequency):
+      self.frequency = frequency
+      audioSample = self.audioSample
+      if audioSample is not None:
+         audioSample.setFrequency(frequency)
+
+   def getFrequency(self):
+      return self.frequency
+
+   def setPanning(self, panning):
+      self.panning = panning
+      audioSample = self.audioSample
+      if audioSample is not None:
+         audioSample.setPanning(panning)
+
+   def getPanning(self):
+      return self.panning
+
+
+   def __pitchToFrequency__(self, actualPitch):
+      '''Returns the frequency (in Hz) of a MIDI pitch (an int); frequencies (floats) are returned as they are'''
+
+      if isinstance(actualPitch, int):
+         return 440.0 * 2 ** ((actualPitch - 69) / 12.0)
+      return float(actualPitch)
@@ -0,0 +1,151 @@
+# glaserVoices.py       Version  1.0     19-Oct-2026
+#
+# Polyphonic one-shot sounds for theGlaser.  An AudioSample plays one sound at a time, so
+# re-triggering a short sound (e.g., a button sound, when many visitors press buttons at once)
+# cuts off the sound that is playing.  A VoicePool decodes the same audio file into several
+# AudioSamples (voices) at startup, and every trigger plays the next voice in round-robin order.
+# Since the voices are triggered in turn, the next voice is always the one triggered longest
+# ago, i.e. either a free voice or the oldest one playing - found in constant time.
+#
+# A VoicePool behaves like an AudioSample (volume, frequency and panning apply to all its
+# voices), so theGlaser and its control-rate engine treat it like any other audio sample.
+#
+# Every trigger may carry the time its OSC message arrived, and the pool keeps the latency
+# from arrival to audio start (the return of AudioSample.play()) of the most recent triggers.
+#
+# Usage:
+#
+#     pool = VoicePool(SampleDescriptor("sounds/button_sound.wav", voices = 4))
+#     pool.play(time.time())
+#     print pool.getLatencyStats()
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from music import AudioSample
+from threading import Lock
+import array
+import time
+
+
+class VoicePool():
+   '''Several preloaded voices of one audio file, triggered in round-robin order (the next voice is free, or the oldest)'''
+
+   LATENCY_HISTORY = 1000   # number of recent trigger latencies kept
+
+   def __init__(self, descriptor):
+
+      self.descriptor = descriptor
+
+      # preload the voices (so that a trigger never waits on decoding)
+      self.voices = []
+      for i in range(max(1, descriptor.voices)):
+         self.voices.append(AudioSample(descriptor.filename, descriptor.actualPitch, descriptor.volume))
+
+      self.nextVoice = 0        # index of the voice the next trigger plays (triggered longest ago)
+      self.pausedVoices = []    # voices paused by pause() (resumed by resume())
+      self.lock = Lock()
+
+      # latencies of the most recent triggers (in milliseconds), kept in a ring buffer
+      self.latencies = array.array('d', [0.0] * VoicePool.LATENCY_HISTORY)
+      self.latencyCount = 0     # triggers with a latency measured (the ring buffer holds the last LATENCY_HISTORY)
+
+      # counters
+      self.triggers = 0
+      self.stolenVoices = 0     # triggers that cut off the oldest voice (because all voices were playing)
+
+
+   def play(self, triggerTime = None):
+      '''Plays the next voice (free, or the oldest); triggerTime is the time (time.time()) the trigger arrived'''
+
+      self.lock.acquire()
+      try:
+         voice = self.voices[self.nextVoice]
+         self.nextVoice = (self.nextVoice + 1) % len(self.voices)
+         self.triggers = self.triggers + 1
+      finally:
+         self.lock.release()
+
+      if voice.isPlaying():
+         self.stolenVoices = self.stolenVoices + 1
+         voice.stop()
+
+      voice.play()
+
+      if triggerTime is not None:
+         latency = (time.time() - triggerTime) * 1000
+         self.lock.acquire()
+         try:
+            self.latencies[self.latencyCount % VoicePool.LATENCY_HISTORY] = latency
+            self.latencyCount = self.latencyCount + 1
+         finally:
+            self.lock.release()
+
+
+   def getLatencyStats(self):
+      '''Returns a dictionary with the median, 95th and 99th percentile, and maximum latency (in milliseconds)
+         of the most recent triggers'''
+
+      self.lock.acquire()
+      try:
+         latencies = list(self.latencies[0 : min(self.latencyCount, VoicePool.LATENCY_HISTORY)])
+      finally:
+         self.lock.release()
+
+      stats = {"triggers" : self.triggers, "stolenVoices" : self.stolenVoices, "measured" : len(latencies)}
+
+      if latencies:
+         latencies.sort()
+         stats["p50"] = latencies[int(len(latencies) * 0.50)]
+         stats["p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+         stats["p99"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+         stats["max"] = latencies[-1]
+
+      return stats
+
+
+   ###### AudioSample methods (applied to all voices) ######
+
+   def loop(self):
+      self.voices[0].loop()
+
+   def stop(self):
+      for voice in self.voices:
+         voice.stop()
+
+   def pause(self):
+      self.pausedVoices = [voice for voice in self.voices if voice.isPlaying()]
+      for voice in self.pausedVoices:
+         voice.pause()
+
+   def resume(self):
+      for voice in self.pausedVoices:
+         voice.resume()
+      self.pausedVoices = []
+
+   def isPlaying(self):
+      for voice in self.voices:
+         if voice.isPlaying():
+            return True
+      return False
+
+   def setVolume(self, volume):
+      for voice in self.voices:
+         voice.setVolume(volume)
+
+   def getVolume(self):
+      return self.voices[0].getVolume()
+
+   def setFrequency(self, frequency):
+      for voice in self.voices:
+         voice.setFrequency(frequency)
+
+   def getFrequency(self):
+      return self.voices[0].getFrequency()
+
+   def setPanning(self, panning):
+      for voice in self.voices:
+         voice.setPanning(panning)
+
+   def getPanning(self):
+      return self.voices[0].getPanning()
@@ -5,12 +5,29 @@
 # from the Kuatro Server and displays the users and their positions as 
 # circles on a display Window.
 #
+#   LOG:
+#     19-Oct-2026:  Messages go through a transport (see kuatroTransport.py), OSC over UDP by default.
+#     19-Oct-2026:  Views may ask for skeleton joints when they register (see kuatroJoints.py).
+#     19-Oct-2026:  Views may ask for the occupancy map when they register (see kuatroOccupancy.py).
+#     19-Oct-2026:  Views may ask for coordinates at a fixed output rate (resampled by the server, see kuatroResampler.py).
+#     19-Oct-2026:  Views keep their clock aligned with the server's, and measure the latency of coordinates (see kuatroLatency.py).
+#     19-Oct-2026:  Views may ask the server spatial queries, once or as standing queries (see kuatroSpatial.py).
+#     19-Oct-2026:  Views may ask the server for the motion and trajectories of users (see kuatroTrajectory.py).
+#
 #   See README file for full instructions on using the Kuatro System
 
 from gui import *
 from osc import OscIn, OscOut 
+from timer import Timer
+from kuatroReliable import ReliableEndpoint
+from kuatroDispatcher import KuatroDispatcher
+from kuatroTransport import OscTransport
+from kuatroJoints import jointMask, jointNames
+from kuatroOccupancy import OccupancyGrid
+from kuatroLatency import ClockSync, LatencyStats
 import socket
 import sys
+import time
 
 
 class KuatroBasicView():
@@ -19,24 +36,102 @@ class KuatroBasicView():
    NEW_USER_MESSAGE = "/kuatro/newUser"
    LOST_USER_MESSAGE = "/kuatro/lostUser"
    USER_COORDINATES_MESSAGE = "/kuatro/userCoordinates"
+   USER_JOINTS_MESSAGE = "/kuatro/userJoints"
+   OCCUPANCY_MAP_MESSAGE = "/kuatro/occupancyMap"
    REGISTER_VIEW_MESSAGE = "/kuatro/registerView"
-
-   def __init__(self, incomingPort = 60606, kuatroServerIP = "localhost", kuatroServerOscPort = 50505):
+   REQUEST_SNAPSHOT_MESSAGE = "/kuatro/requestSnapshot"
+   WORLD_SNAPSHOT_MESSAGE = "/kuatro/worldSnapshot"
+   VIEW_HEARTBEAT_MESSAGE = "/kuatro/viewHeartbeat"
+   UNREGISTER_VIEW_MESSAGE = "/kuatro/unregisterView"
+   QUERY_RADIUS_MESSAGE = "/kuatro/queryRadius"
+   QUERY_NEAREST_MESSAGE = "/kuatro/queryNearest"
+   QUERY_RECT_MESSAGE = "/kuatro/queryRect"
+   ADD_STANDING_QUERY_MESSAGE = "/kuatro/addStandingQuery"
+   REMOVE_STANDING_QUERY_MESSAGE = "/kuatro/removeStandingQuery"
+   QUERY_RESULT_MESSAGE = "/kuatro/queryResult"
+   QUERY_MOTION_MESSAGE = "/kuatro/queryMotion"
+   QUERY_TRAJECTORY_MESSAGE = "/kuatro/queryTrajectory"
+   USER_MOTION_MESSAGE = "/kuatro/userMotion"
+   TRAJECTORY_MESSAGE = "/kuatro/trajectory"
+
+   HEARTBEAT_INTERVAL = 1000   # milliseconds between heartbeats (see KuatroServer.HEARTBEAT_INTERVAL)
+   RESYNC_DELAY = 1.0   # seconds a view waits for a missing new / lost user message before asking for a snapshot
+
+   def __init__(self, incomingPort = 60606, kuatroServerIP = "localhost", kuatroServerOscPort = 50505, echo = True, transport = None,
+                joints = None, occupancy = False, outputRate = 0):
 
 
       self.circleRadius = 30               # how wide user circles are (in pixels) 
       self.circleColor  = Color.YELLOW     # and its color
 
 
+      ########## Create Display ############
+      self.display = Display("Kuatro View", 1000, 750, 0, 0, Color(50,50,50))  # create the display with a Gray Background
+
+
+      ##### Setup User Data Structures #########
+      self.currentUsers = []
+      self.currentUserCircles = []
+      self.currentUserCoordinates = []
+
+      # the skeleton joints this view asks the server for (e.g., ["head", "leftHand", "rightHand"]); none by default,
+      # so views that only need the users' positions do not receive (and parse) joints
+      self.jointMask = jointMask(joints or [])
+      self.userJoints = {}          # maps a userID to a dictionary of its joints, {jointName : (x, y, z)}
+
+      # whether this view asks the server for the occupancy map (where people are, not just their center of mass)
+      self.occupancy = occupancy
+      self.occupancyMap = None      # the latest OccupancyGrid from the server (None until the first one arrives)
+
+      # coordinate messages per second this view asks the server for (e.g., 60, the display's frame rate); the server
+      # then sends evenly spaced, interpolated coordinates.  0 (default) gets coordinates as the sensors deliver them.
+      self.outputRate = outputRate
+
+
+      # ipAddress = socket.gethostbyname(socket.getfqdn())   # find the computer's IP Address
+      ipAddress = "localhost"
+
+      self.ipAddress = ipAddress
+      self.incomingPort = incomingPort
+
+      if transport is None:   # OSC over UDP, unless all components share an in-memory transport
+         transport = OscTransport()
+      self.transport = transport
+
+      # world sequence numbers (see KuatroServer.sendSnapshot) are used to detect missed new / lost user messages
+      self.worldSeq = None          # unknown until the first snapshot arrives
+      self.behindSince = None       # time coordinates first showed a newer world sequence number than ours
+      self.lastResyncRequest = 0    # time of the last snapshot request
+      self.snapshotUsers = []       # IDs of the users in the snapshot being received
+
+      # spatial queries to the server (see kuatroSpatial.py)
+      self.nextQueryID = 0
+      self.queryResults = {}        # maps a queryID to its latest result, e.g. [(userID, x, y), ...] (standing queries are updated by the server)
+      self.queryParts = {}          # maps a queryID to the part of its result received so far
+
+
       ######### Server-to-View API ############
       try:
          print "Trying on port:", incomingPort
-         oscIn = OscIn(incomingPort)
-
-         oscIn.onInput("/.*", self.echoMessage)
-         oscIn.onInput(KuatroBasicView.NEW_USER_MESSAGE, self.addUser)
-         oscIn.onInput(KuatroBasicView.LOST_USER_MESSAGE, self.removeUser)
-         oscIn.onInput(KuatroBasicView.USER_COORDINATES_MESSAGE, self.moveUser)
+         oscIn = self.transport.createIn(incomingPort)
+         self.dispatcher = KuatroDispatcher(oscIn)   # routes each message through one hash lookup
+
+         # new and lost user messages arrive reliably (acknowledged back to the server)
+         self.endpoint = ReliableEndpoint(self.dispatcher, ipAddress, incomingPort, transport = self.transport)
+
+         if echo:   # print every incoming message
+            self.dispatcher.onAnyInput(self.echoMessage)
+         self.endpoint.onInput(KuatroBasicView.NEW_USER_MESSAGE, self.addUser)
+         self.endpoint.onInput(KuatroBasicView.LOST_USER_MESSAGE, self.removeUser)
+         self.endpoint.onInput(KuatroBasicView.WORLD_SNAPSHOT_MESSAGE, self.applySnapshot)
+         self.endpoint.onInput(KuatroBasicView.QUERY_RESULT_MESSAGE, self.receiveQueryResult)
+         self.endpoint.onInput(KuatroBasicView.USER_MOTION_MESSAGE, self.receiveUserMotion)
+         self.endpoint.onInput(KuatroBasicView.TRAJECTORY_MESSAGE, self.receiveTrajectory)
+         self.dispatcher.onInput(KuatroBasicView.USER_COORDINATES_MESSAGE, self.moveUser)
+         if self.jointMask:
+            self.dispatcher.onInput(KuatroBasicView.USER_JOINTS_MESSAGE, self.moveUserJoints)
+         if self.occupancy:
+            self.dispatcher.onInput(KuatroBasicView.OCCUPANCY_MAP_MESSAGE, self.updateOccupancyMap)
 
       except:
          print "Error:  Unable to setup OSC In port. Port may already be in use."
@@ -44,31 +139,27 @@ class KuatroBasicView():
 
       ####### Register View with Server ######
 
-      # ipAddress = socket.gethostbyname(socket.getfqdn())   # find the computer's IP Address
-      ipAddress = "localhost"
-
       # Setup OSC Out and send the message
       try:
-         oscOut = OscOut(kuatroServerIP, kuatroServerOscPort)           # configure OSC Out port and add to list of ports
+         self.oscOut = self.endpoint.createOut(kuatroServerIP, kuatroServerOscPort)   # configure OSC Out port and add to list of ports
          print "OSC Out Configured.  Sending messages to", kuatroServerIP, "on", kuatroServerOscPort
 
-         oscOut.sendMessage(KuatroBasicView.REGISTER_VIEW_MESSAGE, ipAddress, incomingPort)         # send osc message through osc port
+         # keep this view's clock aligned with the server's, to measure the latency of coordinates (see kuatroLatency.py)
+         # (before registering, since the server only sends coordinates to registered views)
+         self.clock = ClockSync(self.dispatcher, self.oscOut, ipAddress, incomingPort)
+         self.latencyStats = LatencyStats(["toView", "render", "endToEnd"])
+
+         self.oscOut.sendReliable(KuatroBasicView.REGISTER_VIEW_MESSAGE, ipAddress, incomingPort, self.jointMask, int(self.occupancy), self.outputRate)         # send osc message through osc port (retransmitted until the server acks)
          print "\nSent message to:", kuatroServerIP
-         print "  Data:", ipAddress, incomingPort
+         print "  Data:", ipAddress, incomingPort, self.jointMask, int(self.occupancy), self.outputRate
 
       except Exception, e:
          print e
          sys.exit(1)
 
-
-      ########## Create Display ############
-      self.display = Display("Kuatro View", 1000, 750, 0, 0, Color(50,50,50))  # create the display with a Gray Background
-
-
-      ##### Setup User Data Structures #########
-      self.currentUsers = []
-      self.currentUserCircles = []
-      self.currentUserCoordinates = []
+      # let the server know this view is alive (otherwise it stops sending to it after a while)
+      self.heartbeatTimer = Timer(KuatroBasicView.HEARTBEAT_INTERVAL, self.sendHeartbeat)
+      self.heartbeatTimer.start()
 
 
 
@@ -102,16 +193,10 @@ class KuatroBasicView():
       y = args[2]
       z = args[3]
 
-      # add user to user data structure
-      if userID not in self.currentUsers: # first check to make sure userID doesn't already exist (we don't want duplicates)
-
-         self.currentUsers.append(userID)
-         self.currentUserCoordinates.append([x,y,z])
-
-         userCircle = self.display.drawCircle(x, y, self.circleRadius, self.circleColor, True)  # add the new user to the display
-         self.currentUserCircles.append(userCircle)
+      if len(args) > 4 and not self.checkWorldSeq(args[4]):   # ignore events already included in the last snapshot
+         return
 
-         print "Added User:", userID, "Location:", x, y, z
+      self.showUser(userID, x, y, z)
 
 
    def removeUser(self, message):
@@ -121,22 +206,17 @@ class KuatroBasicView():
       args = message.getArguments()
       userID = args[0]
 
-      # remove user from user data structure
-      if userID in self.currentUsers:  # first check to make sure userID exists
-
-         userIndex = self.currentUsers.index(userID)  # find the index of the current user
-         self.currentUsers.pop(userIndex)
-         self.currentUserCoordinates.pop(userIndex)
-
-         userCircle = self.currentUserCircles.pop(userIndex) # get the user circle
-         self.display.remove(userCircle)                    # and remove it
+      if len(args) > 1 and not self.checkWorldSeq(args[1]):   # ignore events already included in the last snapshot
+         return
 
-         print "Removed User:", userID
+      self.hideUser(userID)
 
 
    def moveUser(self, message):
       ''' Callback function for USER COORDINATES message.  Moves the specified user on the display '''
 
+      receiveTime = self.clock.serverTime()
+
       # parse arguments from the OSC Message.
       args = message.getArguments()
       userID = args[0]
@@ -144,6 +224,9 @@ class KuatroBasicView():
       y = args[2]
       z = args[3]
 
+      if len(args) > 4:
+         self.checkCoordinatesSeq(args[4])
+
       # move user and update data structure
       if userID in self.currentUsers: # first check to make sure userID exists
 
@@ -152,9 +235,300 @@ class KuatroBasicView():
          self.display.move(userCircle, x, y)             # now move it
          self.currentUserCoordinates[userIndex] = [x, y, z] # and update the user coordinates
 
+         if len(args) > 7 and self.clock.isSynchronized():  # coordinates stamped with frameID, captureTime, sendTime (see kuatroLatency.py)
+            renderTime = self.clock.serverTime()
+            self.latencyStats.add("toView", receiveTime - args[7])
+            self.latencyStats.add("render", renderTime - receiveTime)
+            self.latencyStats.add("endToEnd", renderTime - args[6])
+
          print "Moved User:", userID, "Location:", x, y, z
 
 
+   def moveUserJoints(self, message):
+      ''' Callback function for USER JOINTS messages.  Updates the joints of the users in the message
+          (see kuatroJoints.py for the format) '''
+
+      # parse arguments from the OSC Message.
+      args = message.getArguments()
+      mask = args[0]
+      n = args[1]
+
+      names = jointNames(mask)
+
+      i = 2
+      for u in range(n):
+         userID = args[i]
+         if userID in self.currentUsers:   # first check to make sure userID exists
+            joints = self.userJoints.setdefault(userID, {})
+            for j in range(len(names)):
+               k = i + 1 + j * 3
+               joints[names[j]] = (args[k], args[k + 1], args[k + 2])
+         i = i + 1 + len(names) * 3        # each user takes 1 + 3 * joints arguments
+
+      if len(args) > i:
+         self.checkCoordinatesSeq(args[i])
+
+
+   def updateOccupancyMap(self, message):
+      ''' Callback function for OCCUPANCY MAP messages.  Replaces the occupancy map with the one in the
+          message (see kuatroOccupancy.py for the format) '''
+
+      # parse arguments from the OSC Message.
+      args = list(message.getArguments())
+      width = args[0]
+      height = args[1]
+
+      if self.occupancyMap is None or (self.occupancyMap.width, self.occupancyMap.height) != (width, height):
+         self.occupancyMap = OccupancyGrid(width, height)
+      self.occupancyMap.decode(args[2:-1])
+
+      self.checkCoordinatesSeq(args[-1])
+
+
+   def receiveQueryResult(self, message):
+      ''' Callback function for QUERY RESULT messages.  Keeps the result of a query, [(userID, x, y), ...]
+          (see kuatroSpatial.py for the format) '''
+
+      self.collectQueryResult(message, 3)   # each user takes 3 arguments: userID, x, y
+
+
+   def receiveUserMotion(self, message):
+      ''' Callback function for USER MOTION messages.  Keeps the result of a motion query,
+          [(userID, vx, vy, speed, heading), ...] (see kuatroTrajectory.py for the format) '''
+
+      self.collectQueryResult(message, 5)   # each user takes 5 arguments: userID, vx, vy, speed, heading
+
+
+   def receiveTrajectory(self, message):
+      ''' Callback function for TRAJECTORY messages.  Keeps the result of a trajectory query,
+          [(age, x, y), ...], oldest first (see kuatroTrajectory.py for the format) '''
+
+      self.collectQueryResult(message, 3)   # each position takes 3 arguments: age, x, y
+
+
+   def collectQueryResult(self, message, size):
+      ''' Collects the parts of the answer to a query (each containing queryID, part, parts, and tuples of
+          size arguments), and keeps the answer in queryResults once all its parts arrived '''
+
+      # parse arguments from the OSC Message.
+      args = list(message.getArguments())
+      queryID = args[0]
+      part = args[1]
+      parts = args[2]
+
+      if part == 0:               # first part of a new result
+         self.queryParts[queryID] = []
+
+      items = self.queryParts.setdefault(queryID, [])
+      for i in range(3, len(args), size):
+         items.append(tuple(args[i:i+size]))
+
+      if part == parts - 1:       # last part, so the result is complete
+         self.queryResults[queryID] = self.queryParts.pop(queryID)
+
+
+   def applySnapshot(self, message):
+      ''' Callback function for WORLD SNAPSHOT messages.  Replaces the users on the display
+          with the users in the snapshot (see KuatroServer.sendSnapshot for the format) '''
+
+      # parse arguments from the OSC Message.
+      args = list(message.getArguments())
+      seq = args[0]
+      part = args[1]
+      parts = args[2]
+
+      if part == 0:               # first part of a new snapshot
+         self.snapshotUsers = []
+
+      for i in range(3, len(args), 4):   # each user takes 4 arguments: userID, x, y, z
+         userID, x, y, z = args[i:i+4]
+         self.snapshotUsers.append(userID)
+
+         if userID in self.currentUsers:
+            userIndex = self.currentUsers.index(userID)
+            self.display.move(self.currentUserCircles[userIndex], x, y)
+            self.currentUserCoordinates[userIndex] = [x, y, z]
+         else:
+            self.showUser(userID, x, y, z)
+
+      if part == parts - 1:       # last part, so remove users that are no longer in the Virtual World
+         for userID in self.currentUsers[:]:
+            if userID not in self.snapshotUsers:
+               self.hideUser(userID)
+
+         self.worldSeq = seq
+         self.behindSince = None
+         print "Snapshot received.", len(self.snapshotUsers), "users, world sequence", seq
+
+
+   #####################################
+   ###### Kuatro View Helpers ##########
+   #####################################
+
+   def showUser(self, userID, x, y, z):
+      ''' Adds a new user to the view '''
+
+      # add user to user data structure
+      if userID not in self.currentUsers: # first check to make sure userID doesn't already exist (we don't want duplicates)
+
+         self.currentUsers.append(userID)
+         self.currentUserCoordinates.append([x,y,z])
+
+         userCircle = self.display.drawCircle(x, y, self.circleRadius, self.circleColor, True)  # add the new user to the display
+         self.currentUserCircles.append(userCircle)
+
+         print "Added User:", userID, "Location:", x, y, z
+
+
+   def hideUser(self, userID):
+      ''' Removes the specified user from the display '''
+
+      # remove user from user data structure
+      if userID in self.currentUsers:  # first check to make sure userID exists
+
+         userIndex = self.currentUsers.index(userID)  # find the index of the current user
+         self.currentUsers.pop(userIndex)
+         self.currentUserCoordinates.pop(userIndex)
+
+         userCircle = self.currentUserCircles.pop(userIndex) # get the user circle
+         self.display.remove(userCircle)                    # and remove it
+
+         if userID in self.userJoints:
+            del self.userJoints[userID]
+
+         print "Removed User:", userID
+
+
+   def checkWorldSeq(self, seq):
+      ''' Checks the world sequence number of a new / lost user message.  Returns False if
+          the message is older than our state (i.e., already included in the snapshot). '''
+
+      if self.worldSeq is None:       # no snapshot yet, so nothing to compare against
+         return True
+
+      if seq <= self.worldSeq:        # already included in the last snapshot
+         return False
+
+      if seq > self.worldSeq + 1:     # at least one new / lost user message went missing
+         self.requestSnapshot()
+
+      self.worldSeq = seq
+      self.behindSince = None
+      return True
+
+
+   def checkCoordinatesSeq(self, seq):
+      ''' Checks the world sequence number of a coordinates message.  A newer number means a
+          new / lost user message is still on its way; if it does not arrive within
+          RESYNC_DELAY seconds, ask the server for a snapshot. '''
+
+      if self.worldSeq is None or seq <= self.worldSeq:
+         self.behindSince = None
+         return
+
+      now = time.time()
+      if self.behindSince is None:
+         self.behindSince = now
+      elif now - self.behindSince > KuatroBasicView.RESYNC_DELAY:
+         self.requestSnapshot()
+         self.behindSince = None
+
+
+   def sendHeartbeat(self):
+      ''' Timer function that tells the server this view is still alive '''
+
+      self.oscOut.sendMessage(KuatroBasicView.VIEW_HEARTBEAT_MESSAGE, self.ipAddress, self.incomingPort, self.jointMask, int(self.occupancy), self.outputRate)
+
+
+   ##################################
+   ###### Spatial Queries ###########
+   ##################################
+
+   # Queries return a queryID; the result arrives (asynchronously) in self.queryResults[queryID],
+   # e.g. as a list of (userID, x, y), nearest first.
+
+   def queryRadius(self, x, y, radius):
+      ''' Asks the server for the users within radius of x, y '''
+
+      return self.sendQuery(KuatroBasicView.QUERY_RADIUS_MESSAGE, [x, y, radius])
+
+
+   def queryNearest(self, x, y, k):
+      ''' Asks the server for the k users nearest to x, y '''
+
+      return self.sendQuery(KuatroBasicView.QUERY_NEAREST_MESSAGE, [x, y, k])
+
+
+   def queryRect(self, x1, y1, x2, y2):
+      ''' Asks the server for the users within the rectangle x1, y1 - x2, y2 '''
+
+      return self.sendQuery(KuatroBasicView.QUERY_RECT_MESSAGE, [x1, y1, x2, y2])
+
+
+   def addStandingQuery(self, kind, *parameters):
+      ''' Asks the server for the result of a query of kind ("radius", "nearest" or "rect"), now and whenever
+          the set of users in it changes, e.g. addStandingQuery("radius", 500, 375, 200) '''
+
+      return self.sendQuery(KuatroBasicView.ADD_STANDING_QUERY_MESSAGE, [kind] + list(parameters))
+
+
+   def queryMotion(self, userID = None):
+      ''' Asks the server for the motion (vx, vy, speed, heading) of a user, or of all users '''
+
+      if userID is None:
+         return self.sendQuery(KuatroBasicView.QUERY_MOTION_MESSAGE, [])
+      return self.sendQuery(KuatroBasicView.QUERY_MOTION_MESSAGE, [userID])
+
+
+   def queryTrajectory(self, userID, seconds):
+      ''' Asks the server for the positions of a user over the last seconds, as [(age, x, y), ...], oldest first '''
+
+      return self.sendQuery(KuatroBasicView.QUERY_TRAJECTORY_MESSAGE, [userID, seconds])
+
+
+   def removeStandingQuery(self, queryID):
+
+      self.oscOut.sendReliable(KuatroBasicView.REMOVE_STANDING_QUERY_MESSAGE, self.ipAddress, self.incomingPort, queryID)
+      if queryID in self.queryResults:
+         del self.queryResults[queryID]
+
+
+   def sendQuery(self, address, parameters):
+      ''' Sends a query to the server, and returns its queryID '''
+
+      queryID = self.nextQueryID
+      self.nextQueryID = self.nextQueryID + 1
+
+      self.oscOut.sendReliable(address, self.ipAddress, self.incomingPort, queryID, *parameters)
+
+      return queryID
+
+
+   def getLatencyStats(self):
+      '''Returns a dictionary with the latency percentiles of the view stages (see kuatroLatency.py)'''
+
+      return self.latencyStats.getStats()
+
+
+   def close(self):
+      ''' Unregisters the view from the server and closes the display '''
+
+      self.heartbeatTimer.stop()
+      self.clock.stop()
+      self.oscOut.sendReliable(KuatroBasicView.UNREGISTER_VIEW_MESSAGE, self.ipAddress, self.incomingPort)
+      self.display.hide()
+
+
+   def requestSnapshot(self):
+      ''' Asks the server to resend the snapshot of all users (at most once per RESYNC_DELAY) '''
+
+      now = time.time()
+      if now - self.lastResyncRequest > KuatroBasicView.RESYNC_DELAY:
+         self.lastResyncRequest = now
+         self.oscOut.sendReliable(KuatroBasicView.REQUEST_SNAPSHOT_MESSAGE, self.ipAddress, self.incomingPort)
+         print "Missed events detected.  Requesting snapshot from server."
+
+
 #### Instantiate the Basic Kuatro View
 if __name__ == '__main__':
    basicView = KuatroBasicView()
@@ -5,6 +5,9 @@
 #     1. Open a Terminal
 #     2. cd to the Kuatro directory.  eg.  cd Dropbox/kuatro
 #     3. Issue the following command:  sh jython.sh kuatroBegin.py
+#
+# Independent components start in parallel (see kuatroLauncher.py); the installation goes
+# live once all of them are ready, and a startup timing report is printed.
 
 
 from kuatroServer import * 
@@ -12,17 +15,28 @@ from kuatroBasicView import *
 from kuatroKinectClient import *
 from kuatroEscherView_v2 import *
 from theGlaser import *
+from kuatroSoundMapping import *
+from kuatroTransport import *
+from kuatroLauncher import KuatroLauncher
+import sys
+
+##### Choose the transport; components that all run in this process may share a MemoryTransport (no OSC encoding
+##### or loopback sockets, see kuatroTransport.py), but the Escher view below still talks OSC, so keep OSC here
+transport = OscTransport()
+
+launcher = KuatroLauncher()
 
 #####  Start the Server
-server = KuatroServer(verbose = 1)
+launcher.add("server", lambda: KuatroServer(verbose = 1, transport = transport))
 
 ##### Start the Client ######
 # import kuatroMouseClient
-kinectClient = KuatroKinectClient() # Requires that a Kinect is connected to the computer.
+launcher.add("kinectClient", lambda: KuatroKinectClient(transport = transport), ["server"]) # Requires that a Kinect is connected to the computer.
 
 
 ###### Start the views ###### 
 #### Setup and Run the Glaser to handling the audio view
+# (sample descriptors are decoded by theGlaser on first use, see glaserSamples.py)
 audioList = []
 
 #audioList.append(AudioSample("sounds/state0_mix.aif"))
@@ -32,16 +46,44 @@ audioList = []
 #audioList.append(AudioSample("sounds/state4_mix.aif"))
 #audioList.append(AudioSample("sounds/state5_mix.aif"))
 
-audioList.append(AudioSample("sounds/state0_mix_loop.wav"))
-audioList.append(AudioSample("sounds/state1_mix_loop.wav"))
-audioList.append(AudioSample("sounds/state2_mix.wav"))
-audioList.append(AudioSample("sounds/state3_mix_loop.wav"))
-audioList.append(AudioSample("sounds/state4_mix.wav"))
-audioList.append(AudioSample("sounds/state5_mix_loop.wav"))
-audioList.append(AudioSample("sounds/button_sound.wav"))
+audioList.append(SampleDescriptor("sounds/state0_mix_loop.wav"))
+audioList.append(SampleDescriptor("sounds/state1_mix_loop.wav"))
+audioList.append(SampleDescriptor("sounds/state2_mix.wav"))
+audioList.append(SampleDescriptor("sounds/state3_mix_loop.wav"))
+audioList.append(SampleDescriptor("sounds/state4_mix.wav"))
+audioList.append(SampleDescriptor("sounds/state5_mix_loop.wav"))
+audioList.append(SampleDescriptor("sounds/button_sound.wav", voices = 4))   # re-triggered often, so it gets a voice pool
+
+def startGlaser():
+   glaser = theGlaser(audioList, False, 400, 500)
+   glaser.prefetch(range(len(audioList)))   # decode the sounds in the background, so the first one plays without delay
+   return glaser
+
+launcher.add("glaser", startGlaser)
+
+#### Map user positions straight to theGlaser (in this process, no OSC in between); see kuatroSoundMapping.py
+#### for the rules.  Add rules to soundRules (an empty list turns the mapping off).
+soundRules = []
+soundRules.append(PositionPanningRule(6))                      # the button sound follows the users from left to right
+#soundRules.append(DistanceVolumeRule(6, 500, 375, 300))      # e.g., the button sound is louder near the center
 
-glaserView = theGlaser(audioList, False, 400, 500)
+def startSoundMapping():
+   return KuatroSoundMapping(launcher.get("server"), launcher.get("glaser"), soundRules)
+
+launcher.add("soundMapping", startSoundMapping, ["server", "glaser"])
 
 
 ##### Start the Escher Middleware
-escherView = KuatroEscherView(50506)
\ No newline at end of file
+launcher.add("escherView", lambda: KuatroEscherView(50506), ["server"])
+
+
+##### Wait until all components are ready (the readiness barrier), and report the startup times
+if not launcher.start():
+   print "Kuatro did not start (see the startup report above)"
+   sys.exit(1)
+
+server = launcher.get("server")
+kinectClient = launcher.get("kinectClient")
+glaserView = launcher.get("glaser")
+soundMapping = launcher.get("soundMapping")
+escherView = launcher.get("escherView")
\ No newline at end of file
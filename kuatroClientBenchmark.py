@@ -0,0 +1,111 @@
+# kuatroClientBenchmark.py       Version  1.0     19-Oct-2026
+#
+# Measures the throughput of the Kuatro Client pipeline without a depth sensor.  The benchmark
+# starts a KuatroServer and a headless KuatroKinectClient in this process, connected by the
+# in-memory transport (see kuatroTransport.py).  The client reads one or more simulated sensors,
+# each with users walking back and forth through the space (see kuatroSensor.py), as fast as it can (or at
+# speed times real time), so the measurement covers the client's frame processing, the
+# server's calibration and its bookkeeping, but not the sensor itself.
+#
+# After a second of warm up (the client reports new users to the server after a tenth of a
+# second), it measures for seconds, and reports:
+#
+#     frames/s    - frames processed by the client per second (all sensors together)
+#     updates/s   - user coordinates calibrated by the server per second
+#     shed/s      - user coordinates shed by the server per second (superseded before they were
+#                   calibrated, see kuatroIngest.py)
+#
+# and the latency percentiles of the client and server stages (see kuatroLatency.py).
+#
+# To run it:
+#
+#     sh jython.sh kuatroClientBenchmark.py [users] [seconds] [speed] [sensors]     (users per sensor; speed 0 is as fast as possible)
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroServer import *
+from kuatroKinectClient import KuatroKinectClient
+from kuatroSensor import SimulatedSensor, SimulatedUser
+from kuatroTransport import MemoryTransport
+import random
+import time
+import sys
+
+SERVER_PORT = 50597
+ACK_PORT = 50598
+PATH_SECONDS = 600   # seconds of simulated time the users walk (then they start over)
+
+
+class BenchmarkServer(KuatroServer):
+   '''A server that counts the user coordinates it calibrates'''
+
+   updates = 0
+
+   def moveDeviceUser(self, user, x, y, z, frameID = None, captureTime = None, receiveTime = None):
+      self.updates = self.updates + 1
+      KuatroServer.moveDeviceUser(self, user, x, y, z, frameID, captureTime, receiveTime)
+
+
+def walkingUsers(userCount, seconds):
+   '''Returns userCount SimulatedUsers walking back and forth between random points of the space, for seconds'''
+
+   users = []
+   for userID in range(1, userCount + 1):
+
+      waypoints = []
+      t = 0.0
+      while t <= seconds:
+         waypoints.append((t, random.uniform(-2000, 2000), 0, random.uniform(1000, 4000)))
+         t = t + random.uniform(2, 5)      # seconds to the next point
+      waypoints.append((t, random.uniform(-2000, 2000), 0, random.uniform(1000, 4000)))
+
+      users.append(SimulatedUser(userID, waypoints))
+
+   return users
+
+
+def countFrames(client):
+   return sum([device.frameID for device in client.devices])
+
+
+def runBenchmark(userCount, seconds, speed, sensorCount = 1):
+   '''Runs the client pipeline for seconds, and prints the results'''
+
+   transport = MemoryTransport()
+   server = BenchmarkServer(SERVER_PORT, transport = transport)
+
+   sensors = [SimulatedSensor(walkingUsers(userCount, PATH_SECONDS), speed = speed, loop = True) for i in range(sensorCount)]
+   client = KuatroKinectClient("localhost", SERVER_PORT, ACK_PORT, transport = transport, sensor = sensors, showDisplay = False)
+
+   time.sleep(1.0)   # warm up
+   frames, updates, shed = countFrames(client), server.updates, server.ingest.shed
+   start = time.time()
+
+   time.sleep(seconds)
+   frames, updates, shed = countFrames(client) - frames, server.updates - updates, server.ingest.shed - shed
+   elapsed = time.time() - start
+   client.stop()
+
+   print "Client pipeline, %d sensors with %d simulated users each, %d seconds (speed %s)" % (sensorCount, userCount, seconds, speed or "max")
+   print "%10s %10s %10s %10s" % ("frames", "frames/s", "updates/s", "shed/s")
+   print "%10d %10.1f %10.1f %10.1f" % (frames, frames / elapsed, updates / elapsed, shed / elapsed)
+
+   client.latencyStats.printReport("Client latency")
+   server.latencyStats.printReport("Server latency")
+
+   server.livenessTimer.stop()
+   server.occupancyTimer.stop()
+   server.ingest.stop()
+   server.endpoint.stop()
+   client.clock.stop()
+   client.endpoint.stop()
+
+
+if __name__ == '__main__':
+
+   userCount = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+   seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+   speed = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+   sensorCount = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+   runBenchmark(userCount, seconds, speed, sensorCount)
@@ -0,0 +1,119 @@
+# kuatroDispatchBenchmark.py       Version  1.0     19-Oct-2026
+#
+# Measures the dispatch cost per OSC message against the number of registered routes,
+# for the two ways Kuatro components can route messages:
+#
+#     matching   - every registered address is matched (as a pattern) against every message,
+#                  and every matching callback parses the message arguments again
+#                  (the way addresses registered one by one with OscIn.onInput() are handled)
+#     dispatcher - a KuatroDispatcher: one hash lookup per message, arguments parsed once
+#
+# The routes are those of theGlaser (8 addresses per audio sample), and the messages are
+# spread evenly over the registered addresses.  The benchmark does not need OSC (messages
+# are created in memory), so it runs with Jython as well as with a plain Python interpreter.
+#
+# To run it:
+#
+#     sh jython.sh kuatroDispatchBenchmark.py [messages]
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroDispatcher import KuatroDispatcher
+import random
+import time
+import sys
+import re
+
+GLASER_ADDRESSES = ["/volumeFader/", "/frequencyFader/", "/panningFader/", "/playAudio/",
+                    "/loopAudio/", "/stopAudio/", "/pauseAudio/", "/resumeAudio/"]
+
+
+class RawMessage():
+   '''An incoming OSC message; like OSC messages from OscIn, getArguments() converts the
+      arguments every time it is called'''
+
+   def __init__(self, address, arguments):
+      self.address = address
+      self.arguments = tuple(arguments)
+
+   def getAddress(self):
+      return self.address
+
+   def getArguments(self):
+      return list(self.arguments)
+
+
+class MatchingRouter():
+   '''Routes messages by matching every registered address against every message'''
+
+   def __init__(self):
+      self.routes = []
+
+   def onInput(self, address, function):
+      self.routes.append((re.compile(address + "$"), function))   # (anchored like OscIn, so /volumeFader/1 does not match /volumeFader/10)
+
+   def dispatch(self, message):
+      address = message.getAddress()
+      for pattern, function in self.routes:
+         if pattern.match(address):
+            function(message)
+
+
+calls = [0]   # handler calls (each message must reach exactly one handler)
+
+def handler(message):
+   '''A callback that reads its argument, like the fader functions of theGlaser'''
+
+   calls[0] = calls[0] + 1
+   args = message.getArguments()
+   return args[0]
+
+
+def timeRouter(router, messages):
+   '''Returns the dispatch cost per message (in microseconds)'''
+
+   callsBefore = calls[0]
+
+   start = time.time()
+   for message in messages:
+      router.dispatch(message)
+   elapsed = time.time() - start
+
+   assert calls[0] - callsBefore == len(messages), "%s called %d handlers for %d messages" % (router.__class__.__name__,
+                                                                                            calls[0] - callsBefore, len(messages))
+
+   return elapsed / len(messages) * 1000000
+
+
+def runBenchmark(messageCount):
+   '''Runs the benchmark for a growing number of routes and prints the results'''
+
+   print "Dispatch cost per message (%d messages per measurement)" % messageCount
+   print "%8s %8s %16s %16s" % ("samples", "routes", "matching (us)", "dispatcher (us)")
+
+   for samples in [1, 6, 12, 25, 50, 100]:
+
+      matching = MatchingRouter()
+      dispatcher = KuatroDispatcher()
+
+      addresses = []
+      for i in range(samples):
+         for prefix in GLASER_ADDRESSES:
+            address = prefix + str(i + 1)
+            addresses.append(address)
+            matching.onInput(address, handler)
+            dispatcher.onInput(address, handler)
+
+      messages = [RawMessage(random.choice(addresses), [random.randint(0, 127)]) for i in range(messageCount)]
+
+      timeRouter(dispatcher, messages[:1000])   # warm up (lets the JIT compile the code paths)
+      timeRouter(matching, messages[:1000])
+
+      print "%8d %8d %16.2f %16.2f" % (samples, len(addresses), timeRouter(matching, messages), timeRouter(dispatcher, messages))
+
+
+if __name__ == '__main__':
+
+   messageCount = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+   runBenchmark(messageCount)
@@ -0,0 +1,107 @@
+# kuatroDispatcher.py       Version  1.0     19-Oct-2026
+#
+# The Kuatro Dispatcher routes incoming OSC messages to callbacks.  Registering every
+# address with OscIn.onInput() means every incoming message is matched against every
+# registered address pattern, and every matching callback parses the message again.
+# Instead, the dispatcher registers one catch-all callback with OscIn and:
+#
+#   - keeps exact addresses (e.g. "/kuatro/newUser", "/volumeFader/3") in a hash table,
+#     so finding the callbacks of a message takes one dictionary lookup, no matter how
+#     many addresses are registered,
+#   - keeps regex matching only for true wildcard addresses (e.g. "/volumeFader/.*"),
+#   - parses each message once (into a KuatroMessage) and hands the same message to all
+#     matching callbacks, and
+#   - calls monitors (e.g. an echo / logging callback) once per message, without a
+#     catch-all "/.*" pattern of their own.
+#
+# Usage:
+#
+#     dispatcher = KuatroDispatcher(OscIn(port))
+#     dispatcher.onInput("/kuatro/newUser", self.addUser)
+#     dispatcher.onAnyInput(self.echoMessage)
+#
+# The dispatcher offers the same onInput() method as OscIn, so it can be used wherever
+# an OscIn is expected (e.g., by ReliableEndpoint).
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroMessage import KuatroMessage
+import re
+
+
+class KuatroDispatcher():
+
+   WILDCARD_CHARACTERS = ".*?+[]{}()|^$\\"   # an address containing any of these is a (regex) pattern
+
+   def __init__(self, oscIn = None):
+
+      self.routes = {}        # maps an exact OSC address to the list of its callbacks
+      self.patterns = []      # list of (compiled regex, callback) for wildcard addresses
+      self.monitors = []      # callbacks called for every message
+
+      self.oscIn = oscIn
+      if oscIn is not None:
+         oscIn.onInput("/.*", self.dispatch)   # the only pattern OscIn has to match
+
+
+   def onInput(self, address, function):
+      '''Registers function to be called with every message sent to address
+         (an exact address, or a regex pattern)'''
+
+      if KuatroDispatcher.isWildcard(address):
+         self.patterns.append((re.compile(address + "$"), function))
+      else:
+         self.routes.setdefault(address, []).append(function)
+
+
+   def onAnyInput(self, function):
+      '''Registers function to be called with every message (e.g., to echo messages)'''
+
+      self.monitors.append(function)
+
+
+   def dispatch(self, oscMessage):
+      '''Parses oscMessage once and calls the callbacks of its address'''
+
+      message = KuatroMessage(oscMessage.getAddress(), list(oscMessage.getArguments()))
+      self.dispatchMessage(message)
+
+
+   def dispatchMessage(self, message):
+      '''Calls the callbacks of an already parsed KuatroMessage'''
+
+      address = message.getAddress()
+
+      for function in self.monitors:
+         function(message)
+
+      functions = self.routes.get(address)
+      if functions:
+         for function in functions:
+            function(message)
+
+      for pattern, function in self.patterns:
+         if pattern.match(address):
+            function(message)
+
+
+   def getRouteCount(self):
+      '''Returns the number of registered callbacks (exact and wildcard)'''
+
+      count = len(self.patterns)
+      for functions in self.routes.values():
+         count = count + len(functions)
+
+      return count
+
+
+   @staticmethod
+   def isWildcard(address):
+      '''Returns True if address is a pattern rather than an exact OSC address'''
+
+      for character in address:
+         if character in KuatroDispatcher.WILDCARD_CHARACTERS:
+            return True
+
+      return False
@@ -0,0 +1,127 @@
+# kuatroIngest.py       Version  1.0     19-Oct-2026
+#
+# Overload protection for the Kuatro Server's incoming sensor data.  When messages arrive
+# faster than they can be processed (too many sensors, a replay burst), processing them on
+# the OSC input thread makes the backlog grow without bound, and control messages (new /
+# lost users) wait behind it, so the whole installation drifts further and further behind.
+#
+# An IngestQueue takes sensor data (coordinates, joints, occupancy grids) off the input
+# thread, and processes it on its own thread.  Each message has a key (e.g., the user it is
+# about), and a newer message replaces an older one with the same key that was not processed
+# yet (latest wins): under overload the superseded updates are shed, so the backlog is at
+# most one message per key, and latency stays bounded.  Messages are processed in the order
+# they arrived (a message that replaces another one takes its place at the end).  Control messages never go through the
+# queue, so they are never shed (and no longer wait behind sensor data).
+#
+# The queue counts the messages received, processed and shed, and measures the ingest lag
+# (the time from the arrival of a message to its processing).
+#
+# Usage:
+#
+#     ingest = IngestQueue()
+#     ingest.onInput(dispatcher, "/kuatro/userCoordinates", self.moveUser, lambda message: message.getArguments()[0])
+#     stats = ingest.getIngestStats()
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroLatency import LatencyStats
+from threading import Thread, Condition
+import time
+
+
+class IngestQueue():
+
+   OVERLOAD_LAG = 100    # ingest lag (in milliseconds) above which the server counts as overloaded
+
+   def __init__(self):
+
+      self.pending = {}               # maps the key of each message waiting to be processed to (function, message, arrival time)
+      self.order = []                 # the keys of pending, in the order their messages arrived
+      self.condition = Condition()    # guards pending (and wakes up the ingest thread)
+
+      # counters
+      self.received = 0               # messages put in the queue
+      self.processed = 0              # messages processed
+      self.shed = 0                   # messages replaced by a newer one with the same key before they were processed
+      self.lag = 0                    # ingest lag of the last message processed (in milliseconds)
+      self.lagStats = LatencyStats(["ingest"])
+
+      # setup thread to process messages
+      self.isRunning = True
+      self.ingestThread = Thread(target = self.run)
+      self.ingestThread.setDaemon(True)
+      self.ingestThread.start()
+
+
+   def onInput(self, dispatcher, address, function, key):
+      '''Registers function to be called (on the ingest thread) with messages sent to address;
+         key(message) returns the key of a message (messages with the same key supersede each other)'''
+
+      dispatcher.onInput(address, lambda message: self.put(key(message), function, message))
+
+
+   def put(self, key, function, message):
+      '''Queues a message for function, replacing a message with the same key that was not processed yet'''
+
+      arrival = time.time()
+
+      self.condition.acquire()
+      try:
+         if key in self.pending:
+            self.shed = self.shed + 1       # superseded (latest wins)
+            self.order.remove(key)          # (the newer message is processed after the ones that arrived before it)
+         self.order.append(key)
+         self.pending[key] = (function, message, arrival)
+         self.received = self.received + 1
+         self.condition.notify()
+      finally:
+         self.condition.release()
+
+
+   def run(self):
+      '''Processes the queued messages (via a seperate thread)'''
+
+      while self.isRunning:
+
+         self.condition.acquire()
+         try:
+            while not self.pending and self.isRunning:
+               self.condition.wait(0.5)
+            batch = self.pending          # take all queued messages (new ones go to a new dictionary)
+            order = self.order
+            self.pending = {}
+            self.order = []
+         finally:
+            self.condition.release()
+
+         for key in order:                # (in the order they arrived)
+            function, message, arrival = batch[key]
+
+            self.lag = (time.time() - arrival) * 1000
+            self.lagStats.add("ingest", self.lag)
+
+            try:
+               function(message)
+            except Exception, e:          # (keep processing the other messages)
+               print "Unable to process", message.getAddress()
+               print e
+
+            self.processed = self.processed + 1
+
+
+   def isOverloaded(self):
+      return self.lag > IngestQueue.OVERLOAD_LAG
+
+
+   def getIngestStats(self):
+      '''Returns a dictionary with the ingest counters, and the percentiles of the ingest lag (in milliseconds)'''
+
+      return {"received" : self.received, "processed" : self.processed, "shed" : self.shed, "pending" : len(self.pending),
+              "overloaded" : self.isOverloaded(), "lag" : self.lagStats.getStats()["ingest"]}
+
+
+   def stop(self):
+      '''Stops processing messages'''
+
+      self.isRunning = False
@@ -0,0 +1,54 @@
+# kuatroJoints.py       Version  1.0     19-Oct-2026
+#
+# Names of the skeleton joints Kuatro clients can track, and the joint masks used to
+# pack them.  A joint mask is an int with one bit per joint (bit i is JOINTS[i]).  Clients
+# send the joints they track, and views ask for the joints they want, as joint masks;
+# packed joint coordinates are always in the order of JOINTS (lowest bit first).
+#
+# Joint messages (one per frame, in parts of at most a few users):
+#
+#     client to server:   /kuatro/userJoints , clientID, jointMask, n, userID, x, y, z, x, y, z, ..., userID, ..., part
+#     server to views:    /kuatro/userJoints , jointMask, n, userID, x, y, z, x, y, z, ..., userID, ..., worldSeq
+#
+# Each user takes 1 + 3 * (number of joints in jointMask) arguments.  A joint the sensor
+# could not see is sent as 0, 0, 0.
+#
+# Usage:
+#
+#     mask = jointMask(["head", "leftHand", "rightHand"])
+#     names = jointNames(mask)        # ["head", "leftHand", "rightHand"]
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+JOINTS = ["head", "neck", "torso",
+          "leftShoulder", "leftElbow", "leftHand",
+          "rightShoulder", "rightElbow", "rightHand",
+          "leftHip", "leftKnee", "leftFoot",
+          "rightHip", "rightKnee", "rightFoot"]
+
+ALL_JOINTS = 2 ** len(JOINTS) - 1   # the joint mask of all joints
+
+
+def jointMask(names):
+   '''Returns the joint mask of a list of joint names'''
+
+   mask = 0
+   for name in names:
+      if name not in JOINTS:
+         raise ValueError("Unknown joint " + str(name) + "; joints are " + str(JOINTS))
+      mask = mask | (1 << JOINTS.index(name))
+
+   return mask
+
+
+def jointNames(mask):
+   '''Returns the joint names of a joint mask (in the order joints are packed)'''
+
+   return [JOINTS[i] for i in range(len(JOINTS)) if mask & (1 << i)]
+
+
+def jointCount(mask):
+   '''Returns the number of joints in a joint mask'''
+
+   return len(jointNames(mask))
@@ -1,69 +1,349 @@
 # kuatroKinectClient.py       Version 1.0     13-Aug-2014
 #     David Johnson, Bill Manaris, and Seth Stoudenmier
 #
-# The Kuatro Client tracks the x, y, z coordinates of mulitple users 
+# The Kuatro Client tracks the x, y, z coordinates of mulitple users
 # within range of a configured depth sensor.  The coordinates are sent via OSC messages
-# to the Kuatro Server for coordination within a Virtual World, as defined by the server.  
-# 
-#  Supported Controllers for the Kautro Client are Microsoft Kinect, model 1414, 
+# to the Kuatro Server for coordination within a Virtual World, as defined by the server.
+#
+#  Supported Controllers for the Kautro Client are Microsoft Kinect, model 1414,
 #  and the Asus Xtion Pro.
 #
 #  See README file for full instructions on using the Kuatro System
+#
+#  LOG:
+#     19-Oct-2026:  Messages go through a transport (see kuatroTransport.py), OSC over UDP by default.
+#     19-Oct-2026:  Optionally tracks skeleton joints, and sends them once per frame (see kuatroJoints.py).
+#     19-Oct-2026:  Optionally sends an occupancy grid of the calibrated space (see kuatroOccupancy.py).
+#     19-Oct-2026:  Coordinates carry the frame ID and capture time (on the server clock) of their frame (see kuatroLatency.py).
+#     19-Oct-2026:  Reads users from a sensor backend (see kuatroSensor.py), OpenNI by default; runs headless without the display.
+#     19-Oct-2026:  Drives several sensors (devices), each with its own device ID and calibration.  Each device captures
+#                   frames on its own thread, and one sender thread sends the latest frame of every device, with the
+#                   coordinates of all its users bundled in one /kuatro/userFrame message.
+#     19-Oct-2026:  The output mode (resolution and frame rate) of the sensors is configurable, and may be picked adaptively
+#                   from the number of users, the measured frame times and a CPU budget (see kuatroOutputMode.py).
 
 
 from osc import OscOut
 from osc import OscIn
-from org.OpenNI import  *
-from com.primesense.NITE import *
+from kuatroReliable import ReliableEndpoint
+from kuatroDispatcher import KuatroDispatcher
+from kuatroTransport import OscTransport
+from kuatroJoints import jointMask, jointNames
+from kuatroOccupancy import OccupancyGrid
+from kuatroLatency import ClockSync, LatencyStats
+from kuatroOutputMode import OutputModePolicy, OUTPUT_MODES, modeName
 from threading import *
 import sys
 from gui import *
 import pickle
 import socket
+import jarray
+import math
+import time
+import traceback
 
 class KuatroKinectClient():
 
    FRAME_RATE = 30   # frame rate used by the Kinect
+   FRAME_USERS_PER_MESSAGE = 100 # users per frame message (keeps each message well below the UDP packet size)
+   JOINT_USERS_PER_MESSAGE = 8   # users per joints message (with all 15 joints, about 1.5 KB per message)
+   OCCUPANCY_WIDTH = 64          # occupancy grid cells, across the calibrated space (x)
+   OCCUPANCY_HEIGHT = 48         # and into it (z)
+   OCCUPANCY_ROW_STEP = 5        # depth map rows and columns sampled for the occupancy grid (every 5th row,
+   OCCUPANCY_COLUMN_STEP = 4     # every 4th column, i.e., 96 x 160 pixels per grid)
 
    ##### OSC Namespace #####
    NEW_USER_MESSAGE = "/kuatro/newUser"
    LOST_USER_MESSAGE = "/kuatro/lostUser"
    USER_COORDINATES_MESSAGE = "/kuatro/userCoordinates"
+   USER_FRAME_MESSAGE = "/kuatro/userFrame"
+   USER_JOINTS_MESSAGE = "/kuatro/userJoints"
    REGISTER_DEVICE_MESSAGE = "/kuatro/registerDevice"
    CALIBRATE_DEVICE_MESSAGE = "/kuatro/calibrateDevice"
+   OCCUPANCY_MESSAGE = "/kuatro/occupancy"
 
 
-   def __init__(self, serverIpAddress = "localhost", serverPort = 50505):
+   def __init__(self, serverIpAddress = "localhost", serverPort = 50505, ackPort = 50507, transport = None, joints = None, occupancyRate = 0,
+                sensor = None, showDisplay = True, outputMode = None, adaptiveMode = False, cpuBudget = 0.5):
 
 
-      self.clientID = socket.gethostbyname(socket.getfqdn())   # find the computer's IP Address to use as unique ID of this device used by Kuatro Server
-      self.users = []         # list of users being tracked by this device
+      self.clientID = socket.gethostbyname(socket.getfqdn())   # find the computer's IP Address to use as unique ID of this computer (and of its first device) used by Kuatro Server
 
-      self.isRunning = True   # value is set to false to turn off the thread that is running the Kinect
+      self.isRunning = True   # value is set to false to turn off the threads that are running the Kinects
 
+      # the skeleton joints to track and send (e.g., ["head", "leftHand", "rightHand"]); none by default, since
+      # skeleton tracking costs CPU on the client, and bandwidth for every frame
+      self.jointMask = jointMask(joints or [])
 
-      self.configureKinect()  # configure and start the Kinect
+      # occupancy grids sent per second (e.g., 10); none by default (see kuatroOccupancy.py)
+      self.occupancyRate = occupancyRate
 
-      # set up calibration display
-      self.display = Display("Calibrate Kuatro Client", 400, 400, 0, 0, Color.BLACK)
+      # the output mode of the sensors, (width, height, framesPerSecond), e.g. (320, 240, 60) (the sensor's default if None),
+      # or, with adaptiveMode, the mode picked from the users, frame times and the share of a CPU core frames may take (see kuatroOutputMode.py)
+      self.outputMode = outputMode
+      self.adaptiveMode = adaptiveMode
+      self.cpuBudget = cpuBudget
 
-      # create Menu for calibration
-      calibrateMenu = Menu("Calibrate") 
-      calibrateMenu.addItemList(["Start", "Stop"], [self.calibrationStart, self.calibrationStop])
-      self.display.addMenu(calibrateMenu)
+      # frames are stamped with an ID and their capture time on the server clock, once the clock is synchronized (see kuatroLatency.py)
+      self.clock = None
+      self.latencyStats = LatencyStats(["client"])
 
-      # add label for instructions
-      self.instructions = self.display.drawLabel("Select Calibrate > Start to start the calibration proces.", 20, 175, Color.WHITE)
+      # the latest frame of each device not sent yet (a newer frame replaces it), and the lock that guards them
+      self.pendingFrames = {}
+      self.frameCondition = Condition()
 
-      # initiate Timer variable
-      self.timer = None
+      if transport is None:   # OSC over UDP, unless all components share an in-memory transport
+         transport = OscTransport()
+      self.transport = transport
+
+      if sensor is None:   # the Kinect (or Xtion), unless another sensor backend is given, e.g. a SimulatedSensor (see kuatroSensor.py)
+         from kuatroOpenNISensor import OpenNISensor
+         sensor = OpenNISensor(KuatroKinectClient.FRAME_RATE)
+      if type(sensor) is not list:   # (a list of sensors drives several devices)
+         sensor = [sensor]
+
+      # the first device is known to the server by the computer's IP Address (as before there were several), the
+      # next ones by the IP Address and their number, e.g. 192.168.1.5-1; each has its own calibration file
+      hostname = socket.gethostname()  # find computers host name
+      hostname = hostname.split(".")[0]  # parse the hostname and get the first part of the name so that we just get the name of the computer and not the network domain.
+      self.devices = []
+      for i in range(len(sensor)):
+         if i == 0:
+            self.devices.append(KuatroDevice(self, sensor[i], self.clientID, hostname))
+         else:
+            self.devices.append(KuatroDevice(self, sensor[i], self.clientID + "-" + str(i), hostname + "-" + str(i)))
+
+      self.configureKinect()  # configure and start the Kinects
+
+      self.display = None
+      if showDisplay:   # (headless, calibrationStart() and calibrationStop() may be called directly)
+
+         # set up calibration display
+         self.display = Display("Calibrate Kuatro Client", 400, 400, 0, 0, Color.BLACK)
+
+         # create Menu for calibration (one device at a time, if there are several)
+         calibrateMenu = Menu("Calibrate")
+         if len(self.devices) == 1:
+            calibrateMenu.addItemList(["Start", "Stop"], [self.calibrationStart, self.calibrationStop])
+         else:
+            for device in self.devices:
+               calibrateMenu.addItemList(["Start " + device.deviceID, "Stop " + device.deviceID],
+                                         [device.calibrationStart, device.calibrationStop])
+         self.display.addMenu(calibrateMenu)
+
+         # add label for instructions
+         self.instructions = self.display.drawLabel("Select Calibrate > Start to start the calibration proces.", 20, 175, Color.WHITE)
 
       # once Kinect is started and display is setup, establish connection to server and register the client with the Kuatro Server
-      self.oscServer = OscOut(serverIpAddress, serverPort)              # setup the OSC Connection to the Kuatro Server
-      self.oscServer.sendMessage(KuatroKinectClient.REGISTER_DEVICE_MESSAGE, self.clientID)  # and now send message to register client with server
+      # (control messages are sent reliably, so the server's acks come back to the ackPort)
+      try:
+         self.dispatcher = KuatroDispatcher(self.transport.createIn(ackPort))
+         self.endpoint = ReliableEndpoint(self.dispatcher, self.clientID, ackPort, transport = self.transport)
+      except Exception, e:
+         print "Error:  Unable to setup OSC In port for acks. Port may already be in use."
+         print e
+         sys.exit(1)
+
+      self.oscServer = self.endpoint.createOut(serverIpAddress, serverPort)   # setup the OSC Connection to the Kuatro Server
+      for device in self.devices:
+         self.oscServer.sendReliable(KuatroKinectClient.REGISTER_DEVICE_MESSAGE, device.deviceID)  # and now send message to register devices with server
+
+      # keep this computer's clock aligned with the server's (the answers to clock pings also come back to the ackPort)
+      self.clock = ClockSync(self.dispatcher, self.oscServer, self.clientID, ackPort)
 
-      # now its registered, calibrate the device with server
-      self.calibrateWithServer()
+      # now its registered, calibrate the devices with server
+      for device in self.devices:
+         device.calibrateWithServer()
+
+      self.start()   # and start tracking
+      print "Kuatro Device Started"
+
+
+   ##############################
+   ###### Sending Frames ########
+   ##############################
+
+   def queueFrame(self, device, frame):
+      ''' Queues the latest frame of a device for the sender thread (replacing the frame of the device
+          not sent yet, if any, since the newer frame supersedes it) '''
+
+      self.frameCondition.acquire()
+      try:
+         self.pendingFrames[device] = frame
+         self.frameCondition.notify()
+      finally:
+         self.frameCondition.release()
+
+
+   def dropFrame(self, device):
+      ''' Drops the frame of a device not sent yet (e.g., when the device stopped) '''
+
+      self.frameCondition.acquire()
+      try:
+         if device in self.pendingFrames:
+            del self.pendingFrames[device]
+      finally:
+         self.frameCondition.release()
+
+
+   def send(self):
+      '''Sends the latest frame of every device, as they are captured (via a seperate thread)'''
+
+      while self.isRunning:
+
+         self.frameCondition.acquire()
+         try:
+            while not self.pendingFrames and self.isRunning:
+               self.frameCondition.wait(0.5)
+            frames = self.pendingFrames          # take all queued frames (new ones go to a new dictionary)
+            self.pendingFrames = {}
+         finally:
+            self.frameCondition.release()
+
+         for device, frame in frames.items():
+            self.sendFrame(device, frame)
+
+
+   def sendFrame(self, device, frame):
+      ''' Sends a frame of a device to the Kuatro Server: the coordinates of all its users (bundled into as
+          few messages as possible), their joints, and its occupancy grid (if any) '''
+
+      frameID, captureTime, coordinates, joints, occupancy = frame
+
+      usersPerMessage = KuatroKinectClient.FRAME_USERS_PER_MESSAGE
+      for i in range(0, len(coordinates), usersPerMessage):
+
+         part = coordinates[i : i + usersPerMessage]
+         args = [device.deviceID, frameID, captureTime, len(part)]
+         for userID, x, y, z in part:
+            args.extend([userID, x, y, z])
+         args.append(i / usersPerMessage)   # part index (a newer frame's part replaces this one if the server is behind)
+
+         self.oscServer.sendMessage(KuatroKinectClient.USER_FRAME_MESSAGE, *args)
+
+      if joints:
+         self.sendAllUserJoints(device, joints)
+
+      if occupancy is not None:
+         grid = device.occupancyGrid
+         self.oscServer.sendMessage(KuatroKinectClient.OCCUPANCY_MESSAGE, device.deviceID, grid.width, grid.height, *occupancy)
+
+      if captureTime >= 0 and coordinates:
+         self.latencyStats.add("client", self.clock.serverTime() - captureTime)
+
+
+   def sendAllUserJoints(self, device, users):
+      ''' Sends the skeleton joints of all users with a tracked skeleton to the Kuatro Server,
+          packed into as few messages as possible (see kuatroJoints.py).  This happens for each Kuatro Frame '''
+
+      usersPerMessage = KuatroKinectClient.JOINT_USERS_PER_MESSAGE
+      for i in range(0, len(users), usersPerMessage):
+
+         part = users[i : i + usersPerMessage]
+         args = [device.deviceID, self.jointMask, len(part)]
+         for userID, coordinates in part:
+            args.append(userID)
+            args.extend(coordinates)
+         args.append(i / usersPerMessage)   # part index
+
+         self.oscServer.sendMessage(KuatroKinectClient.USER_JOINTS_MESSAGE, *args)
+
+
+   ####################################
+   ###### Calibration Process #########
+   ####################################
+
+   # (the menu of a client with one device calibrates it; with several, each has its own menu items)
+
+   def calibrationStart(self):
+      self.devices[0].calibrationStart()
+
+   def calibrationStop(self):
+      self.devices[0].calibrationStop()
+
+
+   ####################################
+   ######### Client Setup #############
+   ####################################
+
+   def configureKinect(self):
+      '''Configure the Motion Sensing devices (via their sensor backends, see kuatroSensor.py)'''
+
+      try:
+         for device in self.devices:
+            device.configure()
+
+         # setup thread to send frames (it is started once the client is registered with the server)
+         self.senderThread = Thread(target = self.send)
+
+         print "Kuatro Device Configured"
+
+      except Exception, e:
+         print "Something went wrong.  Device not started."
+         print e
+         sys.exit(1)
+
+
+   def getLatencyStats(self):
+      '''Returns a dictionary with the latency percentiles of the client stage (see kuatroLatency.py)'''
+
+      return self.latencyStats.getStats()
+
+
+   def getOutputModeReports(self):
+      '''Returns a dictionary with the output mode of each device (by device ID), and, for adaptive devices,
+         why it was chosen and the frame time stats behind the choice (see kuatroOutputMode.py)'''
+
+      reports = {}
+      for device in self.devices:
+         if device.modePolicy is not None:
+            reports[device.deviceID] = device.modePolicy.getReport()
+         else:
+            reports[device.deviceID] = {"mode" : device.sensor.getOutputMode()}
+      return reports
+
+
+   def start(self):
+      ''' Start the Kinect tracking '''
+
+      self.isRunning = True
+      for device in self.devices:
+         device.deviceThread.start()
+      self.senderThread.start()
+
+   def stop(self):
+      ''' Stop the Kinect tracking '''
+
+      self.isRunning = False
+
+
+class KuatroDevice():
+   ''' One sensor of a Kuatro Client, known to the Kuatro Server by its own device ID, with its own users and
+       calibration.  A device captures frames on its own thread, and queues them for the client to send. '''
+
+   MAX_FRAME_ERRORS = 30   # failed frames in a row (about a second) after which the device is stopped
+
+   def __init__(self, client, sensor, deviceID, calibrationName):
+
+      self.client = client
+      self.sensor = sensor
+      self.deviceID = deviceID                    # the clientID of this device on the Kuatro Server
+      self.calibrationName = calibrationName      # (calibration data is saved to calibrationName.calibrationData.p)
+      self.users = []                             # list of users being tracked by this device
+
+      self.frameID = 0
+      self.captureTime = None
+
+      self.occupancyRate = client.occupancyRate
+      self.lastOccupancyTime = 0       # when the last grid was computed
+      self.lastOccupancyRuns = None    # and the last grid sent (run-length encoded)
+      self.lastOccupancyKeyframe = 0   # and when (grids are sent when they change, and once a second anyway)
+
+      self.modePolicy = None           # picks the output mode, if it is adaptive
+      self.isRunning = True            # set to False when the device fails (the other devices keep running)
+
+      # initiate Timer variable
+      self.timer = None
 
 
    ##############################
@@ -71,7 +351,7 @@ class KuatroKinectClient():
    ##############################
 
    def addUser(self, userID):
-      ''' Adds a new user to the Client when a new user is detected by the Kinect. 
+      ''' Adds a new user to the Client when a new user is detected by the Kinect.
           Send the corresponding OSC Message to the Kuatro Server '''
 
       if userID not in self.users:     # make sure user is not already being tracked.
@@ -81,59 +361,118 @@ class KuatroKinectClient():
          #  (this is necessary becuase Kinect coordinates are not available when user is first
          #   picked up by the Kinect)
          def delayNewUser(userID):
-            point = self.userGen.getUserCoM(userID)            # get the location of the users Center of Mass
-            x, y, z = point.getX(), point.getY(), point.getZ() # break it down into X, Y, Z values
-            self.oscServer.sendMessage(KuatroKinectClient.NEW_USER_MESSAGE, userID, x, y, z, self.clientID)
+            x, y, z = self.sensor.getUserCoM(userID)            # get the location of the users Center of Mass
+            self.client.oscServer.sendReliable(KuatroKinectClient.NEW_USER_MESSAGE, userID, x, y, z, self.deviceID)
             # print "User Added:", userID, "location", x, y, z
 
          delay = 100  # 1/10 of second in milliseconds
          timer = Timer(delay, delayNewUser, [userID], False)
          timer.start()
 
+         if self.client.jointMask:   # joints are tracked once the skeleton is calibrated (no calibration pose needed)
+            self.sensor.requestSkeleton(userID)
+
    def removeUser(self, userID):
-      ''' Removes a user from the Client when a lost user is detected by the Kinect.  
+      ''' Removes a user from the Client when a lost user is detected by the Kinect.
           Send the corresponding OSC message to the Kuatro Server '''
 
       if userID in self.users:      # make sure user is being tracked
          self.users.remove(userID)     # then remove it
 
-         self.oscServer.sendMessage(KuatroKinectClient.LOST_USER_MESSAGE, userID, self.clientID)
+         self.client.oscServer.sendReliable(KuatroKinectClient.LOST_USER_MESSAGE, userID, self.deviceID)
 
 
-   def sendAllUserCoords(self):
-      ''' Sends all user coordinates via OSC Messages to the Kuatro Server. 
-          This happens for each Kautro Frame '''
+   def captureFrame(self):
+      ''' Reads all user coordinates (and joints and occupancy grid, if any) of this frame, and queues
+          them for the client to send.  This happens for each Kautro Frame '''
 
+      coordinates = []
       for userID in self.users:                       # for all users being tracked
-         point = self.userGen.getUserCoM(userID)            # get the location of the users Center of Mass
-         x, y, z = point.getX(), point.getY(), point.getZ() # break it down into X, Y, Z values
+         x, y, z = self.sensor.getUserCoM(userID)            # get the location of the users Center of Mass
 
          # coordinates of 0, 0, 0 means user is temporarily lost
          # reduce OSC messages by not sending if all 3 are 0
          if x != 0 or y != 0 or z != 0:
-            self.oscServer.sendMessage(KuatroKinectClient.USER_COORDINATES_MESSAGE, userID, x, y, z, self.clientID)  # and send it
-            # print "User:", userID, "location", x, y, z
+            coordinates.append((userID, x, y, z))
+
+      joints = []
+      if self.client.jointMask:
+         for userID in self.users:
+            if self.sensor.isSkeletonTracking(userID):
+               joints.append((userID, self.sensor.getJointPositions(userID)))
+
+      occupancy = None
+      if self.occupancyRate:
+         occupancy = self.readOccupancy()
+
+      captureTime = self.captureTime
+      if captureTime is None:   # (the clock is not synchronized yet)
+         captureTime = -1
+
+      self.client.queueFrame(self, (self.frameID, captureTime, coordinates, joints, occupancy))
+
+
+   def readOccupancy(self):
+      ''' Returns the occupancy grid of the calibrated space (see kuatroOccupancy.py), run-length encoded, at most
+          occupancyRate times per second (None otherwise).  A cell is occupied if the depth of a user pixel
+          projects into it, seen from above. '''
+
+      now = time.time()
+      if now - self.lastOccupancyTime < 1.0 / self.occupancyRate:
+         return None
+      if not hasattr(self, "maxZ") or self.maxX <= self.minX or self.maxZ <= self.minZ:   # not calibrated (yet)
+         return None
+      self.lastOccupancyTime = now
+
+      grid = self.occupancyGrid
+      grid.clear()
+
+      # this frame's depth map and user pixels, read a row at a time
+      depth, labels = self.sensor.getDepthFrame()
+      width = self.depthWidth
+
+      columnScale = grid.width / float(self.maxX - self.minX)
+      rowScale = grid.height / float(self.maxZ - self.minZ)
+
+      for v in range(0, self.depthHeight, KuatroKinectClient.OCCUPANCY_ROW_STEP):
+
+         labels.position(v * width)
+         labels.get(self.labelRow)
+         depth.position(v * width)
+         depth.get(self.depthRow)
+
+         for u in range(0, width, KuatroKinectClient.OCCUPANCY_COLUMN_STEP):
+            z = self.depthRow[u]
+            if self.labelRow[u] != 0 and z > 0:                   # a user pixel (with a depth)
+
+               x = (u / float(width) - 0.5) * z * self.xzFactor   # project it to real world x (in mm, like z)
+               column = int((x - self.minX) * columnScale)
+               row = int((z - self.minZ) * rowScale)
+               if 0 <= column < grid.width and 0 <= row < grid.height:
+                  grid.set(column, row)
+
+      runs = grid.encode()
+      if runs != self.lastOccupancyRuns or now - self.lastOccupancyKeyframe >= 1.0:
+         self.lastOccupancyRuns = runs
+         self.lastOccupancyKeyframe = now
+         return runs
+
+      return None
+
 
-      
 
    ####################################
    ###### Calibration Process #########
    ####################################
 
    def calibrateWithServer(self):
-      '''Calibrate the device with the Kuatro Server by finding the 
+      '''Calibrate the device with the Kuatro Server by finding the
          minimum and maximum coordinate values that the device outputs'''
 
       # Try to load the file if it is there...
       try:
          # load serialized data
-         hostname = socket.gethostname()  # find computers host name
-
-         # Uncomment out if too many files are being created by pickle.
-         # Make sure to uncomment the same line in calibrationStop
-         hostname = hostname.split(".")[0]  # parse the hostname and get the first part of the name so that we just get the name of the computer and not the network domain.
-
-         calibrationFile = open( hostname + ".calibrationData.p", "rb" )   # open the file to read calibration data (apend host name to file for unique ID)
+         calibrationFile = open( self.calibrationName + ".calibrationData.p", "rb" )   # open the file to read calibration data (apend host name to file for unique ID)
          calibrationData = pickle.load( calibrationFile)       # read calibration data
          calibrationFile.close()                               # close the file
 
@@ -146,16 +485,18 @@ class KuatroKinectClient():
          self.maxZ = calibrationData["maxZ"]
 
          # send calibration info to server
-         self.oscServer.sendMessage(KuatroKinectClient.CALIBRATE_DEVICE_MESSAGE, self.clientID, self.minX, self.minY, self.minZ, self.maxX, self.maxY, self.maxZ)
-         
-         print "Kinect Calibrated:", self.clientID
+         self.client.oscServer.sendReliable(KuatroKinectClient.CALIBRATE_DEVICE_MESSAGE, self.deviceID, self.minX, self.minY, self.minZ, self.maxX, self.maxY, self.maxZ)
+
+         print "Kinect Calibrated:", self.deviceID
          print "Min Values", self.minX, self.minY, self.minZ
          print "Max Values", self.maxX, self.maxY, self.maxZ
-      
+
       # The file was not there, so let the user know there is no calibration data
       except:
          # should only reach here if server has never been calibrated.
-         self.display.drawLabel("No calibration data found.  Please run calibration process.", 20, 20, Color.WHITE)  # update user message to let them know they need to run the calibration process
+         display = self.client.display
+         if display is not None:
+            display.drawLabel("No calibration data found.  Please run calibration process.", 20, 20, Color.WHITE)  # update user message to let them know they need to run the calibration process
 
          # Since there are no starting values initiate with arbitrary values UPDATE:  This should be standard kinect values to start with
          self.minX = 100000000000  # set min values to an arbitray high value so we know that min values will be smaller
@@ -172,21 +513,23 @@ class KuatroKinectClient():
          maxX = 5000
          maxY = -1000
          maxZ = 15000
-         self.oscServer.sendMessage(KuatroKinectClient.CALIBRATE_DEVICE_MESSAGE, self.clientID, minX, minY, minZ, maxX, maxY, maxZ)
+         self.client.oscServer.sendReliable(KuatroKinectClient.CALIBRATE_DEVICE_MESSAGE, self.deviceID, minX, minY, minZ, maxX, maxY, maxZ)
 
 
 
    def  calibrationStart(self):
-      ''' This is the Calibration Start Menu Item Callback function. It is 
+      ''' This is the Calibration Start Menu Item Callback function. It is
           used to calibrate the Kinect Device with the installation space. '''
 
-      # remove initial instructions
-      self.display.remove(self.instructions)
+      display = self.client.display
+      if display is not None:
+         # remove initial instructions
+         display.remove(self.client.instructions)
 
-      # add label for instructions
-      self.instructionsLine1 = self.display.drawLabel("Zig-Zag through the room for the system to find", 20, 175, Color.WHITE)
-      self.instructionsLine2 = self.display.drawLabel("the space that it can sense (the light will be green).", 20, 200, Color.WHITE)
-      self.instructionsLine3 = self.display.drawLabel("Select Calibrate > Stop when done.", 20, 225, Color.WHITE)
+         # add label for instructions
+         self.instructionsLine1 = display.drawLabel("Zig-Zag through the room for the system to find", 20, 175, Color.WHITE)
+         self.instructionsLine2 = display.drawLabel("the space that it can sense (the light will be green).", 20, 200, Color.WHITE)
+         self.instructionsLine3 = display.drawLabel("Select Calibrate > Stop when done.", 20, 225, Color.WHITE)
 
       # Recalibrating so reseting starting min and max values to arbitary high and low values
       self.minX = 100000000000  # set min values to an arbitray high value so we know that min values will be smaller
@@ -200,12 +543,11 @@ class KuatroKinectClient():
 
       def calibration():
          ''' Timer Function to run the calibration '''
-         
+
          userInSpace = False  # assume there is a user not in the space (used to update background color)
 
          for userID in self.users:
-            point = self.userGen.getUserCoM(userID)            # get the location of the users Center of Mass
-            x, y, z = point.getX(), point.getY(), point.getZ() # break it down into X, Y, Z values
+            x, y, z = self.sensor.getUserCoM(userID)            # get the location of the users Center of Mass
 
             # check if values are smaller than current min values
             self.minX = min(x, self.minX)
@@ -223,21 +565,24 @@ class KuatroKinectClient():
          if len(self.users) == 0:      # if there are no users being tracked then no users in space
             userInSpace = False
 
+         if display is None:
+            return
+
          if userInSpace:  # is a user in the kinect viewing space
-            self.display.setColor(Color.GREEN)     # then make background green
+            display.setColor(Color.GREEN)     # then make background green
          else:
-            self.display.setColor(Color.RED)       # otherwise make it red
+            display.setColor(Color.RED)       # otherwise make it red
 
 
 
       # Create the timer
-      delay = 1/KuatroKinectClient.FRAME_RATE  * 1000   # milliseconds per frame
+      delay = 1000 / self.sensor.FRAME_RATE   # milliseconds per frame
       self.timer = Timer(delay, calibration)
       self.timer.start()  # and start it
 
 
    def calibrationStop(self):
-      ''' Callback function for the Menu Item, Stop.  Stops the Calbration process 
+      ''' Callback function for the Menu Item, Stop.  Stops the Calbration process
           and sends the updated information to the server '''
 
 
@@ -245,143 +590,146 @@ class KuatroKinectClient():
          self.timer.stop() # if so then stop it
 
          # now that we are done remove labels
-         self.display.remove(self.instructionsLine1)
-         self.display.remove(self.instructionsLine2)
-         self.display.remove(self.instructionsLine3)
+         display = self.client.display
+         if display is not None:
+            display.remove(self.instructionsLine1)
+            display.remove(self.instructionsLine2)
+            display.remove(self.instructionsLine3)
 
          # and save data with pickle
          calibrationData = { "minX" : self.minX , "minY" : self.minY , "minZ" : self.minZ , "maxX" : self.maxX , "maxY" : self.maxY , "maxZ" : self.maxZ }
-         hostname = socket.gethostname() # find computers host name
 
-         # Uncomment out if too many files are being created by pickle.
-         # Make sure to uncomment the same line in calibrateWithServer
-         hostname = hostname.split(".")[0]  # parse the hostname and get the first part of the name so that we just get the name of the computer and not the network domain.
-
-
-         calibrationFile = open( hostname + ".calibrationData.p", "wb" )   # open file to write data (apend host name to file for unique ID)
+         calibrationFile = open( self.calibrationName + ".calibrationData.p", "wb" )   # open file to write data (apend host name to file for unique ID)
          pickle.dump( calibrationData,  calibrationFile)       # write calibration data
          calibrationFile.close()                               # close the file
 
          self.calibrateWithServer() # and recalibrate with the Server
 
-         self.instructions = self.display.drawLabel("Calibration data saved and sent to server", 20, 200, Color.WHITE)
          print "Calibration data saved and sent to server"
 
-         self.display.setColor(Color.BLACK)  # set background to black since we are no longer calibrating
+         if display is not None:
+            self.client.instructions = display.drawLabel("Calibration data saved and sent to server", 20, 200, Color.WHITE)
+            display.setColor(Color.BLACK)  # set background to black since we are no longer calibrating
 
 
    ####################################
-   ######### Client Setup #############
+   ######### Device Setup #############
    ####################################
-   
-   def configureKinect(self):
-      '''Configure the Motion Sensing device with the OpenNI and Nite
-         framework protocols'''
 
-      try:
-         # Configuration per OpenNI and NITE framework settings
-         self.context = Context()
-         license = License("PrimeSense", "0KOIk2JeIBYClPWVnMoRKn5cdY4=")
-         self.context.addLicense(license)
-         
-         self.depthGen = DepthGenerator.create(self.context)
-         mapMode = MapOutputMode(640, 480, KuatroKinectClient.FRAME_RATE)      # Requires 640 and 480 as x and y.  Will need to use mapValue to change to coords on current display.
-         self.depthGen.setMapOutputMode(mapMode)
-
-         self.context.setGlobalMirror(True)
-         self.userGen = UserGenerator.create(self.context)
-         
-         self.context.startGeneratingAll()
-
-         # setup Observers for new / lost Detection events
-         self.userGen.getNewUserEvent().addObserver(NewUserDetector(self))             # new user enters the viewing area
-         self.userGen.getLostUserEvent().addObserver(LostUserDetector(self))           # user leaves the viewing area
-
-         # setup thread to run Device
-         self.clientThread = Thread(target = self.run)
-
-         self.start()
-         print "Kuatro Device Configured and Started"
-
-      except StatusException, e:
-         print "Something went wrong.  Device not started."
-         print e
-         sys.exit(1)
-      except Exception, e:
-         print "Something went wrong.  Device not started."
-         print e
-         sys.exit(1) 
+   def configure(self):
+      '''Configure the Motion Sensing device (via its sensor backend, see kuatroSensor.py)'''
 
+      self.sensor.start(self)   # start generating frames (new and lost users come to addUser() and removeUser())
 
+      # setup skeleton tracking (only if joints were asked for)
+      if self.client.jointMask and not self.sensor.startSkeletons(jointNames(self.client.jointMask)):
+         print "This sensor can not track skeletons.  Joints will not be sent."
+         self.client.jointMask = 0
 
+      if self.client.outputMode is not None:
+         self.sensor.setOutputMode(self.client.outputMode)
 
-   def run(self):
-      '''Start the Client via a seperate thread '''
+      # setup the occupancy grid (only if grids were asked for)
+      if self.occupancyRate:
+         if self.sensor.getDepthSize() is None:
+            print "This sensor has no depth frames.  Occupancy grids will not be sent."
+            self.occupancyRate = 0
+         else:
+            self.configureOccupancy()
+            self.occupancyGrid = OccupancyGrid(KuatroKinectClient.OCCUPANCY_WIDTH, KuatroKinectClient.OCCUPANCY_HEIGHT)
+
+      # setup the output mode policy (only if the mode is adaptive, and the sensor has modes to choose from)
+      if self.client.adaptiveMode:
+         modes = [mode for mode in self.sensor.getOutputModes() if mode in OUTPUT_MODES]
+         if len(modes) < 2:
+            print "This sensor has no output modes to choose from.  Its output mode will not change."
+         else:
+            mode = self.sensor.getOutputMode()
+            if mode not in modes:   # start in a mode the policy knows (e.g., a simulated sensor has none until one is set)
+               matching = [candidate for candidate in modes if candidate[2] == self.sensor.FRAME_RATE]
+               mode = (matching or modes)[0]
+               self.sensor.setOutputMode(mode)
+               if self.occupancyRate:
+                  self.configureOccupancy()
 
-      while self.isRunning:   # is the Kinect Running?
-         try:
-            self.context.waitAnyUpdateAll()  # then update the frame
-            self.sendAllUserCoords()         # and send all coordinate values
-            # raise StatusException()
-         except:
-
-            print errorStack
-            sys.exit(1)
-   
-   def start(self):
-      ''' Start the Kinect tracking '''
+            needsDepth = bool(self.client.jointMask or self.occupancyRate)   # (skeletons and occupancy grids need the full resolution)
+            self.modePolicy = OutputModePolicy(modes, self.client.cpuBudget, needsDepth)
+            self.modePolicy.setMode(mode)
 
-      self.isRunning = True
-      self.clientThread.start()
+      # setup thread to run Device
+      self.deviceThread = Thread(target = self.run)
 
-   def stop(self):
-      ''' Stop the Kinect tracking '''
 
-      self.isRunning = False
+   def configureOccupancy(self):
+      '''Sets up reading the depth frames for the occupancy grid (again, when the output mode changes)'''
 
+      self.depthWidth, self.depthHeight = self.sensor.getDepthSize()
+      self.depthRow = jarray.zeros(self.depthWidth, 'h')   # one row of the depth map, and of the user pixels
+      self.labelRow = jarray.zeros(self.depthWidth, 'h')   # (reused for every row of every frame)
+      self.xzFactor = math.tan(self.sensor.getHorizontalFieldOfView() / 2) * 2   # real world width per mm of depth
 
-#########################################################
-####### User Detection Observers(Listeners) #############
-#########################################################
 
+   def switchOutputMode(self, mode):
+      '''Switches the sensor to output mode (between frames, on the device thread)'''
 
-# Observer class that detects when a new user enters the viewing space.  Upon detection
-# of a new user the update method is called.  
-class NewUserDetector(IObserver):
+      self.sensor.setOutputMode(mode)
+      self.modePolicy.setMode(mode)
+      if self.occupancyRate:
+         self.configureOccupancy()
 
-   def __init__(self, client):
-      self.client = client
+      print "Device", self.deviceID, "output mode", modeName(mode), "(" + self.modePolicy.reason + ")"
 
-   def update(self, observable, args):
 
-      try:
+   def run(self):
+      '''Start the Device via a seperate thread '''
+
+      errors = 0   # frames in a row that failed
 
-         # update kuatro client with new user id
-         userID = args.getId()
-         self.client.addUser(userID)
+      while self.client.isRunning and self.isRunning:   # is the Kinect Running?
+         try:
+            self.sensor.waitForFrame()       # then update the frame
+            start = time.time()
+            self.stampFrame()                # give it an ID and capture time
+            self.captureFrame()              # and queue all coordinate values
 
-         print "New User Detected.  ID:", userID
+            if self.modePolicy is not None:  # measure the frame, and pick the output mode
+               self.modePolicy.addFrame(len(self.users), (time.time() - start) * 1000)
+               mode = self.modePolicy.choose(len(self.users))
+               if mode != self.modePolicy.mode:
+                  self.switchOutputMode(mode)
+            errors = 0
 
-      except Exception, e:
+         except Exception, e:   # (a transient error skips the frame; a sensor that keeps failing stops this device only)
+            errors = errors + 1
+            print "Error in frame", self.frameID, "of device", self.deviceID
+            traceback.print_exc()
 
-         print e
+            if errors >= KuatroDevice.MAX_FRAME_ERRORS:
+               print "Device", self.deviceID, "stopped after", errors, "failed frames in a row"
+               self.isRunning = False
 
-# Observer class that detects when a user exits the viewing space (there is a 10 second delay).
-# Upon detection of a lost user the update method is called.  
-class LostUserDetector(IObserver):
+      self.sensor.stop()   # (once the last frame is done)
 
-   def __init__(self, client):
-      self.client = client
-      
+      if not self.isRunning:   # the device failed, so its users are gone
+         self.client.dropFrame(self)
+         for userID in self.users[:]:
+            self.removeUser(userID)
 
-   def update(self, observable, args):
+   def stampFrame(self):
+      ''' Gives the current frame the next frame ID, and its capture time on the server clock (once the clock
+          is synchronized; see kuatroLatency.py) '''
 
-      # lost user so remove from kuatro client
-      userID = args.getId()
-      self.client.removeUser(userID)
+      self.frameID = self.frameID + 1
 
-      print "User", userID, "lost"
+      clock = self.client.clock
+      if clock is not None and clock.isSynchronized():
+         self.captureTime = clock.serverTime()
 
 
 if __name__ == '__main__':
-   kinectClient = KuatroKinectClient() # Create and start the Kinect Client
+
+   if len(sys.argv) > 1:   # several Kinects on this computer
+      from kuatroOpenNISensor import OpenNISensor
+      kinectClient = KuatroKinectClient(sensor = [OpenNISensor(KuatroKinectClient.FRAME_RATE, i) for i in range(int(sys.argv[1]))])
+   else:
+      kinectClient = KuatroKinectClient() # Create and start the Kinect Client
@@ -0,0 +1,213 @@
+# kuatroLatency.py       Version  1.0     19-Oct-2026
+#
+# Latency tracing across the Kuatro pipeline.  A Kuatro client stamps every frame with a frame
+# ID and its capture time, and the stamps travel with the coordinates of the frame through the
+# Kuatro Server (calibration and fan-out) to the views.  Each component measures the stages it
+# can see, so a visual lag can be traced to the sensor, the server, the network or the view:
+#
+#     client      capture to coordinates sent (frame processing on the client)
+#     toServer    capture to coordinates received by the server (client and network)
+#     server      received to sent to the views (calibration and fan-out)
+#     toView      sent by the server to received by the view (network)
+#     render      received by the view to drawn
+#     endToEnd    capture to drawn
+#
+# Timestamps are integer milliseconds on the clock of the Kuatro Server (milliseconds since
+# the server process started).  Clients and views keep their offset to the server clock with
+# a ClockSync, which pings the server every few seconds (like NTP, the round trip with the
+# smallest delay gives the best estimate of the offset):
+#
+#     client / view to server:   /kuatro/clockPing , ipAddress, port, pingTime
+#     server to client / view:   /kuatro/clockPong , pingTime, serverTime
+#
+# Timestamps are trailing arguments, so older components simply ignore them:
+#
+#     client to server:   /kuatro/userCoordinates , userID, x, y, z, clientID, frameID, captureTime
+#     server to views:    /kuatro/userCoordinates , userID, x, y, z, worldSeq, frameID, captureTime, sendTime
+#
+# (Coordinates resampled to a view's output rate carry frame ID -1, and a capture time interpolated
+# between the capture times of the frames they come from, see kuatroResampler.py.)
+#
+# Usage:
+#
+#     clock = ClockSync(dispatcher, serverOut, ipAddress, port)
+#     captureTime = clock.serverTime()
+#     stats = LatencyStats(["toView", "render"])
+#     stats.add("toView", clock.serverTime() - sendTime)
+#     stats.printReport("View latency")
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from timer import Timer
+from threading import Lock
+import array
+import time
+
+CLOCK_PING_MESSAGE = "/kuatro/clockPing"
+CLOCK_PONG_MESSAGE = "/kuatro/clockPong"
+
+PROCESS_START = time.time()
+
+
+def milliseconds():
+   '''Returns the milliseconds since this process started (the clock of Kuatro timestamps)'''
+
+   return int((time.time() - PROCESS_START) * 1000)
+
+
+class ClockOffsetEstimator():
+   '''Estimates the offset of a remote clock from ping round trips'''
+
+   def __init__(self, history = 8):
+
+      self.history = history     # round trips kept (the one with the smallest delay is used)
+      self.samples = []          # the last round trips, [(roundTrip, offset), ...]
+
+
+   def addSample(self, pingTime, remoteTime, pongTime):
+      '''Adds a round trip: the ping was sent at pingTime (local clock), answered at remoteTime
+         (remote clock), and the answer arrived at pongTime (local clock)'''
+
+      roundTrip = pongTime - pingTime
+      offset = remoteTime - (pingTime + pongTime) / 2.0    # assumes the delay is the same both ways
+
+      self.samples = self.samples[-(self.history - 1):] + [(roundTrip, offset)]
+
+
+   def isSynchronized(self):
+      return len(self.samples) > 0
+
+
+   def getOffset(self):
+      '''Returns the offset of the remote clock (remote time minus local time, in milliseconds)'''
+
+      if not self.samples:
+         return 0
+
+      return min(self.samples)[1]     # the round trip with the smallest delay has the smallest error
+
+
+   def getRoundTrip(self):
+      if not self.samples:
+         return None
+
+      return min(self.samples)[0]
+
+
+   def toRemoteTime(self, localTime):
+      return int(localTime + self.getOffset())
+
+
+class ClockSync():
+   '''Keeps the offset of this process's clock to the Kuatro Server's clock, by pinging the server every interval'''
+
+   def __init__(self, dispatcher, serverOut, ipAddress, port, interval = 2000):
+
+      self.serverOut = serverOut       # Out port to the server
+      self.ipAddress = ipAddress       # where the server sends the answers (the port of dispatcher)
+      self.port = port
+      self.estimator = ClockOffsetEstimator()
+
+      dispatcher.onInput(CLOCK_PONG_MESSAGE, self.receivePong)
+
+      self.timer = Timer(interval, self.sendPing)
+      self.timer.start()
+      self.sendPing()
+
+
+   def sendPing(self):
+      self.serverOut.sendMessage(CLOCK_PING_MESSAGE, self.ipAddress, self.port, milliseconds())
+
+
+   def receivePong(self, message):
+
+      args = message.getArguments()
+      pingTime = args[0]
+      serverTime = args[1]
+
+      self.estimator.addSample(pingTime, serverTime, milliseconds())
+
+
+   def serverTime(self):
+      '''Returns the current time on the server's clock (in milliseconds)'''
+
+      return self.estimator.toRemoteTime(milliseconds())
+
+
+   def isSynchronized(self):
+      return self.estimator.isSynchronized()
+
+
+   def stop(self):
+      self.timer.stop()
+
+
+class LatencyStats():
+   '''Keeps the most recent latencies of each stage of the pipeline, and reports their percentiles'''
+
+   HISTORY = 1000   # latencies kept per stage
+
+   def __init__(self, stages):
+
+      self.stages = stages     # stage names, in the order they are reported
+      self.latencies = {}      # maps a stage to a ring buffer of its latencies (in milliseconds)
+      self.counts = {}         # maps a stage to the number of latencies measured (the ring buffer holds the last HISTORY)
+      for stage in stages:
+         self.latencies[stage] = array.array('d', [0.0] * LatencyStats.HISTORY)
+         self.counts[stage] = 0
+
+      self.lock = Lock()
+
+
+   def add(self, stage, latency):
+      '''Adds a latency (in milliseconds) of stage'''
+
+      self.lock.acquire()
+      try:
+         self.latencies[stage][self.counts[stage] % LatencyStats.HISTORY] = latency
+         self.counts[stage] = self.counts[stage] + 1
+      finally:
+         self.lock.release()
+
+
+   def getStats(self):
+      '''Returns a dictionary with the median, 95th and 99th percentile, and maximum latency (in milliseconds)
+         of each stage, e.g. stats["toView"]["p95"]'''
+
+      stats = {}
+      for stage in self.stages:
+
+         self.lock.acquire()
+         try:
+            latencies = list(self.latencies[stage][0 : min(self.counts[stage], LatencyStats.HISTORY)])
+         finally:
+            self.lock.release()
+
+         stats[stage] = {"measured" : self.counts[stage]}
+
+         if latencies:
+            latencies.sort()
+            stats[stage]["p50"] = latencies[int(len(latencies) * 0.50)]
+            stats[stage]["p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            stats[stage]["p99"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            stats[stage]["max"] = latencies[-1]
+
+      return stats
+
+
+   def printReport(self, title):
+      '''Prints the latency percentiles of every stage (e.g., from a Timer, to watch them during a show)'''
+
+      stats = self.getStats()
+
+      print
+      print title, "(ms)"
+      print "%-10s %10s %10s %10s %10s %10s" % ("stage", "measured", "p50", "p95", "p99", "max")
+      for stage in self.stages:
+         if "p50" in stats[stage]:
+            print "%-10s %10d %10.1f %10.1f %10.1f %10.1f" % (stage, stats[stage]["measured"], stats[stage]["p50"],
+                  stats[stage]["p95"], stats[stage]["p99"], stats[stage]["max"])
+         else:
+            print "%-10s %10d" % (stage, 0)
+      print
@@ -0,0 +1,152 @@
+# kuatroLauncher.py       Version  1.0     19-Oct-2026
+#
+# Starts the components of a Kuatro installation (server, clients, views, theGlaser) in
+# parallel.  Starting them one after the other makes the time to the first sound the sum
+# of all startup times (sensor configuration, DNS lookups, decoding audio, opening
+# displays).  The launcher starts every component on its own thread as soon as the
+# components it depends on are ready (e.g., a client depends on the server it registers
+# with), and start() is a readiness barrier: it returns once every component is ready
+# (or failed, or timed out), so that the installation only goes live when all of it is up.
+# Then it prints a startup timing report.
+#
+# Usage:
+#
+#     launcher = KuatroLauncher()
+#     launcher.add("server", lambda: KuatroServer())
+#     launcher.add("client", lambda: KuatroKinectClient(), ["server"])
+#     launcher.add("glaser", lambda: theGlaser(audioList, False))
+#     launcher.start()
+#     server = launcher.get("server")
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from threading import Thread, Event
+import time
+import sys
+
+
+class KuatroLauncher():
+
+   def __init__(self, timeout = 120):
+
+      self.timeout = timeout       # seconds to wait for all components to be ready
+      self.components = []         # LaunchComponents, in the order they were added
+      self.componentsByName = {}
+      self.startTime = None
+
+
+   def add(self, name, function, dependsOn = []):
+      '''Adds a component; function creates (and returns) it, once the components named in dependsOn are ready'''
+
+      component = LaunchComponent(name, function, dependsOn)
+      self.components.append(component)
+      self.componentsByName[name] = component
+
+
+   def start(self):
+      '''Starts all components in parallel and waits until they are all ready (or failed, or timed out).
+         Returns True if all components are ready.'''
+
+      self.startTime = time.time()
+
+      for component in self.components:
+         thread = Thread(target = self.__launch__, args = [component])
+         thread.setDaemon(True)
+         thread.start()
+
+      # the readiness barrier
+      deadline = self.startTime + self.timeout
+      for component in self.components:
+         component.done.wait(max(0, deadline - time.time()))
+
+      self.printReport()
+
+      return len([component for component in self.components if not component.ready]) == 0
+
+
+   def get(self, name):
+      '''Returns the component created under name (None if it is not ready)'''
+
+      return self.componentsByName[name].result
+
+
+   def printReport(self):
+      '''Prints when each component started and became ready (in milliseconds since the launch)'''
+
+      print
+      print "Kuatro startup (ms since launch)"
+      print "%-16s %10s %10s %10s   %s" % ("component", "started", "ready", "took", "status")
+
+      for component in self.components:
+         started = self.__milliseconds__(component.startTime)
+         ready = self.__milliseconds__(component.readyTime)
+         took = "-"
+         if component.startTime is not None and component.readyTime is not None:
+            took = str(int((component.readyTime - component.startTime) * 1000))
+         print "%-16s %10s %10s %10s   %s" % (component.name, started, ready, took, component.getStatus())
+
+      print "%-16s %10s %10s" % ("all", "", self.__milliseconds__(time.time()))
+      print
+
+
+   def __launch__(self, component):
+      '''Waits for the dependencies of a component, then creates it (on its own thread)'''
+
+      for name in component.dependsOn:
+         dependency = self.componentsByName[name]
+         dependency.done.wait(max(0, self.startTime + self.timeout - time.time()))
+         if not dependency.ready:
+            component.error = "dependency " + name + " is not ready"
+            component.done.set()
+            return
+
+      component.startTime = time.time()
+      try:
+         try:
+            component.result = component.function()
+            component.ready = True
+         except SystemExit, e:   # (components exit when they can not configure themselves, e.g., with sys.exit(1))
+            component.error = "exited with status " + str(e.code)
+            print "Unable to start", component.name, "-", component.error
+         except:                 # (any other error, including Java exceptions)
+            component.error = sys.exc_info()[1]
+            print "Unable to start", component.name
+            print component.error
+      finally:
+         component.readyTime = time.time()
+         component.done.set()    # (always, so the readiness barrier and dependent components do not wait for the timeout)
+
+
+   def __milliseconds__(self, moment):
+      if moment is None:
+         return "-"
+      return str(int((moment - self.startTime) * 1000))
+
+
+class LaunchComponent():
+   '''A component started by the KuatroLauncher, and its startup state'''
+
+   def __init__(self, name, function, dependsOn):
+
+      self.name = name
+      self.function = function
+      self.dependsOn = dependsOn
+
+      self.result = None         # what function returned
+      self.ready = False
+      self.error = None
+      self.done = Event()        # set when the component is ready (or failed)
+
+      self.startTime = None
+      self.readyTime = None
+
+
+   def getStatus(self):
+      if self.ready:
+         return "ready"
+      elif self.error is not None:
+         return "failed (" + str(self.error) + ")"
+      elif self.startTime is not None:
+         return "timed out"
+      return "not started"
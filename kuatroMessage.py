@@ -0,0 +1,28 @@
+# kuatroMessage.py       Version  1.0     19-Oct-2026
+#
+# A KuatroMessage is a lightweight stand-in for the OSC messages delivered by OscIn.
+# It offers the same getAddress() and getArguments() methods, so Kuatro callbacks
+# can be handed messages that were unpacked from another message (e.g., a reliable
+# envelope) without knowing the difference.
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+class KuatroMessage():
+
+   def __init__(self, address, arguments):
+
+      self.address = address        # the OSC address of the message, e.g. "/kuatro/newUser"
+      self.arguments = arguments    # list of the message arguments
+
+
+   def getAddress(self):
+      '''Returns the OSC address of the message'''
+
+      return self.address
+
+
+   def getArguments(self):
+      '''Returns the list of message arguments'''
+
+      return self.arguments
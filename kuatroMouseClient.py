@@ -16,14 +16,23 @@
 # is set properly, and all should work fine, i.e., you should be able to control
 # the Audio Server via the GUI control surface by moving circles around.  
 #
+# Dragging a circle fires many more events per second than a sensor delivers frames, so
+# drag events only update the circle's latest coordinates, and a timer sends the latest
+# coordinates of the circles that moved, SEND_RATE times per second (like a 30 fps sensor).
+#
  
 from gui import *     # for circles, etc.
 from music import *   # for mapValue
 from osc import *     # for sending OSC messages
+from kuatroReliable import ReliableEndpoint   # for sending control messages reliably
+from kuatroDispatcher import KuatroDispatcher
+from timer import Timer
 
 kuatroServerOSC_PORT = 50505    # port for outgoing Kuatro OSC Server messages
+kuatroAckOSC_PORT = 50508       # port for incoming acks of control messages (newUser, lostUser, calibrateDevice)
 MAX_KuatroX = 1000              # max x coordinate for Kuatro virtual space
 MAX_KuatroY = 1000              # max y coordinate for Kuatro virtual space
+SEND_RATE = 30                  # coordinate messages sent per second (at most, per circle) while circles are dragged
 
 circleRadius = 30               # how wide user circles are (in pixels) 
 circleColor  = Color.YELLOW     # and its color
@@ -48,7 +57,9 @@ clientID = "asdfas"
 #
 
 ##### create an OSC output object ######
-oscOut = OscOut('localhost', kuatroServerOSC_PORT )  # send messages to OSC server on port 30303
+# control messages are acknowledged by the server (and retransmitted if not), coordinates are not
+endpoint = ReliableEndpoint(KuatroDispatcher(OscIn(kuatroAckOSC_PORT)), 'localhost', kuatroAckOSC_PORT)
+oscOut = endpoint.createOut('localhost', kuatroServerOSC_PORT )  # send messages to OSC server on port 50505
 
 
 ####
@@ -70,10 +81,10 @@ d = Display("Kuatro GUI Control", 800, 600, 0, 0, Color.BLACK)
 d.drawRectangle(380, 280, 420, 320, Color.WHITE, True)
 
 # simulate Kuatro user tracking
-# list of current users (being tracked) - parallel lists
-currentUsers       = []  # userIDs of current users
-currentCoordinates = []  # coordinates of current users
-currentUserCircles = []  # holds visual representation of current users
+# current users (being tracked) - keyed by userID
+currentUserCircles = {}  # maps the userID of each current user to its visual representation
+currentCoordinates = {}  # maps the userID of each current user to its coordinates
+pendingCoordinates = {}  # maps the userID of each user dragged since the last send to its latest coordinates (latest wins)
 
 ### create callback functions 
 #
@@ -91,7 +102,7 @@ currentUserCircles = []  # holds visual representation of current users
 
 
 # calibrating device
-oscOut.sendMessage("/kuatro/calibrateDevice", clientID, 0, 0, 0, 800, 1, 600) 
+oscOut.sendReliable("/kuatro/calibrateDevice", clientID, 0, 0, 0, 800, 1, 600) 
 
 def addUser(x, y):
    """Called when clicking on an empty display space.
@@ -111,15 +122,17 @@ def addUser(x, y):
    xValue = x
    yValue = y
 
+   # this circle's user (captured by the callback functions below)
+   userID = nextUserID
+
    # add user to local data structure
-   currentUsers.append( nextUserID ) 
-   currentCoordinates.append( [xValue, yValue] )
-   currentUserCircles.append( userCircle )
+   currentUserCircles[ userID ] = userCircle
+   currentCoordinates[ userID ] = [xValue, yValue]
    
    # send OSC message - /kuatro/newUser + userID + x, y coordinates
-   oscOut.sendMessage("/kuatro/newUser", nextUserID, xValue, 0, yValue, clientID)
+   oscOut.sendReliable("/kuatro/newUser", userID, xValue, 0, yValue, clientID)
    
-   print "--> new user", nextUserID, xValue, yValue
+   print "--> new user", userID, xValue, yValue
 
    # create ID for next user (if any)
    nextUserID = nextUserID + 1 
@@ -133,7 +146,7 @@ def addUser(x, y):
    def updateUserCoordinates(x, y):
       """Called when dragging a circle.
          It moves the circle to the new position,
-         and sends a "userCoordinates" OSC message.
+         and keeps its coordinates for the next "userCoordinates" OSC message.
       """
   
       # NOTE: By defining the function inside the addUser() function, we are 
@@ -153,21 +166,15 @@ def addUser(x, y):
       
       # print "move user", x, y
 
-      # through the userCircle, find user index in parallel data structure
-      userIndex = currentUserCircles.index( userCircle )
-
       # map display coordinates to Kuatro virtual space coordinates
       xValue = mapValue(x, 0, d.getWidth()-1, 0, MAX_KuatroX)
       yValue = mapValue(y, 0, d.getHeight()-1, MAX_KuatroY, 0)  # invert y coordinate!
 
-      # update user cordinates in local data structure
-      currentCoordinates[ userIndex ] = [xValue, yValue]  # update coordinates
+      # update user cordinates in local data structure (by the userID captured above)
+      currentCoordinates[ userID ] = [xValue, yValue]  # update coordinates
 
-      # retrieve userID   
-      userID = currentUsers[ userIndex ]
-   
-      # send OSC message - /kuatro/userCoordinates + userID + new coordinates
-      oscOut.sendMessage("/kuatro/userCoordinates", userID, xValue, 0, yValue, clientID)
+      # and send them with the next "userCoordinates" OSC message (replacing coordinates not sent yet)
+      pendingCoordinates[ userID ] = [xValue, yValue]
 
       # print "   ", userID, xValue, yValue
 
@@ -190,32 +197,29 @@ def addUser(x, y):
          and sends a "lostUser" OSC message.
       """
    
-      global nextUserID    # holds usedID for the next new user
-
       # NOTE: By defining the function inside the addUser() function, we are 
       # capturing and preserving the current value of 'userCircle' 
       # in this function definition.  This function will be defined again
       # and again, once for each circle created (user added).  It will always
       # remember the proper user / circle to delete, as explained here.
          
-      # through the userCircle, find user index in parallel data structure
-      userIndex = currentUserCircles.index( userCircle )
+      # coordinates not sent yet are of no use anymore
+      if userID in pendingCoordinates:
+         del pendingCoordinates[ userID ]
    
       # send OSC message - /kuatro/lostUser + userID + last known coordinates
-      oscOut.sendMessage("/kuatro/lostUser", currentUsers[ userIndex ], clientID)
+      oscOut.sendReliable("/kuatro/lostUser", userID, clientID)
                       
-      print "<-- lost user", currentUsers[ userIndex ]
+      print "<-- lost user", userID
 
-      # create ID for next user (if any) - we reuse earlier IDs
-      nextUserID = nextUserID - 1 
+      # (IDs are not reused, so that coordinates of a lost user can never move a new one)
 
       # delete circle
       d.remove( userCircle )
    
       # and remove user from local data structure
-      currentUsers.pop( userIndex ) 
-      currentCoordinates.pop( userIndex )
-      currentUserCircles.pop( userIndex )
+      del currentUserCircles[ userID ]
+      del currentCoordinates[ userID ]
 
       
    # now, create a pop-up menu to be able to delete this user by right clicking on the circle
@@ -223,8 +227,28 @@ def addUser(x, y):
    menu.addItem("remove", lostUser)
    userCircle.addPopupMenu(menu)
 
+def sendCoordinates():
+   """Called SEND_RATE times per second by the send timer.
+      It sends a "userCoordinates" OSC message with the latest
+      coordinates of every user dragged since the last call.
+   """
+
+   global pendingCoordinates
+
+   coordinates = pendingCoordinates
+   pendingCoordinates = {}
+
+   for userID, (xValue, yValue) in coordinates.items():
+      # send OSC message - /kuatro/userCoordinates + userID + new coordinates
+      oscOut.sendMessage("/kuatro/userCoordinates", userID, xValue, 0, yValue, clientID)
+
 # register callback function
 d.onMouseClick(addUser)
+
+# send the coordinates of dragged circles at (most) SEND_RATE times per second
+# (the timer runs on the GUI thread, like the drag events, so they never interleave)
+sendTimer = Timer(int(1000 / SEND_RATE), sendCoordinates)
+sendTimer.start()
      
 
 
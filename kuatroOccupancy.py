@@ -0,0 +1,94 @@
+# kuatroOccupancy.py       Version  1.0     19-Oct-2026
+#
+# Occupancy grids: a coarse overhead map of where people are, i.e. which cells of the
+# space are covered by a user's silhouette.  Kuatro clients compute a grid from every depth
+# frame (over the space they were calibrated to), and the Kuatro Server merges the grids of
+# all clients into one occupancy map of the Virtual World for visual views.  A grid of
+# 64 x 48 cells is a few hundred bytes per message instead of the 600 KB of a depth frame.
+#
+# Grids are sent run-length encoded, as the lengths of alternating runs of empty and
+# occupied cells (row by row, starting with a run of empty cells, which may be 0):
+#
+#     client to server:   /kuatro/occupancy , clientID, width, height, run, run, run, ...
+#     server to views:    /kuatro/occupancyMap , width, height, run, run, run, ..., worldSeq
+#
+# Grids are only sent when they change (and once a second anyway, so a lost message is
+# soon repaired).
+#
+# Usage:
+#
+#     grid = OccupancyGrid(64, 48)
+#     grid.set(10, 20)
+#     runs = grid.encode()
+#     other = OccupancyGrid(64, 48)
+#     other.decode(runs)
+#     other.decode(moreRuns, False)     # merge another grid into it
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+import array
+
+
+class OccupancyGrid():
+   '''A width x height grid of empty (0) and occupied (1) cells, stored row by row'''
+
+   def __init__(self, width = 64, height = 48):
+
+      self.width = width
+      self.height = height
+      self.cells = array.array('b', [0] * (width * height))
+      self.empty = array.array('b', [0] * (width * height))   # (to clear the cells with one bulk copy)
+
+
+   def clear(self):
+      self.cells[:] = self.empty
+
+
+   def set(self, column, row):
+      '''Marks the cell at column, row as occupied'''
+
+      self.cells[row * self.width + column] = 1
+
+
+   def isOccupied(self, column, row):
+      return self.cells[row * self.width + column] == 1
+
+
+   def getOccupiedCount(self):
+      return self.cells.count(1)
+
+
+   def encode(self):
+      '''Returns the run-length encoding of the grid, i.e. a list of alternating empty and occupied run lengths'''
+
+      runs = []
+      value = 0        # runs start with empty cells
+      length = 0
+      for cell in self.cells:
+         if cell == value:
+            length = length + 1
+         else:
+            runs.append(length)
+            value = cell
+            length = 1
+      runs.append(length)
+
+      return runs
+
+
+   def decode(self, runs, clear = True):
+      '''Sets the cells from a run-length encoding (see encode()).  With clear = False, the occupied
+         cells are added to the cells already occupied (i.e., grids are merged).'''
+
+      if clear:
+         self.clear()
+
+      i = 0
+      value = 0
+      for length in runs:
+         if value == 1:
+            for j in range(i, min(i + length, len(self.cells))):
+               self.cells[j] = 1
+         i = i + length
+         value = 1 - value
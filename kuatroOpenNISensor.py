@@ -0,0 +1,267 @@
+# kuatroOpenNISensor.py       Version  1.0     19-Oct-2026
+#
+# The depth sensor backend of the Kuatro Client (see kuatroSensor.py), for the Microsoft Kinect,
+# model 1414, and the Asus Xtion Pro, via the OpenNI and NITE frameworks.  It tracks the center
+# of mass of users, their skeleton joints (once asked for), and provides the depth map and
+# user pixels of every frame.
+#
+# With several sensors connected to one computer, each OpenNISensor is given the number of its
+# device (0, 1, ...).  They then share one OpenNI context, and each waits for the frames of its
+# own device only.
+#
+# Usage:
+#
+#     sensor = OpenNISensor()
+#     client = KuatroKinectClient(sensor = sensor)    # (the default sensor of the client)
+#     client = KuatroKinectClient(sensor = [OpenNISensor(30, 0), OpenNISensor(30, 1)])
+#     sensor = OpenNISensor(outputMode = (320, 240, 60))     # (see kuatroOutputMode.py)
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroSensor import KuatroSensor
+from org.OpenNI import  *
+from com.primesense.NITE import *
+
+# the OpenNI skeleton joint of each Kuatro joint name (see kuatroJoints.py)
+SKELETON_JOINTS = {"head" : SkeletonJoint.HEAD, "neck" : SkeletonJoint.NECK, "torso" : SkeletonJoint.TORSO,
+                   "leftShoulder" : SkeletonJoint.LEFT_SHOULDER, "leftElbow" : SkeletonJoint.LEFT_ELBOW, "leftHand" : SkeletonJoint.LEFT_HAND,
+                   "rightShoulder" : SkeletonJoint.RIGHT_SHOULDER, "rightElbow" : SkeletonJoint.RIGHT_ELBOW, "rightHand" : SkeletonJoint.RIGHT_HAND,
+                   "leftHip" : SkeletonJoint.LEFT_HIP, "leftKnee" : SkeletonJoint.LEFT_KNEE, "leftFoot" : SkeletonJoint.LEFT_FOOT,
+                   "rightHip" : SkeletonJoint.RIGHT_HIP, "rightKnee" : SkeletonJoint.RIGHT_KNEE, "rightFoot" : SkeletonJoint.RIGHT_FOOT}
+
+
+class OpenNISensor(KuatroSensor):
+
+   sharedContext = None   # the OpenNI context of the sensors given a device number
+
+   def __init__(self, frameRate = 30, deviceNumber = None, outputMode = None):
+
+      if outputMode is None:
+         outputMode = (640, 480, frameRate)
+
+      self.FRAME_RATE = outputMode[2]
+      self.outputMode = outputMode       # resolution and frame rate of the depth frames, (width, height, framesPerSecond)
+      self.deviceNumber = deviceNumber   # which of the devices connected to this computer (None for the only one)
+      self.users = []              # users being tracked (to retry skeleton calibration only for them)
+      self.skeletonCap = None
+
+
+   def start(self, listener):
+      '''Configure the Motion Sensing device with the OpenNI and Nite
+         framework protocols'''
+
+      self.listener = listener
+
+      if self.deviceNumber is not None:
+         self.startDevice()
+      else:
+         # Configuration per OpenNI and NITE framework settings
+         self.context = Context()
+         license = License("PrimeSense", "0KOIk2JeIBYClPWVnMoRKn5cdY4=")
+         self.context.addLicense(license)
+
+         self.depthGen = DepthGenerator.create(self.context)
+         self.mapMode = MapOutputMode(self.outputMode[0], self.outputMode[1], self.outputMode[2])      # (640 x 480 by default; coordinates are in real world mm, at any resolution)
+         self.depthGen.setMapOutputMode(self.mapMode)
+
+         self.context.setGlobalMirror(True)
+         self.userGen = UserGenerator.create(self.context)
+
+         self.context.startGeneratingAll()
+
+      # setup Observers for new / lost Detection events
+      self.userGen.getNewUserEvent().addObserver(NewUserDetector(self))             # new user enters the viewing area
+      self.userGen.getLostUserEvent().addObserver(LostUserDetector(self))           # user leaves the viewing area
+
+
+   def startDevice(self):
+      '''Configures the generators of device deviceNumber in the shared context'''
+
+      if OpenNISensor.sharedContext is None:
+         OpenNISensor.sharedContext = Context()
+         OpenNISensor.sharedContext.addLicense(License("PrimeSense", "0KOIk2JeIBYClPWVnMoRKn5cdY4="))
+         OpenNISensor.sharedContext.setGlobalMirror(True)
+      self.context = OpenNISensor.sharedContext
+
+      devices = list(self.context.enumerateProductionTrees(NodeType.DEVICE))
+      if self.deviceNumber >= len(devices):
+         raise ValueError("Device " + str(self.deviceNumber) + " not found; " + str(len(devices)) + " devices are connected")
+      device = devices[self.deviceNumber]
+      self.context.createProductionTree(device)
+
+      # the depth generator of this device, and the user generator of that depth generator
+      query = Query()
+      query.addNeededNode(device.getInstanceName())
+      self.depthGen = DepthGenerator.create(self.context, query, None)
+      self.mapMode = MapOutputMode(self.outputMode[0], self.outputMode[1], self.outputMode[2])
+      self.depthGen.setMapOutputMode(self.mapMode)
+
+      query = Query()
+      query.addNeededNode(self.depthGen.getName())
+      self.userGen = UserGenerator.create(self.context, query, None)
+
+      self.depthGen.startGenerating()
+      self.userGen.startGenerating()
+
+
+   def waitForFrame(self):
+
+      if self.deviceNumber is not None:
+         self.userGen.waitAndUpdateData()   # (only this device's frames; the other devices have their own threads)
+      else:
+         self.context.waitAnyUpdateAll()
+
+
+   def getUserCoM(self, userID):
+
+      point = self.userGen.getUserCoM(userID)            # get the location of the users Center of Mass
+      return point.getX(), point.getY(), point.getZ()   # break it down into X, Y, Z values
+
+
+   def addUser(self, userID):
+
+      if userID not in self.users:
+         self.users.append(userID)
+      self.listener.addUser(userID)
+
+
+   def removeUser(self, userID):
+
+      if userID in self.users:
+         self.users.remove(userID)
+      self.listener.removeUser(userID)
+
+
+   def startSkeletons(self, names):
+
+      self.skeletonCap = self.userGen.getSkeletonCapability()
+      self.skeletonCap.setSkeletonProfile(SkeletonProfile.ALL)
+      self.skeletonCap.getCalibrationCompleteEvent().addObserver(CalibrationCompleteObserver(self))
+      self.skeletonJoints = [SKELETON_JOINTS[name] for name in names]   # in the order joints are packed
+      return True
+
+
+   def requestSkeleton(self, userID):
+
+      if self.skeletonCap is not None:   # joints are tracked once the skeleton is calibrated (no calibration pose needed)
+         self.skeletonCap.requestSkeletonCalibration(userID, True)
+
+
+   def isSkeletonTracking(self, userID):
+      return self.skeletonCap is not None and self.skeletonCap.isSkeletonTracking(userID)
+
+
+   def getJointPositions(self, userID):
+
+      coordinates = []
+      for joint in self.skeletonJoints:
+         jointPosition = self.skeletonCap.getSkeletonJointPosition(userID, joint)
+         if jointPosition.getConfidence() > 0:
+            point = jointPosition.getPosition()
+            coordinates.extend([point.getX(), point.getY(), point.getZ()])
+         else:
+            coordinates.extend([0, 0, 0])   # the sensor can not see this joint right now
+
+      return coordinates
+
+
+   def getOutputModes(self):
+
+      modes = []
+      for mapMode in self.depthGen.getSupportedMapOutputModes():
+         mode = (mapMode.getXRes(), mapMode.getYRes(), mapMode.getFPS())
+         if mode not in modes:
+            modes.append(mode)
+      return modes
+
+
+   def getOutputMode(self):
+      return self.outputMode
+
+
+   def setOutputMode(self, mode):
+      '''Switches to output mode (between frames; the user generator keeps tracking its users)'''
+
+      self.outputMode = mode
+      self.FRAME_RATE = mode[2]
+      self.mapMode = MapOutputMode(mode[0], mode[1], mode[2])
+
+      self.depthGen.stopGenerating()
+      self.depthGen.setMapOutputMode(self.mapMode)
+      self.depthGen.startGenerating()
+
+
+   def getDepthSize(self):
+      return self.mapMode.getXRes(), self.mapMode.getYRes()
+
+
+   def getHorizontalFieldOfView(self):
+      return self.depthGen.getFieldOfView().getHFOV()
+
+
+   def getDepthFrame(self):
+
+      # direct views of this frame's depth map and user pixels (no copies of the frames)
+      depth = self.depthGen.getDepthMap().createShortBuffer()
+      labels = self.userGen.getUserPixels(0).getData().createShortBuffer()
+      return depth, labels
+
+
+#########################################################
+####### User Detection Observers(Listeners) #############
+#########################################################
+
+
+# Observer class that detects when a new user enters the viewing space.  Upon detection
+# of a new user the update method is called.
+class NewUserDetector(IObserver):
+
+   def __init__(self, sensor):
+      self.sensor = sensor
+
+   def update(self, observable, args):
+
+      try:
+
+         # update kuatro client with new user id
+         userID = args.getId()
+         self.sensor.addUser(userID)
+
+         print "New User Detected.  ID:", userID
+
+      except Exception, e:
+
+         print e
+
+# Observer class that detects when a user exits the viewing space (there is a 10 second delay).
+# Upon detection of a lost user the update method is called.
+class LostUserDetector(IObserver):
+
+   def __init__(self, sensor):
+      self.sensor = sensor
+
+
+   def update(self, observable, args):
+
+      # lost user so remove from kuatro client
+      userID = args.getId()
+      self.sensor.removeUser(userID)
+
+      print "User", userID, "lost"
+
+# Observer class that detects when the skeleton of a user is calibrated.  Upon successful
+# calibration the skeleton of the user is tracked; otherwise calibration is tried again.
+class CalibrationCompleteObserver(IObserver):
+
+   def __init__(self, sensor):
+      self.sensor = sensor
+
+   def update(self, observable, args):
+
+      userID = args.getUser()
+      if args.getStatus() == CalibrationProgressStatus.OK:
+         self.sensor.skeletonCap.startTracking(userID)
+         print "Tracking skeleton of user", userID
+      elif userID in self.sensor.users:
+         self.sensor.skeletonCap.requestSkeletonCalibration(userID, True)
@@ -0,0 +1,230 @@
+# kuatroOutputMode.py       Version  1.0     19-Oct-2026
+#
+# Output mode selection for the sensors of a Kuatro Client.  An output mode is the resolution
+# and frame rate of a sensor's depth frames, (width, height, framesPerSecond), e.g. (640, 480, 30)
+# or (320, 240, 60).  A lower resolution at a higher frame rate halves the time between frames
+# (lower latency), which is all that matters when only the users' centers of mass are sent;
+# skeleton joints and occupancy grids need the full resolution.
+#
+# An OutputModePolicy picks the mode of a sensor adaptively.  The client measures how long it
+# takes to process each frame (with how many users in it), and every few seconds the policy
+# estimates the share of a CPU core each mode would take with the current number of users:
+#
+#     load = frame time (at the current user count, scaled by pixels if depth frames are read) x frames per second
+#
+# and picks the most preferred mode within the CPU budget (the fastest mode, or, if depth frames
+# are needed, the largest), or the least loaded mode if none fits.  To avoid flipping back and
+# forth, it only switches to another mode if that mode fits within HEADROOM of the budget.
+#
+# Usage:
+#
+#     policy = OutputModePolicy([(640, 480, 30), (320, 240, 60)], cpuBudget = 0.5)
+#     policy.setMode((640, 480, 30))
+#     policy.addFrame(users, milliseconds)         # after every frame
+#     mode = policy.choose(users)                  # the mode to use (switch if it changed)
+#     policy.printReport("Output mode")
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+import array
+import time
+
+OUTPUT_MODES = [(640, 480, 30), (320, 240, 30), (320, 240, 60)]   # the modes of the Kinect and Xtion (the Kinect has no 60 fps mode)
+
+
+def modeName(mode):
+
+   if mode is None:
+      return "no output mode"
+   return "%dx%d at %d fps" % mode
+
+
+class FrameTimeStats():
+   '''Keeps the processing times of the most recent frames, with the number of users in each frame'''
+
+   HISTORY = 300   # frames kept (10 seconds at 30 fps)
+
+   def __init__(self):
+
+      self.users = array.array('d', [0.0] * FrameTimeStats.HISTORY)
+      self.times = array.array('d', [0.0] * FrameTimeStats.HISTORY)
+      self.count = 0        # frames measured (the ring buffers hold the last HISTORY)
+
+
+   def clear(self):
+      self.count = 0
+
+
+   def add(self, users, milliseconds):
+
+      i = self.count % FrameTimeStats.HISTORY
+      self.users[i] = users
+      self.times[i] = milliseconds
+      self.count = self.count + 1
+
+
+   def getFrames(self):
+      return min(self.count, FrameTimeStats.HISTORY)
+
+
+   def getPerUser(self):
+      '''Returns the milliseconds each user adds to a frame (a least squares fit; 0 if the number of users did not change)'''
+
+      n = self.getFrames()
+      if n < 2:
+         return 0.0
+
+      meanUsers = sum(self.users[0:n]) / n
+      meanTime = sum(self.times[0:n]) / n
+
+      covariance = 0.0
+      variance = 0.0
+      for i in range(n):
+         covariance = covariance + (self.users[i] - meanUsers) * (self.times[i] - meanTime)
+         variance = variance + (self.users[i] - meanUsers) ** 2
+
+      if variance == 0:
+         return 0.0
+      return max(0.0, covariance / variance)   # (more users never make a frame faster)
+
+
+   def predict(self, users):
+      '''Returns the expected processing time (in milliseconds) of a frame with users'''
+
+      n = self.getFrames()
+      if n == 0:
+         return 0.0
+
+      meanUsers = sum(self.users[0:n]) / n
+      meanTime = sum(self.times[0:n]) / n
+      return max(0.0, meanTime + self.getPerUser() * (users - meanUsers))
+
+
+   def getStats(self):
+      '''Returns a dictionary with the frames measured, and the mean, 95th percentile and maximum frame time,
+         and the time per user (in milliseconds)'''
+
+      n = self.getFrames()
+      stats = {"frames" : self.count}
+
+      if n > 0:
+         times = sorted(self.times[0:n])
+         stats["mean"] = sum(times) / n
+         stats["p95"] = times[min(n - 1, int(n * 0.95))]
+         stats["max"] = times[-1]
+         stats["perUser"] = self.getPerUser()
+
+      return stats
+
+
+class OutputModePolicy():
+   '''Picks the output mode of a sensor from the number of users, the measured frame times and a CPU budget'''
+
+   EVALUATE_SECONDS = 5   # seconds between evaluations (and after a switch, to measure the new mode)
+   MIN_FRAMES = 30        # frames measured in the current mode before switching
+   HEADROOM = 0.8         # a mode must fit in this share of the budget to switch to it
+
+   def __init__(self, modes = OUTPUT_MODES, cpuBudget = 0.5, needsDepth = False):
+
+      self.cpuBudget = cpuBudget     # share of a CPU core the frame processing may take (e.g., 0.5)
+      self.needsDepth = needsDepth   # True if depth frames are read (occupancy grids) or skeletons tracked
+
+      # modes, most preferred first: the largest, if depth is needed, otherwise the fastest (and then the smallest)
+      if needsDepth:
+         self.modes = sorted(modes, key = lambda mode: (-mode[0] * mode[1], -mode[2]))
+      else:
+         self.modes = sorted(modes, key = lambda mode: (-mode[2], mode[0] * mode[1]))
+
+      self.mode = None               # the current mode
+      self.stats = FrameTimeStats()  # frame times in the current mode
+      self.users = 0                 # users in the last frame
+      self.lastEvaluation = time.time()
+      self.switches = 0
+      self.reason = "initial mode"
+
+
+   def setMode(self, mode):
+      '''Sets the current mode (frame times are measured anew; None if the sensor has not reported one)'''
+
+      self.mode = mode
+      self.stats.clear()
+      self.lastEvaluation = time.time()
+
+
+   def addFrame(self, users, milliseconds):
+      '''Adds the processing time (in milliseconds) of a frame with users'''
+
+      self.users = users
+      self.stats.add(users, milliseconds)
+
+
+   def estimateLoad(self, mode, users):
+      '''Returns the share of a CPU core processing frames in mode with users would take'''
+
+      if mode is None:
+         return 0.0
+
+      frameTime = self.stats.predict(users)
+      if self.needsDepth and self.mode is not None:   # (reading depth frames takes time in proportion to their pixels; unscaled if the current mode is unknown)
+         frameTime = frameTime * (mode[0] * mode[1]) / float(self.mode[0] * self.mode[1])
+
+      return frameTime / 1000.0 * mode[2]
+
+
+   def choose(self, users = None, now = None):
+      '''Returns the mode to use with users (the current mode, unless a switch is due)'''
+
+      if users is None:
+         users = self.users
+      if now is None:
+         now = time.time()
+
+      if now - self.lastEvaluation < OutputModePolicy.EVALUATE_SECONDS or self.stats.getFrames() < OutputModePolicy.MIN_FRAMES:
+         return self.mode
+      self.lastEvaluation = now
+
+      chosen = None
+      for mode in self.modes:     # the most preferred mode that fits
+         limit = self.cpuBudget
+         if mode != self.mode:
+            limit = limit * OutputModePolicy.HEADROOM
+         if self.estimateLoad(mode, users) <= limit:
+            chosen = mode
+            break
+
+      if chosen is None:          # none fits, so the least loaded one
+         chosen = min(self.modes, key = lambda mode: self.estimateLoad(mode, users))
+         reason = "no mode fits the CPU budget of %.2f, %s is the least loaded" % (self.cpuBudget, modeName(chosen))
+      else:
+         reason = "%s fits the CPU budget of %.2f" % (modeName(chosen), self.cpuBudget)
+
+      self.reason = "%d users, %.1f ms per frame in %s: %s (load %.2f)" % (users, self.stats.predict(users),
+                    modeName(self.mode), reason, self.estimateLoad(chosen, users))
+      if chosen != self.mode:
+         self.switches = self.switches + 1
+
+      return chosen
+
+
+   def getReport(self):
+      '''Returns a dictionary with the current mode, the reason it was chosen, and the frame time stats behind the choice'''
+
+      return {"mode" : self.mode, "reason" : self.reason, "switches" : self.switches, "users" : self.users,
+              "cpuBudget" : self.cpuBudget, "load" : self.estimateLoad(self.mode, self.users),
+              "frameTime" : self.stats.getStats()}
+
+
+   def printReport(self, title):
+      '''Prints the current mode, why it was chosen, and the frame time stats (e.g., from a Timer)'''
+
+      report = self.getReport()
+      frameTime = report["frameTime"]
+
+      print
+      print title + ":", modeName(report["mode"]), "(%s)" % report["reason"]
+      print "users %d, load %.2f of a CPU budget of %.2f, %d switches" % (report["users"], report["load"], report["cpuBudget"], report["switches"])
+      if "mean" in frameTime:
+         print "frame time (ms): %d frames, mean %.2f, p95 %.2f, max %.2f, per user %.3f" % (frameTime["frames"], frameTime["mean"],
+               frameTime["p95"], frameTime["max"], frameTime["perUser"])
+      print
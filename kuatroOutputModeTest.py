@@ -0,0 +1,112 @@
+# kuatroOutputModeTest.py       Version  1.0     19-Oct-2026
+#
+# Tests the adaptive output mode of the Kuatro Client (see kuatroOutputMode.py) on a simulated
+# sensor (see kuatroSensor.py).  The sensor runs as fast as possible, and the policy is evaluated
+# at the simulated time of each frame, so the tests run past EVALUATE_SECONDS without waiting.
+#
+# To run it:
+#
+#     sh jython.sh kuatroOutputModeTest.py
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroOutputMode import OutputModePolicy
+from kuatroSensor import SimulatedSensor, SimulatedUser
+import unittest
+import time
+
+MODES = [(640, 480, 30), (320, 240, 60)]
+
+
+class Listener():
+   '''Keeps the users a sensor reports (in place of a Kuatro Client)'''
+
+   def __init__(self):
+      self.users = []
+
+   def addUser(self, userID):
+      self.users.append(userID)
+
+   def removeUser(self, userID):
+      self.users.remove(userID)
+
+
+class StubClient():
+   '''The settings of a Kuatro Client a KuatroDevice reads while it is configured'''
+
+   jointMask = 0
+   occupancyRate = 0
+   outputMode = None
+   adaptiveMode = True
+   cpuBudget = 0.5
+
+
+def simulatedSensor():
+   '''Returns a sensor with three users walking for a minute, and no output mode until one is set'''
+
+   users = [SimulatedUser(userID, [(0, -2000, 0, 2000 * userID), (60, 2000, 0, 2000 * userID)]) for userID in range(1, 4)]
+   return SimulatedSensor(users, speed = 0, modes = MODES)
+
+
+def runPolicy(sensor, policy, seconds, milliseconds):
+   '''Runs sensor for seconds of simulated time, each frame taking milliseconds, and switches modes as policy chooses'''
+
+   listener = Listener()
+   sensor.start(listener)
+   start = time.time()
+
+   while sensor.simulatedTime < seconds:
+      sensor.waitForFrame()
+      policy.addFrame(len(listener.users), milliseconds)
+      mode = policy.choose(len(listener.users), start + sensor.simulatedTime)
+      if mode != policy.mode:
+         sensor.setOutputMode(mode)
+         policy.setMode(mode)
+         policy.lastEvaluation = start + sensor.simulatedTime   # (measure the new mode in simulated time, too)
+
+
+class OutputModePolicyTest(unittest.TestCase):
+
+   def testNoInitialMode(self):
+      '''A policy started without a mode picks one at the first evaluation'''
+
+      sensor = simulatedSensor()
+      policy = OutputModePolicy(MODES, cpuBudget = 0.5)
+      policy.setMode(sensor.getOutputMode())     # (None)
+
+      runPolicy(sensor, policy, OutputModePolicy.EVALUATE_SECONDS * 2, 1.0)
+
+      self.assertEqual(policy.mode, (320, 240, 60))   # 1 ms per frame fits at 60 fps
+      self.assertEqual(sensor.getOutputMode(), (320, 240, 60))
+      self.assertEqual(policy.switches, 1)
+      policy.printReport("Output mode")
+
+   def testOverBudget(self):
+      '''A policy whose modes all exceed the budget settles on the least loaded one'''
+
+      sensor = simulatedSensor()
+      sensor.setOutputMode((320, 240, 60))
+      policy = OutputModePolicy(MODES, cpuBudget = 0.1)
+      policy.setMode(sensor.getOutputMode())
+
+      runPolicy(sensor, policy, OutputModePolicy.EVALUATE_SECONDS * 3, 10.0)
+
+      self.assertEqual(policy.mode, (640, 480, 30))   # 10 ms per frame is 0.3 at 30 fps, 0.6 at 60 fps
+      self.assertEqual(policy.switches, 1)
+
+   def testDeviceInitialMode(self):
+      '''A device with an adaptive mode starts a sensor without a mode in the mode of its frame rate'''
+
+      from kuatroKinectClient import KuatroDevice
+
+      sensor = simulatedSensor()
+      device = KuatroDevice(StubClient(), sensor, "test-0", "test")
+      device.configure()
+
+      self.assertEqual(sensor.getOutputMode(), (640, 480, 30))
+      self.assertEqual(device.modePolicy.mode, (640, 480, 30))
+
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,390 @@
+# kuatroReliable.py       Version  1.0     19-Oct-2026
+#
+# A lightweight reliability layer for Kuatro control events (new user, lost user,
+# device registration, calibration and view registration).  High-rate coordinate
+# traffic stays plain OSC over UDP; it is cheap and the next frame replaces a lost one.
+# Control events, on the other hand, leave the pipeline inconsistent when they are
+# lost, so they are wrapped in an envelope with a sequence number, acknowledged by
+# the receiver, and retransmitted with exponential backoff until acknowledged.
+#
+# Envelope (sender to receiver):
+#
+#     /kuatro/reliable , streamID, seq, ackAddress, ackPort, address, <original arguments>
+#
+# Acknowledgement (receiver to sender, on ackAddress / ackPort):
+#
+#     /kuatro/ack , streamID, seq
+#
+# Every sender-to-receiver connection is its own stream, identified by streamID.
+# Receivers deliver each stream in order and only once (duplicates are acknowledged
+# again but not delivered).  If a gap is not filled within gapTimeout milliseconds
+# (the sender gave up), the receiver skips it so that the stream does not stall.
+# Streams start at seq 0, so a stream whose first message is lost and retransmitted is still
+# delivered in order.  The receive state of a stream is dropped when its sender is removed
+# (removePeer), or when nothing arrived on it for streamTimeout milliseconds (a stream that
+# resumes after that is delivered after at most gapTimeout).
+#
+# Usage:
+#
+#     endpoint = ReliableEndpoint(KuatroDispatcher(OscIn(port)), myIpAddress, port)   # (optionally, transport = ...)
+#     endpoint.onInput("/kuatro/newUser", self.addUser)      # plain or reliable delivery
+#     server = endpoint.createOut(serverIpAddress, serverPort)
+#     server.sendReliable("/kuatro/newUser", userID, x, y, z, clientID)
+#     server.sendMessage("/kuatro/userCoordinates", userID, x, y, z, clientID)   # lossy
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroMessage import KuatroMessage
+from kuatroTransport import OscTransport
+from threading import Thread, Lock
+import time
+
+
+class ReliableEndpoint():
+
+   ##### OSC Namespace #####
+   RELIABLE_MESSAGE = "/kuatro/reliable"
+   ACK_MESSAGE = "/kuatro/ack"
+
+   def __init__(self, oscIn, ackAddress, ackPort, retransmitDelay = 50, maxRetransmitDelay = 2000, maxAttempts = 12, gapTimeout = 5000,
+                streamTimeout = 600000, transport = None):
+
+      if transport is None:
+         transport = OscTransport()
+
+      self.oscIn = oscIn                           # the OSC In port (or KuatroDispatcher) used for incoming envelopes and acks
+      self.transport = transport                   # creates the Out ports (see kuatroTransport.py)
+      self.ackAddress = ackAddress                 # IP Address and port receivers should send acks to (i.e., this endpoint)
+      self.ackPort = ackPort
+
+      self.retransmitDelay = retransmitDelay       # delay before the first retransmit (in milliseconds); doubles on every attempt
+      self.maxRetransmitDelay = maxRetransmitDelay # upper bound of the retransmit delay (in milliseconds)
+      self.maxAttempts = maxAttempts               # number of transmissions before a message is given up
+      self.gapTimeout = gapTimeout                 # how long a receiver waits for a missing message before skipping it (in milliseconds)
+      self.streamTimeout = streamTimeout           # how long an idle incoming stream (and its ack port) is kept (in milliseconds)
+
+      self.handlers = {}      # maps an OSC address to the list of callbacks for reliably delivered messages
+      self.outs = {}          # maps a streamID to the ReliableOscOut that owns the stream
+      self.streams = {}       # maps an incoming streamID to its receive state (next expected seq and held messages)
+      self.ackPorts = {}      # maps (ipAddress, port) to the OscOut used to send acks there
+
+      self.session = int(time.time() * 1000) % 100000000   # make streams of a restarted endpoint distinguishable from old ones
+      self.nextStreamID = 0
+
+      self.lock = Lock()
+
+      self.oscIn.onInput(ReliableEndpoint.RELIABLE_MESSAGE, self.receiveReliable)
+      self.oscIn.onInput(ReliableEndpoint.ACK_MESSAGE, self.receiveAck)
+
+      # setup thread to retransmit unacknowledged messages (and skip stale gaps)
+      self.isRunning = True
+      self.serviceThread = Thread(target = self.run)
+      self.serviceThread.setDaemon(True)
+      self.serviceThread.start()
+
+
+   def onInput(self, address, function):
+      '''Registers a callback for messages sent to address, whether they arrive
+         as plain OSC messages or inside a reliable envelope.'''
+
+      self.oscIn.onInput(address, function)   # plain (lossy, or from senders without the reliability layer)
+
+      self.lock.acquire()
+      try:
+         self.handlers.setdefault(address, []).append(function)
+      finally:
+         self.lock.release()
+
+
+   def createOut(self, ipAddress, port):
+      '''Creates an OSC Out port to ipAddress / port that can send both lossy and reliable messages.'''
+
+      self.lock.acquire()
+      try:
+         streamID = "%s:%d/%d/%d" % (self.ackAddress, self.ackPort, self.session, self.nextStreamID)
+         self.nextStreamID = self.nextStreamID + 1
+         out = ReliableOscOut(self, ipAddress, port, streamID)
+         self.outs[streamID] = out
+      finally:
+         self.lock.release()
+
+      return out
+
+
+   def removeOut(self, out):
+      '''Stops retransmitting on behalf of out (e.g., when a view goes away).'''
+
+      self.lock.acquire()
+      try:
+         if out.streamID in self.outs:
+            del self.outs[out.streamID]
+      finally:
+         self.lock.release()
+
+
+   def removePeer(self, ipAddress, port):
+      '''Drops the incoming streams (and the ack port) of the endpoint at ipAddress / port (e.g., when a view goes away)'''
+
+      self.lock.acquire()
+      try:
+         for streamID, stream in self.streams.items():
+            if stream.peer == (ipAddress, port):
+               del self.streams[streamID]
+         if (ipAddress, port) in self.ackPorts:
+            del self.ackPorts[(ipAddress, port)]
+      finally:
+         self.lock.release()
+
+
+   def stop(self):
+      '''Stops the retransmit thread'''
+
+      self.isRunning = False
+
+
+   ##############################
+   ###### Receiving Side ########
+   ##############################
+
+   def receiveReliable(self, message):
+      '''Callback for reliable envelopes.  Acknowledges the message and delivers
+         it (and any held messages that follow it) in order.'''
+
+      # parse arguments from OSC Message
+      args = list(message.getArguments())
+      streamID = args[0]
+      seq = args[1]
+      ackAddress = args[2]
+      ackPort = args[3]
+      address = args[4]
+      arguments = args[5:]
+
+      self.sendAck(ackAddress, ackPort, streamID, seq)   # always ack, even duplicates (the first ack may have been lost)
+
+      now = time.time()
+
+      self.lock.acquire()
+      try:
+         stream = self.streams.get(streamID)
+         if stream is None:                        # first message of a new stream (which may not be seq 0, if that was lost)
+            stream = ReliableStream(0, (ackAddress, ackPort))
+            self.streams[streamID] = stream
+         stream.lastTime = now
+
+         if seq < stream.nextSeq or seq in stream.held:
+            return                                 # duplicate, already delivered (or waiting to be)
+
+         stream.held[seq] = (address, arguments, now)
+         ready = stream.takeReady()
+      finally:
+         self.lock.release()
+
+      self.deliver(ready)
+
+
+   def deliver(self, messages):
+      '''Hands (address, arguments) pairs to the registered callbacks'''
+
+      for address, arguments in messages:
+         message = KuatroMessage(address, arguments)
+         for function in self.handlers.get(address, []):
+            function(message)
+
+
+   def sendAck(self, ipAddress, port, streamID, seq):
+      '''Sends an acknowledgement for seq back to the sender of the stream'''
+
+      key = (ipAddress, port)
+
+      self.lock.acquire()   # (run() prunes the ack ports of idle peers)
+      try:
+         ackPort = self.ackPorts.get(key)
+         if ackPort is None:
+            try:
+               ackPort = self.transport.createOut(ipAddress, port)
+            except Exception, e:
+               print "Unable to send acks to", ipAddress, "on", port
+               print e
+               return
+            self.ackPorts[key] = ackPort
+      finally:
+         self.lock.release()
+
+      ackPort.sendMessage(ReliableEndpoint.ACK_MESSAGE, streamID, seq)   # (send outside the lock)
+
+
+   ##############################
+   ###### Sending Side ##########
+   ##############################
+
+   def receiveAck(self, message):
+      '''Callback for acks.  Removes the acknowledged message from its stream's pending list.'''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      streamID = args[0]
+      seq = args[1]
+
+      out = self.outs.get(streamID)
+      if out:
+         out.acknowledge(seq)
+
+
+   def run(self):
+      '''Retransmits unacknowledged messages and skips stale gaps in incoming streams'''
+
+      while self.isRunning:
+
+         time.sleep(self.retransmitDelay / 2000.0)   # check twice per (minimum) retransmit delay
+
+         now = time.time()
+
+         for out in self.outs.values():
+            out.retransmit(now)
+
+         ready = []
+         self.lock.acquire()
+         try:
+            for streamID, stream in self.streams.items():
+               if stream.held and now - stream.oldestHeldTime() > self.gapTimeout / 1000.0:
+                  stream.nextSeq = min(stream.held.keys())   # give up on the missing message(s)
+                  ready.extend(stream.takeReady())
+
+               elif not stream.held and now - stream.lastTime > self.streamTimeout / 1000.0:
+                  del self.streams[streamID]                 # idle (most likely, its sender is gone)
+
+            # drop the ack ports of senders without streams
+            peers = set([stream.peer for stream in self.streams.values()])
+            for key in self.ackPorts.keys():
+               if key not in peers:
+                  del self.ackPorts[key]
+         finally:
+            self.lock.release()
+
+         self.deliver(ready)
+
+
+class ReliableStream():
+   '''Receive state of one incoming stream'''
+
+   def __init__(self, firstSeq, peer):
+
+      self.nextSeq = firstSeq   # next sequence number to be delivered
+      self.held = {}            # maps seq to (address, arguments, time received) for messages not yet delivered
+      self.peer = peer          # (ipAddress, port) of the sender's endpoint (where acks go)
+      self.lastTime = time.time()   # time the last message arrived
+
+
+   def takeReady(self):
+      '''Removes and returns the held messages that can now be delivered in order'''
+
+      ready = []
+      while self.nextSeq in self.held:
+         address, arguments, received = self.held.pop(self.nextSeq)
+         ready.append((address, arguments))
+         self.nextSeq = self.nextSeq + 1
+
+      return ready
+
+
+   def oldestHeldTime(self):
+      '''Returns the time the oldest held message was received'''
+
+      return min([received for address, arguments, received in self.held.values()])
+
+
+class ReliableOscOut():
+   '''An OSC Out port that can send lossy (sendMessage) and reliable (sendReliable) messages.
+      Created through ReliableEndpoint.createOut().'''
+
+   def __init__(self, endpoint, ipAddress, port, streamID):
+
+      self.endpoint = endpoint
+      self.ipAddress = ipAddress
+      self.port = port
+      self.streamID = streamID
+
+      self.oscOut = endpoint.transport.createOut(ipAddress, port)
+
+      self.nextSeq = 0       # sequence number of the next reliable message
+      self.pending = {}      # maps seq to [address, args, attempts, next retransmit time] until acknowledged
+
+      self.retransmissions = 0   # number of messages sent again because no ack arrived in time
+      self.failures = 0          # number of messages given up after maxAttempts
+
+      self.lock = Lock()
+
+
+   def sendMessage(self, address, *args):
+      '''Sends a plain (lossy) OSC message'''
+
+      self.oscOut.sendMessage(address, *args)
+
+
+   def sendReliable(self, address, *args):
+      '''Sends an OSC message that is retransmitted until the receiver acknowledges it'''
+
+      self.lock.acquire()
+      try:
+         seq = self.nextSeq
+         self.nextSeq = self.nextSeq + 1
+         self.pending[seq] = [address, args, 1, time.time() + self.endpoint.retransmitDelay / 1000.0]
+      finally:
+         self.lock.release()
+
+      self.transmit(seq, address, args)
+
+
+   def transmit(self, seq, address, args):
+      '''Sends the envelope for message seq'''
+
+      self.oscOut.sendMessage(ReliableEndpoint.RELIABLE_MESSAGE, self.streamID, seq,
+                              self.endpoint.ackAddress, self.endpoint.ackPort, address, *args)
+
+
+   def acknowledge(self, seq):
+      '''Marks message seq as delivered'''
+
+      self.lock.acquire()
+      try:
+         if seq in self.pending:
+            del self.pending[seq]
+      finally:
+         self.lock.release()
+
+
+   def retransmit(self, now):
+      '''Sends again every pending message whose retransmit time has come, doubling its delay'''
+
+      due = []
+
+      self.lock.acquire()
+      try:
+         for seq, entry in self.pending.items():
+            address, args, attempts, nextTime = entry
+
+            if nextTime <= now:
+
+               if attempts >= self.endpoint.maxAttempts:   # receiver is not answering, so give up on this message
+                  del self.pending[seq]
+                  self.failures = self.failures + 1
+                  print "Reliable message to", self.ipAddress, "on", self.port, "not acknowledged:", address
+
+               else:
+                  delay = min(self.endpoint.retransmitDelay * 2 ** attempts, self.endpoint.maxRetransmitDelay)
+                  entry[2] = attempts + 1
+                  entry[3] = now + delay / 1000.0
+                  due.append((seq, address, args))
+      finally:
+         self.lock.release()
+
+      for seq, address, args in due:
+         self.retransmissions = self.retransmissions + 1
+         self.transmit(seq, address, args)
+
+
+   def getPendingCount(self):
+      '''Returns the number of messages waiting for an ack'''
+
+      return len(self.pending)
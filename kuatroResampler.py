@@ -0,0 +1,125 @@
+# kuatroResampler.py       Version  1.0     19-Oct-2026
+#
+# Resamples user positions to a fixed output rate.  Sensors deliver positions at about 30 fps,
+# with jitter and dropped frames, while views render at 60 Hz or more.  A PositionResampler
+# keeps the last few timestamped positions of every user, and returns the position of a user
+# at any time:
+#
+#     - between two samples, the position is interpolated linearly,
+#     - after the last sample, it is extrapolated from the user's last velocity, for at most
+#       maxExtrapolation seconds (bridging a dropped frame or two), and then held,
+#     - before the first sample, it is the first sample.
+#
+# Positions are returned delay seconds in the past, so that there is (usually) a sample after
+# them to interpolate to.  The Kuatro Server uses a PositionResampler to send positions to
+# views that registered with an output rate, evenly spaced at that rate.
+#
+# Samples may carry the capture time of their frame (see kuatroLatency.py).  The capture time of
+# a resampled position is interpolated the same way, and held (not extrapolated) after the last
+# sample, so the age of a position is measured from the newest frame it is based on.
+#
+# Usage:
+#
+#     resampler = PositionResampler(0.05, 0.1)
+#     resampler.addSample(userID, x, y, z)             # (optionally, captureTime = ...)
+#     x, y, z = resampler.getPosition(userID)
+#     for userID, x, y, z in resampler.getPositions():
+#        ...
+#     for userID, x, y, z, captureTime in resampler.getStampedPositions():   # (captureTime is None if unknown)
+#        ...
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+import time
+
+
+class PositionResampler():
+
+   def __init__(self, delay = 0.05, maxExtrapolation = 0.1, history = 4):
+
+      self.delay = delay                         # seconds positions are returned in the past (about one and a half sensor frames)
+      self.maxExtrapolation = maxExtrapolation   # seconds a position is extrapolated past the last sample, at most
+      self.history = history                     # samples kept per user
+      self.samples = {}                          # maps a userID to its last samples, [(time, x, y, z, captureTime), ...], oldest first
+
+
+   def addSample(self, userID, x, y, z, sampleTime = None, captureTime = None):
+      '''Adds the position of a user at sampleTime (now, by default), from a frame captured at captureTime
+         (in milliseconds on the server clock; None if unknown)'''
+
+      if sampleTime is None:
+         sampleTime = time.time()
+
+      # a new list replaces the old one (so positions can be read while samples are added, from another thread)
+      samples = self.samples.get(userID, [])
+      self.samples[userID] = samples[-(self.history - 1):] + [(sampleTime, x, y, z, captureTime)]
+
+
+   def removeUser(self, userID):
+
+      if userID in self.samples:
+         del self.samples[userID]
+
+
+   def getPosition(self, userID, now = None):
+      '''Returns the (x, y, z) position of a user delay seconds before now (None for unknown users)'''
+
+      if now is None:
+         now = time.time()
+
+      samples = self.samples.get(userID)
+      if not samples:
+         return None
+
+      x, y, z, captureTime = self.__resample__(samples, now - self.delay)
+      return x, y, z
+
+
+   def getPositions(self, now = None):
+      '''Returns the positions of all users delay seconds before now, as a list of (userID, x, y, z)'''
+
+      if now is None:
+         now = time.time()
+
+      return [(userID, x, y, z) for userID, x, y, z, captureTime in self.getStampedPositions(now)]
+
+
+   def getStampedPositions(self, now = None):
+      '''Returns the positions of all users delay seconds before now, with the capture time of each position,
+         as a list of (userID, x, y, z, captureTime) (captureTime is None if a sample has no capture time)'''
+
+      if now is None:
+         now = time.time()
+
+      positions = []
+      for userID, samples in self.samples.items():
+         x, y, z, captureTime = self.__resample__(samples, now - self.delay)
+         positions.append((userID, x, y, z, captureTime))
+
+      return positions
+
+
+   def __resample__(self, samples, t):
+      '''Returns the position at time t from samples (see above), and its capture time'''
+
+      t0, x0, y0, z0, c0 = samples[0]
+      if t <= t0:                                # before the first sample
+         return x0, y0, z0, c0
+
+      for t1, x1, y1, z1, c1 in samples[1:]:
+         if t <= t1:                             # between two samples, so interpolate
+            fraction = (t - t0) / (t1 - t0)
+            captureTime = None
+            if c0 is not None and c1 is not None:
+               captureTime = c0 + (c1 - c0) * fraction
+            return x0 + (x1 - x0) * fraction, y0 + (y1 - y0) * fraction, z0 + (z1 - z0) * fraction, captureTime
+         t0, x0, y0, z0, c0 = t1, x1, y1, z1, c1
+
+      if len(samples) == 1 or samples[-2][0] >= t0:   # after the only sample (no velocity), so hold it
+         return x0, y0, z0, c0
+
+      # after the last sample, so extrapolate (for at most maxExtrapolation seconds; the capture time is the last one)
+      tp, xp, yp, zp, cp = samples[-2]
+      fraction = min(t - t0, self.maxExtrapolation) / (t0 - tp)
+      return x0 + (x0 - xp) * fraction, y0 + (y0 - yp) * fraction, z0 + (z0 - zp) * fraction, c0
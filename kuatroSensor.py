@@ -0,0 +1,328 @@
+# kuatroSensor.py       Version  1.0     19-Oct-2026
+#
+# Sensor backends for the Kuatro Client.  The client reads users from a sensor through a small
+# interface (KuatroSensor), so it can run on a real depth sensor (OpenNISensor, see
+# kuatroOpenNISensor.py), or without one, e.g. to benchmark or profile the whole pipeline
+# (client, calibration, server, views) on any computer:
+#
+#     SimulatedSensor    users walking scripted paths, or replaying a recorded trace, at the
+#                        sensor's frame rate (real time), faster (accelerated), or as fast as
+#                        possible (speed 0)
+#     RecordingSensor    wraps another sensor, and records the positions of its users to a
+#                        trace file (e.g., to replay a show later)
+#
+# A sensor calls its listener's addUser(userID) and removeUser(userID) when users enter and
+# leave (always from start() or waitForFrame(), i.e., on the client's thread), and returns
+# the center of mass of every user in real world millimeters (0, 0, 0 while a user is
+# temporarily lost).  Skeleton joints, depth frames and output modes (see kuatroOutputMode.py)
+# are optional.
+#
+# A trace file has one line per user per frame (lines starting with # are comments):
+#
+#     time userID x y z             (time in seconds since the start of the trace)
+#
+# Usage:
+#
+#     sensor = SimulatedSensor([SimulatedUser(1, [(0, -2000, 0, 3000), (10, 2000, 0, 6000)])], speed = 4.0)
+#     sensor = SimulatedSensor.fromTrace("show.trace")
+#     client = KuatroKinectClient(sensor = sensor, showDisplay = False)
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+import time
+
+
+class KuatroSensor():
+   '''The interface of a sensor backend (the defaults are for a sensor without skeletons or depth frames)'''
+
+   FRAME_RATE = 30   # frames per second
+
+   def start(self, listener):
+      '''Starts generating frames, and reporting new and lost users to listener'''
+      raise NotImplementedError
+
+   def waitForFrame(self):
+      '''Waits for the next frame'''
+      raise NotImplementedError
+
+   def getUserCoM(self, userID):
+      '''Returns the center of mass (x, y, z) of a user in this frame (0, 0, 0 if the user is temporarily lost)'''
+      raise NotImplementedError
+
+   def stop(self):
+      pass
+
+   ##### output modes (see kuatroOutputMode.py) #####
+
+   def getOutputModes(self):
+      '''Returns the output modes the sensor supports, as a list of (width, height, framesPerSecond) (none if its mode is fixed)'''
+      return []
+
+   def getOutputMode(self):
+      return None
+
+   def setOutputMode(self, mode):
+      '''Switches to output mode (width, height, framesPerSecond)'''
+      pass
+
+   ##### skeleton joints (see kuatroJoints.py) #####
+
+   def startSkeletons(self, names):
+      '''Starts tracking the skeleton joints with names (e.g., ["head", "leftHand"]).  Returns False if the sensor can not track skeletons.'''
+      return False
+
+   def requestSkeleton(self, userID):
+      '''Starts tracking the skeleton of a new user (once it is calibrated)'''
+      pass
+
+   def isSkeletonTracking(self, userID):
+      return False
+
+   def getJointPositions(self, userID):
+      '''Returns the coordinates of the joints (in the order they were asked for), as a list of x, y, z values (0, 0, 0 for joints the sensor can not see)'''
+      return []
+
+   ##### depth frames (see kuatroOccupancy.py) #####
+
+   def getDepthSize(self):
+      '''Returns the width and height of the depth frames (None if the sensor has no depth frames)'''
+      return None
+
+   def getHorizontalFieldOfView(self):
+      '''Returns the horizontal field of view (in radians)'''
+      return None
+
+   def getDepthFrame(self):
+      '''Returns this frame's depth map and user pixels (user IDs, 0 for background), as two ShortBuffers of width x height values'''
+      return None
+
+
+class SimulatedUser():
+   '''A user walking a scripted path, i.e., a list of waypoints (time, x, y, z), with time in seconds (the user is
+      present from the first waypoint to the last, and walks in a straight line from one waypoint to the next)'''
+
+   def __init__(self, userID, waypoints):
+
+      if not waypoints:
+         raise ValueError("User " + str(userID) + " has no waypoints")
+
+      self.userID = userID
+      self.waypoints = sorted(waypoints)
+      self.enterTime = self.waypoints[0][0]
+      self.exitTime = self.waypoints[-1][0]
+
+
+   def isPresent(self, t):
+      return self.enterTime <= t <= self.exitTime
+
+
+   def getPosition(self, t):
+      '''Returns the position (x, y, z) at time t'''
+
+      t0, x0, y0, z0 = self.waypoints[0]
+      if t <= t0:
+         return x0, y0, z0
+
+      for t1, x1, y1, z1 in self.waypoints[1:]:
+         if t <= t1:
+            if t1 == t0:
+               return x1, y1, z1
+            fraction = (t - t0) / float(t1 - t0)
+            return x0 + (x1 - x0) * fraction, y0 + (y1 - y0) * fraction, z0 + (z1 - z0) * fraction
+         t0, x0, y0, z0 = t1, x1, y1, z1
+
+      return x0, y0, z0
+
+
+class SimulatedSensor(KuatroSensor):
+   '''A sensor whose users walk scripted paths.  Frames come frameRate times per second of simulated time;
+      speed is how much faster simulated time runs than real time (0 is as fast as possible).  Its output
+      modes only change the frame rate (it has no depth frames).'''
+
+   def __init__(self, users, frameRate = 30, speed = 1.0, loop = False, modes = None):
+
+      self.users = users             # SimulatedUsers
+      self.frameRate = frameRate
+      self.FRAME_RATE = frameRate
+      self.modes = modes or []       # output modes, (width, height, framesPerSecond)
+      self.mode = None
+      self.speed = speed
+      self.loop = loop               # start over at the end (all users are lost, and enter again)
+      self.duration = max([user.exitTime for user in users] or [0])
+
+      self.listener = None
+      self.frame = 0                 # frames since the start (of this loop)
+      self.simulatedTime = 0.0       # time of this frame, in seconds since the start (of this loop)
+      self.present = set()           # userIDs of the users in the space
+      self.positions = {}            # maps the userID of each user in the space to its position in this frame
+
+
+   def fromTrace(filename, frameRate = 30, speed = 1.0, loop = False):
+      '''Returns a SimulatedSensor replaying a trace file (see above)'''
+
+      waypoints = {}   # maps a userID to its waypoints
+      traceFile = open(filename, "r")
+      try:
+         for line in traceFile:
+            fields = line.split()
+            if fields and not fields[0].startswith("#"):
+               t, userID, x, y, z = float(fields[0]), int(fields[1]), float(fields[2]), float(fields[3]), float(fields[4])
+               waypoints.setdefault(userID, []).append((t, x, y, z))
+      finally:
+         traceFile.close()
+
+      users = [SimulatedUser(userID, points) for userID, points in waypoints.items()]
+      return SimulatedSensor(users, frameRate, speed, loop)
+
+   fromTrace = staticmethod(fromTrace)
+
+
+   def start(self, listener):
+
+      self.listener = listener
+      self.startTime = time.time()
+      self.frame = 0
+
+
+   def waitForFrame(self):
+
+      self.frame = self.frame + 1
+      self.simulatedTime = self.simulatedTime + 1.0 / self.frameRate   # (the frame rate may change with the output mode)
+
+      if self.loop and self.simulatedTime > self.duration:   # start over
+         for userID in list(self.present):
+            self.present.discard(userID)
+            self.listener.removeUser(userID)
+         self.startTime = time.time()
+         self.frame = 0
+         self.simulatedTime = 0.0
+
+      if self.speed > 0:   # wait until it is time for this frame
+         delay = self.startTime + self.simulatedTime / self.speed - time.time()
+         if delay > 0:
+            time.sleep(delay)
+
+      positions = {}
+      for user in self.users:
+         if user.isPresent(self.simulatedTime):
+            positions[user.userID] = user.getPosition(self.simulatedTime)
+      self.positions = positions
+
+      for userID in positions.keys():
+         if userID not in self.present:
+            self.present.add(userID)
+            self.listener.addUser(userID)
+
+      for userID in list(self.present):
+         if userID not in positions:
+            self.present.discard(userID)
+            self.listener.removeUser(userID)
+
+
+   def getUserCoM(self, userID):
+      return self.positions.get(userID, (0, 0, 0))
+
+
+   def getOutputModes(self):
+      return self.modes
+
+   def getOutputMode(self):
+      return self.mode
+
+   def setOutputMode(self, mode):
+
+      self.mode = mode
+      self.frameRate = mode[2]
+      self.FRAME_RATE = mode[2]
+
+
+   def isFinished(self):
+      '''Returns True once all scripted paths are over (never, if the sensor loops)'''
+      return not self.loop and self.simulatedTime > self.duration
+
+
+class RecordingSensor(KuatroSensor):
+   '''Wraps a sensor, and records the positions of its users in every frame to a trace file (see above)'''
+
+   def __init__(self, sensor, filename):
+
+      self.sensor = sensor
+      self.traceFile = open(filename, "w")
+      self.traceFile.write("# time userID x y z\n")
+      self.users = []
+      self.FRAME_RATE = sensor.FRAME_RATE
+
+
+   def start(self, listener):
+
+      self.listener = listener
+      self.startTime = time.time()
+      self.sensor.start(self)     # (to see new and lost users)
+
+
+   def addUser(self, userID):
+
+      if userID not in self.users:
+         self.users.append(userID)
+      self.listener.addUser(userID)
+
+
+   def removeUser(self, userID):
+
+      if userID in self.users:
+         self.users.remove(userID)
+      self.listener.removeUser(userID)
+
+
+   def waitForFrame(self):
+
+      self.sensor.waitForFrame()
+
+      t = time.time() - self.startTime
+      for userID in self.users:
+         x, y, z = self.sensor.getUserCoM(userID)
+         if x != 0 or y != 0 or z != 0:   # (not while the user is temporarily lost)
+            self.traceFile.write("%.4f %d %.1f %.1f %.1f\n" % (t, userID, x, y, z))
+
+
+   def getUserCoM(self, userID):
+      return self.sensor.getUserCoM(userID)
+
+
+   def stop(self):
+
+      self.sensor.stop()
+      self.traceFile.close()
+
+
+   def startSkeletons(self, names):
+      return self.sensor.startSkeletons(names)
+
+   def requestSkeleton(self, userID):
+      self.sensor.requestSkeleton(userID)
+
+   def isSkeletonTracking(self, userID):
+      return self.sensor.isSkeletonTracking(userID)
+
+   def getJointPositions(self, userID):
+      return self.sensor.getJointPositions(userID)
+
+   def getDepthSize(self):
+      return self.sensor.getDepthSize()
+
+   def getHorizontalFieldOfView(self):
+      return self.sensor.getHorizontalFieldOfView()
+
+   def getDepthFrame(self):
+      return self.sensor.getDepthFrame()
+
+   def getOutputModes(self):
+      return self.sensor.getOutputModes()
+
+   def getOutputMode(self):
+      return self.sensor.getOutputMode()
+
+   def setOutputMode(self, mode):
+      self.sensor.setOutputMode(mode)
+      self.FRAME_RATE = self.sensor.FRAME_RATE
@@ -17,6 +17,30 @@
 #              the server to track coordinates from multiple devices.  
 #     14-Aug:  Updated OSC Addresses to be constants
 #     28-Oct:  Updated to only allow one connection per view (i.e. only one entry into the viewPort list)
+#     19-Oct-2026:  Control events (new/lost user, device registration and calibration, view registration)
+#              are now sent and received through the reliability layer in kuatroReliable.py
+#     19-Oct-2026:  Registering views receive a snapshot of all current users.  Messages to views carry
+#              the world sequence number so views can detect missed events and request a resync.
+#     19-Oct-2026:  Views send heartbeats (and may unregister).  Sending to views that miss heartbeats is
+#              backed off exponentially, and views are evicted after EVICT_AFTER missed heartbeats.
+#     19-Oct-2026:  Incoming messages are routed by a KuatroDispatcher (one hash lookup per message).
+#     19-Oct-2026:  Messages go through a transport (see kuatroTransport.py), OSC over UDP by default, or
+#              an in-memory bus when clients, server and views run in the same process.
+#     19-Oct-2026:  Skeleton joints from clients are calibrated to the Virtual World and sent, once per frame,
+#              to the views that asked for them at registration (only the joints each view asked for).
+#     19-Oct-2026:  Occupancy grids from clients are merged into one occupancy map of the Virtual World, and
+#              sent OCCUPANCY_RATE times per second to the views that asked for it (see kuatroOccupancy.py).
+#     19-Oct-2026:  Views may register with an output rate, and then get user coordinates resampled to that rate
+#              (interpolated between samples, and extrapolated over short gaps; see kuatroResampler.py).
+#     19-Oct-2026:  Coordinates carry the frame ID and capture time of their frame through to the views, the server
+#              answers clock pings, and keeps the latency of its stages (see kuatroLatency.py).
+#     19-Oct-2026:  Users are kept in a grid index, and views may query it for the users within a radius, the nearest
+#              users or the users within a rectangle, once or as standing queries (see kuatroSpatial.py).
+#     19-Oct-2026:  The trajectory of the last TRAJECTORY_SECONDS of every user is kept (fixed memory per user), and
+#              views may query the motion (velocity, speed, heading) and trajectories of users (see kuatroTrajectory.py).
+#     19-Oct-2026:  Sensor data (coordinates, joints, occupancy grids) is processed on an ingest thread, newest per user
+#              first; under overload superseded updates are shed, control messages never are (see kuatroIngest.py).
+#     19-Oct-2026:  Clients may send the coordinates of all users of a device's frame in one /kuatro/userFrame message.
 # 
 #  TO DO:
 #     1.
@@ -24,9 +48,24 @@
 
 
 from osc import OscIn, OscOut
+from kuatroTransport import OscTransport
 from gui import *
 from music import *
+from timer import Timer
+from kuatroReliable import ReliableEndpoint
+from kuatroDispatcher import KuatroDispatcher
+from kuatroJoints import JOINTS, jointCount
+from kuatroOccupancy import OccupancyGrid
+from kuatroResampler import PositionResampler
+from kuatroLatency import milliseconds, LatencyStats, CLOCK_PING_MESSAGE, CLOCK_PONG_MESSAGE
+from kuatroSpatial import GridIndex, StandingQuery, QUERY_KINDS
+from kuatroTrajectory import TrajectoryHistory
+from kuatroIngest import IngestQueue
+from kuatroMessage import KuatroMessage
+from threading import Lock
+import socket
 import sys
+import time
 
 class KuatroServer():
 
@@ -34,20 +73,83 @@ class KuatroServer():
    NEW_USER_MESSAGE = "/kuatro/newUser"
    LOST_USER_MESSAGE = "/kuatro/lostUser"
    USER_COORDINATES_MESSAGE = "/kuatro/userCoordinates"
+   USER_FRAME_MESSAGE = "/kuatro/userFrame"
+   USER_JOINTS_MESSAGE = "/kuatro/userJoints"
    REGISTER_DEVICE_MESSAGE = "/kuatro/registerDevice"
    CALIBRATE_DEVICE_MESSAGE = "/kuatro/calibrateDevice"
    REGISTER_VIEW_MESSAGE = "/kuatro/registerView"
-
-   def __init__(self, port = 50505, verbose = 0):
+   REQUEST_SNAPSHOT_MESSAGE = "/kuatro/requestSnapshot"
+   WORLD_SNAPSHOT_MESSAGE = "/kuatro/worldSnapshot"
+   VIEW_HEARTBEAT_MESSAGE = "/kuatro/viewHeartbeat"
+   UNREGISTER_VIEW_MESSAGE = "/kuatro/unregisterView"
+   OCCUPANCY_MESSAGE = "/kuatro/occupancy"
+   OCCUPANCY_MAP_MESSAGE = "/kuatro/occupancyMap"
+   QUERY_RADIUS_MESSAGE = "/kuatro/queryRadius"
+   QUERY_NEAREST_MESSAGE = "/kuatro/queryNearest"
+   QUERY_RECT_MESSAGE = "/kuatro/queryRect"
+   ADD_STANDING_QUERY_MESSAGE = "/kuatro/addStandingQuery"
+   REMOVE_STANDING_QUERY_MESSAGE = "/kuatro/removeStandingQuery"
+   QUERY_RESULT_MESSAGE = "/kuatro/queryResult"
+   QUERY_MOTION_MESSAGE = "/kuatro/queryMotion"
+   QUERY_TRAJECTORY_MESSAGE = "/kuatro/queryTrajectory"
+   USER_MOTION_MESSAGE = "/kuatro/userMotion"
+   TRAJECTORY_MESSAGE = "/kuatro/trajectory"
+
+   SNAPSHOT_USERS_PER_MESSAGE = 100   # users per snapshot message (keeps each message well below the UDP packet size)
+   JOINT_USERS_PER_MESSAGE = 8        # users per joints message (with all 15 joints, about 1.5 KB per message)
+   QUERY_USERS_PER_MESSAGE = 100      # users (or positions) per query result, motion and trajectory message
+
+   SPATIAL_CELL_SIZE = 50       # width of the cells of the spatial index (in Virtual World units, i.e., a 20 x 15 grid)
+   TRAJECTORY_SECONDS = 5       # seconds of positions kept per user (at most 60 positions per second, about 7 KB per user)
+
+   ##### Occupancy Map #####
+   OCCUPANCY_RATE = 10          # occupancy maps sent to views per second (at most; only when the map changes, and once a second anyway)
+   OCCUPANCY_TIMEOUT = 2.0      # seconds after which the grid of a client that stopped sending grids is dropped from the map
+
+   ##### Output Rates #####
+   RESAMPLE_DELAY = 0.05        # seconds resampled coordinates lag behind the sensors (about one and a half frames at 30 fps, so there is a sample to interpolate to)
+   MAX_EXTRAPOLATION = 0.1      # seconds coordinates are extrapolated past the last sample of a user (bridges a few dropped frames), before they are held
+
+   ##### View Liveness #####
+   HEARTBEAT_INTERVAL = 1000    # views send a heartbeat every second (in milliseconds)
+   SUSPECT_AFTER = 2            # missed heartbeats before coordinate messages to a view are backed off
+   EVICT_AFTER = 10             # missed heartbeats before a view is removed
+   MIN_BACKOFF_INTERVAL = 50    # interval between coordinate messages to a view that just became suspect (in milliseconds); doubles for every further missed heartbeat
+   MAX_BACKOFF_INTERVAL = 2000  # upper bound of the backoff interval (in milliseconds)
+
+   def __init__(self, port = 50505, verbose = 0, transport = None):
 
       # *** add comments below
       self.nextUserID = 0              # used to find the next available user ID (this is never decremented so IDs are not reused)
       self.deviceUsers = {}            # maps a device user ID (combination of user ID and client ID) to a corresponding Virtual World user ID (This is needed so we can send views an integer value for the User ID)
       self.virtualUsers = {}           # stores Virtual World User IDs and each user's coordinates within the Virtual World 
       self.devices = []                # stores a list of the devices that are connected to the server
-      self.viewInfo = []               # stores a tuple including the IP Address and Port of all registered view.  Used to ensure that that same view does not register multiple times. 
-      self.viewPorts = []              # stores the OSC Port to all registered views
+      self.views = {}                  # maps a tuple including the IP Address and Port of each registered view to its KuatroViewConnection (OSC Port and liveness state).  Used to ensure that that same view does not register multiple times. 
       self.deviceCalibrationData = {}  # stores calibration data from 
+      self.worldSeq = 0                # incremented on every new / lost user; sent to views with every message so they can detect missed events
+
+      self.wastedSends = 0             # messages sent to views after their last heartbeat, counted when they are evicted (i.e., sent to a dead view)
+      self.skippedSends = 0            # coordinate messages not sent to suspect views because of backoff
+      self.evictedViews = 0            # number of views evicted for missing heartbeats
+
+      self.occupancyGrids = {}         # maps the client ID of each device sending occupancy grids to its latest grid, as (width, height, runs, time received)
+      self.occupancyMap = None         # the OccupancyGrid the client grids are merged into
+      self.lastOccupancyRuns = None    # the last occupancy map sent to views (run-length encoded)
+      self.lastOccupancyKeyframe = 0   # and when it was sent
+
+      self.resampler = PositionResampler(KuatroServer.RESAMPLE_DELAY, KuatroServer.MAX_EXTRAPOLATION)   # timestamped coordinates of all users, for views with an output rate
+      self.outputTimers = {}           # maps each output rate views asked for to the Timer sending resampled coordinates at that rate
+      self.lastResampled = {}          # maps each output rate to the coordinates last sent at that rate, {userID : (x, y, z)}
+
+      self.latencyStats = LatencyStats(["toServer", "server"])   # latencies of coordinates with a capture time (see kuatroLatency.py)
+      self.clockOuts = {}              # maps the (ipAddress, port) of each client and view that pings the server clock to an Out port for the answers
+
+      self.spatialIndex = GridIndex(KuatroServer.SPATIAL_CELL_SIZE)   # the users of the Virtual World, by location (for spatial queries)
+      self.trajectories = TrajectoryHistory(KuatroServer.TRAJECTORY_SECONDS)   # and their recent trajectories (for motion queries)
+
+      # sensor data is processed on the ingest thread, control messages on the OSC input thread
+      self.ingest = IngestQueue()
+      self.usersLock = Lock()          # guards the users (deviceUsers, virtualUsers), which both threads change
 
       # the max coordinates of the Virutal World
       self.virtualMaxX = 1000
@@ -56,29 +158,66 @@ class KuatroServer():
       
       self.verbose = verbose  # turn on logging of user tracking. 0 = Off, 1 = User Tracking Data, 2 = User Tracking plus Echo OSC Messages
 
+      if transport is None:   # OSC over UDP, unless all components share an in-memory transport
+         transport = OscTransport()
+      self.transport = transport
+
 
       # configure OSC protocol communication
       try:
 
-         oscIn = OscIn(port)  
+         oscIn = self.transport.createIn(port)
+         self.dispatcher = KuatroDispatcher(oscIn)   # routes each message through one hash lookup (instead of matching every address)
 
          # if verbose logging is set to 2 turn on echo message
          if verbose == 2:
-            oscIn.onInput("/.*", self.echoMessage)
+            self.dispatcher.onAnyInput(self.echoMessage)
+
+         # control events arrive (and are sent to views) through the reliability layer, which
+         # acknowledges them and retransmits unacknowledged ones; acks to the server come back to this port
+         self.endpoint = ReliableEndpoint(self.dispatcher, self.findIpAddress(), port, transport = self.transport)
          
          # the Client-to-Server API
-         oscIn.onInput(KuatroServer.NEW_USER_MESSAGE, self.addUser)
-         oscIn.onInput(KuatroServer.LOST_USER_MESSAGE, self.removeUser)
-         oscIn.onInput(KuatroServer.USER_COORDINATES_MESSAGE, self.moveUser)
-         oscIn.onInput(KuatroServer.REGISTER_DEVICE_MESSAGE, self.registerDevice)
-         oscIn.onInput(KuatroServer.CALIBRATE_DEVICE_MESSAGE, self.calibrateDevice)
+         self.endpoint.onInput(KuatroServer.NEW_USER_MESSAGE, self.addUser)
+         self.endpoint.onInput(KuatroServer.LOST_USER_MESSAGE, self.removeUser)
+         # coordinates stay lossy (next frame replaces a lost one), and so do joints and occupancy grids; they go
+         # through the ingest queue, where a newer message replaces an older one not processed yet (with the same key)
+         self.ingest.onInput(self.dispatcher, KuatroServer.USER_COORDINATES_MESSAGE, self.moveUser,
+                             lambda message: ("coordinates", message.getArguments()[0], message.getArguments()[4]))      # (per userID, clientID)
+         self.ingest.onInput(self.dispatcher, KuatroServer.USER_FRAME_MESSAGE, self.moveUsers,
+                             lambda message: ("frame", message.getArguments()[0], self.framePart(message)))              # (per clientID, part of the frame)
+         self.ingest.onInput(self.dispatcher, KuatroServer.USER_JOINTS_MESSAGE, self.moveUserJoints,
+                             lambda message: ("joints", message.getArguments()[0], self.jointsPart(message)))            # (per clientID, part of the frame)
+         self.ingest.onInput(self.dispatcher, KuatroServer.OCCUPANCY_MESSAGE, self.updateOccupancy,
+                             lambda message: ("occupancy", message.getArguments()[0]))                                  # (per clientID)
+         self.dispatcher.onInput(CLOCK_PING_MESSAGE, self.answerClockPing)                 # clients and views keep their clocks aligned with the server's
+         self.endpoint.onInput(KuatroServer.REGISTER_DEVICE_MESSAGE, self.registerDevice)
+         self.endpoint.onInput(KuatroServer.CALIBRATE_DEVICE_MESSAGE, self.calibrateDevice)
 
          # the View-to-Server API
-         oscIn.onInput(KuatroServer.REGISTER_VIEW_MESSAGE, self.registerView)
+         self.endpoint.onInput(KuatroServer.REGISTER_VIEW_MESSAGE, self.registerView)
+         self.endpoint.onInput(KuatroServer.REQUEST_SNAPSHOT_MESSAGE, self.requestSnapshot)
+         self.dispatcher.onInput(KuatroServer.VIEW_HEARTBEAT_MESSAGE, self.viewHeartbeat)
+         self.endpoint.onInput(KuatroServer.UNREGISTER_VIEW_MESSAGE, self.unregisterView)
+         self.endpoint.onInput(KuatroServer.QUERY_RADIUS_MESSAGE, self.queryRadius)
+         self.endpoint.onInput(KuatroServer.QUERY_NEAREST_MESSAGE, self.queryNearest)
+         self.endpoint.onInput(KuatroServer.QUERY_RECT_MESSAGE, self.queryRect)
+         self.endpoint.onInput(KuatroServer.ADD_STANDING_QUERY_MESSAGE, self.addStandingQuery)
+         self.endpoint.onInput(KuatroServer.REMOVE_STANDING_QUERY_MESSAGE, self.removeStandingQuery)
+         self.endpoint.onInput(KuatroServer.QUERY_MOTION_MESSAGE, self.queryMotion)
+         self.endpoint.onInput(KuatroServer.QUERY_TRAJECTORY_MESSAGE, self.queryTrajectory)
 
       except:
          print "Error:  Unable to setup OSC In port. Port may already be in use."
 
+      # check view heartbeats once per heartbeat interval
+      self.livenessTimer = Timer(KuatroServer.HEARTBEAT_INTERVAL, self.checkViews)
+      self.livenessTimer.start()
+
+      # merge the occupancy grids of all clients, and send the map to views
+      self.occupancyTimer = Timer(int(1000 / KuatroServer.OCCUPANCY_RATE), self.sendOccupancyMap)
+      self.occupancyTimer.start()
+
 
    #####################################
    ###### Kuatro Server Callbacks ######
@@ -118,20 +257,36 @@ class KuatroServer():
       user = (userID, clientID)  # make user from each device unique by creating tuple with userID and client id
       #### Update Virutal World with new User
       if user not in self.deviceUsers:     # make sure user does not already exist
+         newX, newY, newZ = self.calibrateUserCoordinates(x, y, z, clientID)   # get new set of user coordinates calibrated to the Virtual World
+         self.addDeviceUser(user, newX, newY, newZ)
+
 
+   def addDeviceUser(self, user, newX, newY, newZ):
+      ''' Adds a device user, i.e. (userID, clientID), with coordinates already calibrated
+          to the Virtual World and updates the registered views. '''
+
+      self.usersLock.acquire()
+      try:
+         if user not in self.deviceUsers:     # make sure user does not already exist
 
-         virtualWorldUserID = self.nextUserID   # then get a new user ID for the virtual World
-         self.nextUserID = self.nextUserID + 1  # increment user ID
+            virtualWorldUserID = self.nextUserID   # then get a new user ID for the virtual World
+            self.nextUserID = self.nextUserID + 1  # increment user ID
 
-         self.deviceUsers[user] = virtualWorldUserID  # map user to virtual world ID 
+            self.deviceUsers[user] = virtualWorldUserID  # map user to virtual world ID 
         
-         newX, newY, newZ = self.calibrateUserCoordinates(x, y, z, clientID)   # get new set of user coordinates calibrated to the Virtual World
-         self.virtualUsers[virtualWorldUserID] = (newX, newY, newZ)            # update User dictionary with new user and tuple of user coordinates
+            self.virtualUsers[virtualWorldUserID] = (newX, newY, newZ)            # update User dictionary with new user and tuple of user coordinates
+            self.resampler.addSample(virtualWorldUserID, newX, newY, newZ)
+            self.spatialIndex.move(virtualWorldUserID, newX, newY)
+            self.trajectories.add(virtualWorldUserID, newX, newY)
+            self.worldSeq = self.worldSeq + 1
 
-         self.sendMessage(KuatroServer.NEW_USER_MESSAGE, virtualWorldUserID, newX, newY, newZ)  # send message with calibrated user coordinates to registered views
+            self.sendReliableMessage(KuatroServer.NEW_USER_MESSAGE, virtualWorldUserID, newX, newY, newZ, self.worldSeq)  # send message with calibrated user coordinates to registered views
+            self.updateStandingQueries(virtualWorldUserID)
 
-         if self.verbose !=0:
-            print "Added User:", virtualWorldUserID, "Coords:", newX, newY, newZ
+            if self.verbose !=0:
+               print "Added User:", virtualWorldUserID, "Coords:", newX, newY, newZ
+      finally:
+         self.usersLock.release()
 
 
    def removeUser(self, message):
@@ -146,25 +301,42 @@ class KuatroServer():
       clientID = args[1]
 
       user = (userID, clientID)
+      self.removeDeviceUser(user)
+
 
-      ##### Remove user from Virtual World
-      if user in self.deviceUsers:                     # verify that user exists in virtual world
-         virtualWorldUserID = self.deviceUsers[user]      # then get the virtual world user ID           
-         del self.virtualUsers[virtualWorldUserID]        # and remove user from user dictionaries
-         del self.deviceUsers[user]
+   def removeDeviceUser(self, user):
+      ''' Removes a device user, i.e. (userID, clientID), from the Virtual World and
+          updates the registered views. '''
+
+      self.usersLock.acquire()
+      try:
+         ##### Remove user from Virtual World
+         if user in self.deviceUsers:                     # verify that user exists in virtual world
+            virtualWorldUserID = self.deviceUsers[user]      # then get the virtual world user ID           
+            del self.virtualUsers[virtualWorldUserID]        # and remove user from user dictionaries
+            del self.deviceUsers[user]
+            self.resampler.removeUser(virtualWorldUserID)
+            self.spatialIndex.remove(virtualWorldUserID)
+            self.trajectories.remove(virtualWorldUserID)
+            self.worldSeq = self.worldSeq + 1
 
-         self.sendMessage(KuatroServer.LOST_USER_MESSAGE, virtualWorldUserID)  # send lost user message to registered views 
+            self.sendReliableMessage(KuatroServer.LOST_USER_MESSAGE, virtualWorldUserID, self.worldSeq)  # send lost user message to registered views 
+            self.updateStandingQueries(virtualWorldUserID)
 
-         if self.verbose !=0:
-            print "Removed User:", virtualWorldUserID
+            if self.verbose !=0:
+               print "Removed User:", virtualWorldUserID
+      finally:
+         self.usersLock.release()
 
 
    def moveUser(self, message):
       ''' Moves a user to a new location in the virtual world. The OSC Message
           should contain the values:
-               userID, x, y, z
+               userID, x, y, z, clientID, frameID, captureTime (optional; see kuatroLatency.py)
        '''
 
+      receiveTime = milliseconds()
+
       # parse arguments from OSC Message
       args = message.getArguments()
       userID = args[0]
@@ -173,19 +345,322 @@ class KuatroServer():
       z = args[3]
       clientID = args[4]
 
+      frameID = None
+      captureTime = None
+      if len(args) > 6:        # (older clients do not stamp their frames)
+         frameID = args[5]
+         captureTime = args[6]
+         self.latencyStats.add("toServer", receiveTime - captureTime)
+
       user = (userID, clientID)
 
       ##### Update User Coordinates      
       if user in self.deviceUsers:                           # verify that user exists in device users
-
-         virtualWorldUserID = self.deviceUsers[user]                           # then get the virtual world user ID    
          newX, newY, newZ = self.calibrateUserCoordinates(x, y, z, clientID)   # get calibrated coordinates for user
-         self.virtualUsers[virtualWorldUserID] = (newX, newY, newZ)            # add new coordinates user dictionary
+         self.moveDeviceUser(user, newX, newY, newZ, frameID, captureTime, receiveTime)
+
+
+   def moveUsers(self, message):
+      ''' Moves the users of a frame of a device to their new locations in the virtual world.  The OSC Message
+          should contain the values:
+               clientID, frameID, captureTime, n, userID, x, y, z, userID, x, y, z, ..., part (n users; captureTime is -1
+               while the client's clock is not synchronized, see kuatroLatency.py; part is the index of this message
+               within the frame, optional)
+      '''
+
+      receiveTime = milliseconds()
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      clientID = args[0]
+      frameID = args[1]
+      captureTime = args[2]
+      n = args[3]
+
+      if captureTime < 0:
+         frameID = None
+         captureTime = None
+      else:
+         self.latencyStats.add("toServer", receiveTime - captureTime)
+
+      for i in range(4, 4 + n * 4, 4):   # each user takes 4 arguments: userID, x, y, z
+         user = (args[i], clientID)
+
+         if user in self.deviceUsers:                           # verify that user exists in device users
+            newX, newY, newZ = self.calibrateUserCoordinates(args[i + 1], args[i + 2], args[i + 3], clientID)   # get calibrated coordinates for user
+            self.moveDeviceUser(user, newX, newY, newZ, frameID, captureTime, receiveTime)
+
+
+   def moveDeviceUser(self, user, newX, newY, newZ, frameID = None, captureTime = None, receiveTime = None):
+      ''' Moves a device user, i.e. (userID, clientID), to coordinates already calibrated
+          to the Virtual World and updates the registered views.  The frame ID and capture
+          time of the coordinates (if any) are passed on to the views. '''
+
+      self.usersLock.acquire()
+      try:
+         if user in self.deviceUsers:                           # verify that user exists in device users
+
+            virtualWorldUserID = self.deviceUsers[user]                           # then get the virtual world user ID    
+            self.virtualUsers[virtualWorldUserID] = (newX, newY, newZ)            # add new coordinates user dictionary
+            self.resampler.addSample(virtualWorldUserID, newX, newY, newZ, None, captureTime)   # and keep them, timestamped, for views with an output rate
+            self.spatialIndex.move(virtualWorldUserID, newX, newY)                # and by location, for spatial queries
+            self.trajectories.add(virtualWorldUserID, newX, newY)                 # and their trajectory, for motion queries
          
-         self.sendMessage(KuatroServer.USER_COORDINATES_MESSAGE, virtualWorldUserID, newX, newY, newZ)    # send message with calibrated user coordinates
+            if captureTime is None:
+               self.sendMessage(KuatroServer.USER_COORDINATES_MESSAGE, virtualWorldUserID, newX, newY, newZ, self.worldSeq)    # send message with calibrated user coordinates
+            else:
+               self.sendMessage(KuatroServer.USER_COORDINATES_MESSAGE, virtualWorldUserID, newX, newY, newZ, self.worldSeq, frameID, captureTime, milliseconds())
+               self.latencyStats.add("server", milliseconds() - receiveTime)
+
+            self.updateStandingQueries(virtualWorldUserID)
+
+            if self.verbose !=0:
+               print "User:", virtualWorldUserID, "Coords:", newX, newY, newZ
+      finally:
+         self.usersLock.release()
+
+
+   def framePart(self, message):
+      '''Returns the part index of a /kuatro/userFrame message (the trailing argument, after the n users; 0 if the
+         client does not send it), so that each part of a frame replaces the same part of an older frame'''
+
+      args = message.getArguments()
+      i = 4 + args[3] * 4              # each user takes 4 arguments: userID, x, y, z
+      if len(args) > i:
+         return args[i]
+      return 0
+
+
+   def jointsPart(self, message):
+      '''Returns the part index of a /kuatro/userJoints message from a client (see framePart)'''
+
+      args = message.getArguments()
+      i = 3 + args[2] * (1 + jointCount(args[1]) * 3)   # each user takes 1 + 3 * joints arguments
+      if len(args) > i:
+         return args[i]
+      return 0
+
+
+   def moveUserJoints(self, message):
+      ''' Calibrates the skeleton joints of a frame of users to the Virtual World, and sends them to
+          the views that asked for joints.  The OSC Message should contain the values:
+               clientID, jointMask, n, userID, x, y, z, x, y, z, ..., userID, ..., part (n users; part is optional, see framePart)
+          (see kuatroJoints.py)
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      clientID = args[0]
+      mask = args[1]
+      n = args[2]
+
+      joints = jointCount(mask)
+      users = []      # list of (virtualWorldUserID, [x, y, z, x, y, z, ...]) in Virtual World coordinates
+
+      i = 3
+      for u in range(n):
+         user = (args[i], clientID)
+
+         virtualWorldUserID = self.deviceUsers.get(user)
+         if virtualWorldUserID is not None:    # verify that user exists in device users
+            coordinates = []
+            for j in range(i + 1, i + 1 + joints * 3, 3):
+               coordinates.extend(self.calibrateJointCoordinates(args[j], args[j + 1], args[j + 2], clientID))
+            users.append((virtualWorldUserID, coordinates))
+
+         i = i + 1 + joints * 3                # each user takes 1 + 3 * joints arguments
+
+      if users:
+         self.sendJoints(mask, users)
+
+
+   def updateOccupancy(self, message):
+      ''' Keeps the latest occupancy grid of a client, to merge into the occupancy map sent to views
+          (see sendOccupancyMap).  The OSC Message should contain the values:
+               clientID, width, height, run, run, run, ... (see kuatroOccupancy.py)
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      clientID = args[0]
+      width = args[1]
+      height = args[2]
+
+      if clientID in self.deviceCalibrationData:   # grids cover the calibrated space of the device, so they map to the Virtual World
+         self.occupancyGrids[clientID] = (width, height, list(args[3:]), time.time())
+
+
+   def answerClockPing(self, message):
+      ''' Answers a clock ping from a client or view with the time on the server clock (see kuatroLatency.py).
+          The OSC Message should contain the values:
+               ipAddress, port, pingTime
+      '''
+
+      serverTime = milliseconds()
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+      pingTime = args[2]
+
+      if (ipAddress, port) not in self.clockOuts:
+         self.clockOuts[(ipAddress, port)] = self.transport.createOut(ipAddress, port)
+
+      self.clockOuts[(ipAddress, port)].sendMessage(CLOCK_PONG_MESSAGE, pingTime, serverTime)
+
+
+   def queryRadius(self, message):
+      ''' Answers a view's query for the users within a radius.  The OSC Message should contain the values:
+               ipAddress, port, queryID, x, y, radius     (see kuatroSpatial.py)
+      '''
+
+      self.answerQuery(message, "radius")
+
+
+   def queryNearest(self, message):
+      ''' Answers a view's query for the nearest users.  The OSC Message should contain the values:
+               ipAddress, port, queryID, x, y, k     (see kuatroSpatial.py)
+      '''
+
+      self.answerQuery(message, "nearest")
+
+
+   def queryRect(self, message):
+      ''' Answers a view's query for the users within a rectangle.  The OSC Message should contain the values:
+               ipAddress, port, queryID, x1, y1, x2, y2     (see kuatroSpatial.py)
+      '''
+
+      self.answerQuery(message, "rect")
+
+
+   def answerQuery(self, message, kind):
+      '''Sends the result of a query of kind to the (registered) view that asked for it'''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+      queryID = args[2]
+      parameters = list(args[3 : 3 + QUERY_KINDS[kind]])
+
+      if (ipAddress, port) in self.views:
+         self.sendQueryResult(self.views[(ipAddress, port)], queryID, self.spatialIndex.query(kind, parameters))
+      elif self.verbose != 0:
+         print "Query from unregistered view", ipAddress, "on", port
+
+
+   def addStandingQuery(self, message):
+      ''' Adds a standing query of a view; the view gets its result now, and again whenever the set of
+          users in the result changes.  The OSC Message should contain the values:
+               ipAddress, port, queryID, kind, parameters...     (see kuatroSpatial.py)
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+      queryID = args[2]
+      kind = args[3]
+
+      if (ipAddress, port) not in self.views:
+         if self.verbose != 0:
+            print "Standing query from unregistered view", ipAddress, "on", port
+         return
+
+      try:
+         query = StandingQuery(kind, list(args[4 : 4 + QUERY_KINDS.get(kind, 0)]))
+      except ValueError, e:
+         print e
+         return
+
+      view = self.views[(ipAddress, port)]
+      view.standingQueries[queryID] = query
+
+      query.update(self.spatialIndex)
+      self.sendQueryResult(view, queryID, query.result)
+
+
+   def removeStandingQuery(self, message):
+      ''' Removes a standing query of a view.  The OSC Message should contain the values:
+               ipAddress, port, queryID
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+      queryID = args[2]
+
+      if (ipAddress, port) in self.views and queryID in self.views[(ipAddress, port)].standingQueries:
+         del self.views[(ipAddress, port)].standingQueries[queryID]
+
+
+   def queryMotion(self, message):
+      ''' Sends a view the motion (vx, vy, speed, heading) of a user, or of all users.  The OSC Message should
+          contain the values:
+               ipAddress, port, queryID, userID (optional; all users if omitted)     (see kuatroTrajectory.py)
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+      queryID = args[2]
+
+      if (ipAddress, port) not in self.views:
+         if self.verbose != 0:
+            print "Motion query from unregistered view", ipAddress, "on", port
+         return
+
+      if len(args) > 3:
+         userIDs = [args[3]]
+      else:
+         userIDs = self.trajectories.getUserIDs()
+
+      motions = []
+      for userID in userIDs:
+         motion = self.trajectories.getMotion(userID)
+         if motion is not None:
+            motions.append((userID,) + motion)
+
+      self.sendInParts(self.views[(ipAddress, port)], KuatroServer.USER_MOTION_MESSAGE, queryID, motions)
+
+
+   def queryTrajectory(self, message):
+      ''' Sends a view the trajectory of a user over the last seconds (at most TRAJECTORY_SECONDS).  The OSC
+          Message should contain the values:
+               ipAddress, port, queryID, userID, seconds     (see kuatroTrajectory.py)
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+      queryID = args[2]
+      userID = args[3]
+      seconds = args[4]
+
+      if (ipAddress, port) not in self.views:
+         if self.verbose != 0:
+            print "Trajectory query from unregistered view", ipAddress, "on", port
+         return
+
+      path = self.trajectories.getPath(userID, seconds)
+      self.sendInParts(self.views[(ipAddress, port)], KuatroServer.TRAJECTORY_MESSAGE, queryID, path)
+
+
+   def getUserMotion(self, userID):
+      '''Returns the motion of a user, (vx, vy, speed, heading), in Virtual World units per second and
+         degrees (None for unknown users)'''
+
+      return self.trajectories.getMotion(userID)
 
-         if self.verbose !=0:
-            print "User:", virtualWorldUserID, "Coords:", newX, newY, newZ
+
+   def getLatencyStats(self):
+      '''Returns a dictionary with the latency percentiles of the server stages (see kuatroLatency.py)'''
+
+      return self.latencyStats.getStats()
 
 
    def registerDevice(self, message):
@@ -208,25 +683,112 @@ class KuatroServer():
       ''' Callback function for Kuatro View Registration. To register with this server,
           views send an OSC message containing the IP address and OSC Port of the view
           to the server.  The server then creates list of OSC connections to all registered
-          views. '''
+          views, and sends the view a snapshot of all users currently in the Virtual World.
+          The OSC Message should contain the values:
+               ipAddress, port, jointMask (optional; the skeleton joints the view wants, see kuatroJoints.py),
+               occupancy (optional; 1 if the view wants the occupancy map, see kuatroOccupancy.py),
+               outputRate (optional; coordinate messages per second the view wants, or 0 to get them as they arrive)
+      '''
 
       # parse arguments from OSC Message
       args = message.getArguments()
       ipAddress = args[0]
       port = args[1]
+      jointMask = 0
+      if len(args) > 2:        # (views that do not ask for joints never get them)
+         jointMask = args[2]
+      occupancy = False
+      if len(args) > 3:
+         occupancy = args[3] == 1
+      outputRate = 0
+      if len(args) > 4:
+         outputRate = args[4]
 
       # When a view registers with the server an OSC Out port is created and added to the 
       # list of ports.  When sending OSC messages, the server will send the same message 
       # to all OSC Ports.  
 
-      if (ipAddress, port) not in self.viewInfo:  # only add view if it is not already registered
+      if (ipAddress, port) not in self.views:  # only add view if it is not already registered
          try:     
-            self.viewInfo.append((ipAddress, port))          # add view details to 
-            self.viewPorts.append(OscOut(ipAddress, port))   # configure OSC Out port and add to list of ports
+            oscOut = self.endpoint.createOut(ipAddress, port)   # configure OSC Out port (lossy and reliable)
+            self.views[(ipAddress, port)] = KuatroViewConnection(ipAddress, port, oscOut, jointMask, occupancy, outputRate)   # and add view details to the registered views
             print "OSC Configured.  Sending messages to", ipAddress, "on", port
          except Exception, e:
             print e
             sys.exit(1)
+      else:
+         self.views[(ipAddress, port)].heartbeat()   # registering counts as a sign of life
+         self.views[(ipAddress, port)].jointMask = jointMask
+         self.views[(ipAddress, port)].occupancy = occupancy
+         self.views[(ipAddress, port)].outputRate = outputRate
+      self.updateOutputTimers()
+
+      # A view that registers again has most likely been restarted, so (re)send the snapshot in
+      # either case.  The view then knows about users that were added before it registered.
+      self.sendSnapshot(ipAddress, port)
+
+
+   def requestSnapshot(self, message):
+      ''' Callback for views that detected a gap in the world sequence numbers and need
+          to resync.  The OSC Message should contain the values:
+               ipAddress, port
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+
+      if (ipAddress, port) in self.views:   # only registered views can resync
+         self.sendSnapshot(ipAddress, port)
+
+
+   def viewHeartbeat(self, message):
+      ''' Callback for view heartbeats.  Views that send heartbeats are expected to keep sending
+          them every HEARTBEAT_INTERVAL; if they stop, they are backed off and eventually evicted.
+          (Views that never send a heartbeat are never evicted.)  The OSC Message should contain the values:
+               ipAddress, port, jointMask, occupancy, outputRate (optional, so a view registered again still gets
+               its joints, occupancy map and output rate)
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+
+      if (ipAddress, port) in self.views:
+         self.views[(ipAddress, port)].heartbeat()
+
+      else:   # the view was evicted (e.g., the network was down for a while), so register it again
+         jointMask = 0
+         if len(args) > 2:
+            jointMask = args[2]
+         occupancy = 0
+         if len(args) > 3:
+            occupancy = args[3]
+         outputRate = 0
+         if len(args) > 4:
+            outputRate = args[4]
+
+         print "Heartbeat from unregistered view", ipAddress, "on", port, "- registering it again"
+         registration = [ipAddress, port, jointMask, occupancy, outputRate]   # (the arguments registerView expects)
+         self.registerView(KuatroMessage(KuatroServer.REGISTER_VIEW_MESSAGE, registration))
+         self.views[(ipAddress, port)].heartbeat()
+
+
+   def unregisterView(self, message):
+      ''' Callback for views that are shutting down.  The OSC Message should contain the values:
+               ipAddress, port
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      ipAddress = args[0]
+      port = args[1]
+
+      if (ipAddress, port) in self.views:
+         self.removeView(self.views[(ipAddress, port)])
+         print "View unregistered:", ipAddress, "on", port
 
             
 
@@ -266,7 +828,9 @@ class KuatroServer():
       '''Takes User Coordinate data from a device and translates it to Virtual World 
          coordinates'''
 
-      print self.deviceCalibrationData
+      if self.verbose == 2:
+         print self.deviceCalibrationData
+
       ### Get Coordination Data ###
       minX = self.deviceCalibrationData[clientID][0]
       minY = self.deviceCalibrationData[clientID][1]
@@ -281,11 +845,12 @@ class KuatroServer():
       # transpose the Z values from the device to the Y values of the 
       # virtual world
 
-      print x
-      print minX
-      print maxX
-      print 0
-      print self.virtualMaxX
+      if self.verbose == 2:
+         print x
+         print minX
+         print maxX
+         print 0
+         print self.virtualMaxX
 
       x = max(x, minX)   # keep x in range
       x = min(x, maxX)
@@ -296,30 +861,408 @@ class KuatroServer():
       z = max(z, minZ)   # keep z in range
       z = min(z, maxZ)
       newY = mapValue(z, minZ, maxZ, 0.1, self.virtualMaxY)
-      print "z:", z, "minZ:", minZ, "maxZ:", maxZ
-      print "New Y:", newY
+      if self.verbose == 2:
+         print "z:", z, "minZ:", minZ, "maxZ:", maxZ
+         print "New Y:", newY
 
       newZ = 0  # not support Virtual World Z at this moment
 
       return newX, newY, newZ
 
 
+   def calibrateJointCoordinates(self, x, y, z, clientID):
+      '''Calibrates a skeleton joint to the Virtual World.  Like users, joints are placed on the overhead
+         Virtual World (x, y); their z is the height of the joint, as measured by the device.
+         Joints the device could not see (0, 0, 0) stay 0, 0, 0.'''
+
+      if x == 0 and y == 0 and z == 0:
+         return 0, 0, 0
+
+      newX, newY, newZ = self.calibrateUserCoordinates(x, y, z, clientID)
+      return newX, newY, y
+
+
    def sendMessage(self, address, *args):
-      '''Helper method to send OSC messages using OSC Out port.
+      '''Helper method to send OSC messages using OSC Out port, to the views that get coordinates as they
+         arrive (views with an output rate get resampled coordinates instead, see sendResampledCoordinates).
          *args allows calling method to send any number of parameters'''
 
 
-      if len(self.viewPorts) > 0:      # make sure at least one oscOut port is setup
+      if len(self.views) > 0:      # make sure at least one oscOut port is setup
 
-         for oscOut in self.viewPorts:  # loop through all osc ports
-            print "Sending message to:", address
-            print "Data:", args
-            oscOut.sendMessage(address, *args)  # send osc message through osc port
+         now = time.time()
+         for view in self.views.values():  # loop through all osc ports
 
-      else:
+            if view.outputRate:
+               continue
+
+            if view.isBackedOff(now):        # view missed heartbeats, so it only gets an occasional update
+               self.skippedSends = self.skippedSends + 1
+               continue
+
+            if self.verbose == 2:
+               print "Sending message to:", address
+               print "Data:", args
+            view.oscOut.sendMessage(address, *args)  # send osc message through osc port
+            view.countSend()
+
+      elif self.verbose == 2:
          print "No OSC out ports are setup"
 
 
+   def sendResampledCoordinates(self, outputRate):
+      '''Timer function that sends the coordinates of all users, resampled to now (see kuatroResampler.py), to
+         the views with this output rate.  Users that did not move since the last time are left out.'''
+
+      views = [view for view in self.views.values() if view.outputRate == outputRate]
+      if not views:
+         return
+
+      now = time.time()
+      sendTime = milliseconds()
+
+      lastCoordinates = self.lastResampled.get(outputRate, {})
+      coordinates = {}
+      messages = []
+      for userID, x, y, z, captureTime in self.resampler.getStampedPositions(now):
+         coordinates[userID] = (x, y, z)
+         if lastCoordinates.get(userID) != (x, y, z):
+            if captureTime is None:   # (from a client whose clock is not synchronized)
+               messages.append((userID, x, y, z, self.worldSeq))
+            else:                     # (frame ID -1, since they come from several frames; the capture time is interpolated between them)
+               messages.append((userID, x, y, z, self.worldSeq, -1, int(round(captureTime)), sendTime))
+      self.lastResampled[outputRate] = coordinates
+
+      for view in views:
+
+         if view.isBackedOff(now):        # view missed heartbeats, so it only gets an occasional update
+            self.skippedSends = self.skippedSends + 1
+            continue
+
+         for args in messages:
+            view.oscOut.sendMessage(KuatroServer.USER_COORDINATES_MESSAGE, *args)
+            view.countSend()
+
+
+   def updateOutputTimers(self):
+      '''Starts a Timer for every output rate views asked for (one per rate, shared by the views), and
+         stops the Timers of rates no view asks for anymore'''
+
+      outputRates = set([view.outputRate for view in self.views.values() if view.outputRate])
+
+      for outputRate in outputRates:
+         if outputRate not in self.outputTimers:
+            self.outputTimers[outputRate] = Timer(int(1000 / outputRate), self.sendResampledCoordinates, [outputRate])
+            self.outputTimers[outputRate].start()
+
+      for outputRate in self.outputTimers.keys():
+         if outputRate not in outputRates:
+            self.outputTimers[outputRate].stop()
+            del self.outputTimers[outputRate]
+            if outputRate in self.lastResampled:
+               del self.lastResampled[outputRate]
+
+
+   def updateStandingQueries(self, userID):
+      '''Updates the standing queries of all views after userID moved (or was added or removed), and
+         sends the results that changed'''
+
+      for view in self.views.values():
+         for queryID, query in view.standingQueries.items():
+            if query.update(self.spatialIndex, userID):
+               self.sendQueryResult(view, queryID, query.result)
+
+
+   def sendQueryResult(self, view, queryID, users):
+      '''Sends the result of a query, i.e. a list of (userID, x, y), to a view'''
+
+      self.sendInParts(view, KuatroServer.QUERY_RESULT_MESSAGE, queryID, users)
+
+
+   def sendInParts(self, view, address, queryID, items):
+      '''Sends the answer to a query, i.e. a list of tuples (e.g., (userID, x, y)), to a view, in parts of
+         QUERY_USERS_PER_MESSAGE tuples; each part contains:
+               queryID, part, parts, tuple, tuple, ...     (e.g., userID, x, y, userID, x, y, ...)'''
+
+      itemsPerMessage = KuatroServer.QUERY_USERS_PER_MESSAGE
+      parts = max(1, (len(items) + itemsPerMessage - 1) / itemsPerMessage)
+
+      for part in range(parts):
+
+         args = [queryID, part, parts]
+         for item in items[part * itemsPerMessage : (part + 1) * itemsPerMessage]:
+            args.extend(item)
+
+         view.oscOut.sendReliable(address, *args)
+         view.countSend()
+
+
+   def sendReliableMessage(self, address, *args):
+      '''Helper method to send control messages (e.g., new and lost user) to all views.
+         Views acknowledge these messages; unacknowledged ones are retransmitted.'''
+
+      if len(self.views) > 0:      # make sure at least one oscOut port is setup
+
+         for view in self.views.values():  # loop through all osc ports
+            view.oscOut.sendReliable(address, *args)  # send osc message through osc port (control messages are never backed off)
+            view.countSend()
+
+      elif self.verbose == 2:
+         print "No OSC out ports are setup"
+
+
+   def sendJoints(self, mask, users):
+      '''Sends the joints of users, i.e. a list of (userID, [x, y, z, ...]) with the joints in mask, to the
+         views that asked for joints.  Each view gets only the joints it asked for; the joints are packed
+         once for every distinct set of joints.'''
+
+      messages = {}      # maps a joint mask to the list of packed messages (argument lists) with these joints
+
+      now = time.time()
+      for view in self.views.values():
+
+         viewMask = view.jointMask & mask
+         if viewMask == 0:                 # the view did not ask for any of these joints
+            continue
+
+         if view.isBackedOff(now):         # view missed heartbeats, so it only gets an occasional update
+            self.skippedSends = self.skippedSends + 1
+            continue
+
+         if viewMask not in messages:
+            messages[viewMask] = self.packJoints(mask, viewMask, users)
+
+         for args in messages[viewMask]:
+            view.oscOut.sendMessage(KuatroServer.USER_JOINTS_MESSAGE, *args)
+            view.countSend()
+
+
+   def sendOccupancyMap(self):
+      '''Timer function that merges the latest occupancy grids of all clients into one occupancy map of the
+         Virtual World, and sends it to the views that asked for it (only when it changed, or once a second).
+         The calibration of each device maps its grid to the Virtual World as a whole, so the grids are
+         merged cell by cell.'''
+
+      views = [view for view in self.views.values() if view.occupancy]
+      if not views:
+         return
+
+      now = time.time()
+
+      # drop the grids of clients that stopped sending them (e.g., a client that was shut down)
+      for clientID, (width, height, runs, received) in self.occupancyGrids.items():
+         if now - received > KuatroServer.OCCUPANCY_TIMEOUT:
+            del self.occupancyGrids[clientID]
+
+      grids = self.occupancyGrids.values()
+      if not grids:
+         return
+
+      width, height = grids[0][0], grids[0][1]
+      if self.occupancyMap is None or (self.occupancyMap.width, self.occupancyMap.height) != (width, height):
+         self.occupancyMap = OccupancyGrid(width, height)
+
+      self.occupancyMap.clear()
+      for gridWidth, gridHeight, runs, received in grids:
+         if (gridWidth, gridHeight) == (width, height):   # (clients configured with another grid size are left out)
+            self.occupancyMap.decode(runs, False)
+
+      runs = self.occupancyMap.encode()
+      if runs == self.lastOccupancyRuns and now - self.lastOccupancyKeyframe < 1.0:
+         return
+      self.lastOccupancyRuns = runs
+      self.lastOccupancyKeyframe = now
+
+      args = [width, height] + runs + [self.worldSeq]
+      for view in views:
+
+         if view.isBackedOff(now):         # view missed heartbeats, so it only gets an occasional update
+            self.skippedSends = self.skippedSends + 1
+            continue
+
+         view.oscOut.sendMessage(KuatroServer.OCCUPANCY_MAP_MESSAGE, *args)
+         view.countSend()
+
+
+   def packJoints(self, mask, viewMask, users):
+      '''Returns the argument lists of the joints messages with the joints in viewMask (a subset of mask),
+         JOINT_USERS_PER_MESSAGE users per message (see kuatroJoints.py)'''
+
+      # the positions (within the joints in mask) of the joints in viewMask
+      positions = []
+      position = 0
+      for bit in range(len(JOINTS)):
+         if mask & (1 << bit):
+            if viewMask & (1 << bit):
+               positions.append(position)
+            position = position + 1
+
+      messages = []
+      usersPerMessage = KuatroServer.JOINT_USERS_PER_MESSAGE
+      for i in range(0, len(users), usersPerMessage):
+
+         part = users[i : i + usersPerMessage]
+         args = [viewMask, len(part)]
+         for userID, coordinates in part:
+            args.append(userID)
+            for position in positions:
+               args.extend(coordinates[position * 3 : position * 3 + 3])
+         args.append(self.worldSeq)
+
+         messages.append(args)
+
+      return messages
+
+
+   def sendSnapshot(self, ipAddress, port):
+      '''Sends all current users and their coordinates to the view at ipAddress / port.
+         The snapshot is split into parts of SNAPSHOT_USERS_PER_MESSAGE users; each part contains:
+               worldSeq, part, parts, userID, x, y, z, userID, x, y, z, ...
+         Later messages to the view carry world sequence numbers following worldSeq.'''
+
+      oscOut = self.views[(ipAddress, port)].oscOut
+
+      # copy the users and their world sequence number together (the ingest thread changes both), and send outside the lock
+      self.usersLock.acquire()
+      try:
+         users = self.virtualUsers.items()
+         worldSeq = self.worldSeq
+      finally:
+         self.usersLock.release()
+
+      usersPerMessage = KuatroServer.SNAPSHOT_USERS_PER_MESSAGE
+      parts = max(1, (len(users) + usersPerMessage - 1) / usersPerMessage)
+
+      for part in range(parts):
+
+         args = [worldSeq, part, parts]
+         for userID, (x, y, z) in users[part * usersPerMessage : (part + 1) * usersPerMessage]:
+            args.extend([userID, x, y, z])
+
+         oscOut.sendReliable(KuatroServer.WORLD_SNAPSHOT_MESSAGE, *args)
+
+      if self.verbose != 0:
+         print "Sent snapshot of", len(users), "users to", ipAddress, "on", port
+
+
+   def checkViews(self):
+      '''Timer function that updates the liveness of all views and evicts the ones
+         that missed EVICT_AFTER heartbeats'''
+
+      now = time.time()
+
+      for view in self.views.values():
+         missed = view.updateMissedHeartbeats(now)
+
+         if missed >= KuatroServer.EVICT_AFTER:
+            self.wastedSends = self.wastedSends + view.sendsSinceHeartbeat
+            self.evictedViews = self.evictedViews + 1
+            self.removeView(view)
+            print "View evicted (no heartbeat):", view.ipAddress, "on", view.port, "- wasted sends:", view.sendsSinceHeartbeat
+
+
+   def removeView(self, view):
+      '''Stops sending messages to view'''
+
+      if (view.ipAddress, view.port) in self.views:
+         del self.views[(view.ipAddress, view.port)]
+         self.endpoint.removeOut(view.oscOut)   # and stop retransmitting to it
+         self.endpoint.removePeer(view.ipAddress, view.port)   # (and drop what is known of its streams)
+         self.updateOutputTimers()
+
+
+   def getIngestStats(self):
+      '''Returns a dictionary with the ingest counters (received, processed and shed sensor messages), whether the
+         server is overloaded, and the percentiles of the ingest lag (see kuatroIngest.py)'''
+
+      return self.ingest.getIngestStats()
+
+
+   def getViewStats(self):
+      '''Returns a dictionary with send counters for all views (and totals), e.g. to
+         check that outbound cost tracks the set of live views'''
+
+      stats = {"wastedSends" : self.wastedSends, "skippedSends" : self.skippedSends, "evictedViews" : self.evictedViews, "views" : {}}
+
+      for view in self.views.values():
+         stats["views"][(view.ipAddress, view.port)] = {"sends" : view.sends, "sendsSinceHeartbeat" : view.sendsSinceHeartbeat,
+                                                      "missedHeartbeats" : view.missedHeartbeats}
+
+      return stats
+
+
+   def findIpAddress(self):
+      '''Returns the IP Address of this computer (used by views and clients to send acks back)'''
+
+      try:
+         return socket.gethostbyname(socket.getfqdn())
+      except:
+         return "localhost"
+
+
+class KuatroViewConnection():
+   '''A view registered with the Kuatro Server: its OSC Out port, its liveness state, and the joints (and occupancy map) it wants'''
+
+   def __init__(self, ipAddress, port, oscOut, jointMask = 0, occupancy = False, outputRate = 0):
+
+      self.ipAddress = ipAddress
+      self.port = port
+      self.oscOut = oscOut                 # ReliableOscOut to the view
+      self.jointMask = jointMask           # the skeleton joints the view asked for (see kuatroJoints.py)
+      self.occupancy = occupancy           # True if the view asked for the occupancy map (see kuatroOccupancy.py)
+      self.outputRate = outputRate         # coordinate messages per second the view asked for (0 = as they arrive)
+      self.standingQueries = {}            # maps the queryID of each standing query of the view to its StandingQuery (see kuatroSpatial.py)
+
+      self.usesHeartbeats = False          # set once the view sends its first heartbeat (older views never do, and are never evicted)
+      self.lastHeartbeat = time.time()
+      self.missedHeartbeats = 0
+      self.nextSendTime = 0                # while backed off, the time the view gets its next coordinate message
+
+      self.sends = 0                       # messages sent to the view
+      self.sendsSinceHeartbeat = 0         # messages sent since the last heartbeat (wasted, if the view turns out to be dead)
+
+
+   def heartbeat(self):
+      '''Records a sign of life from the view'''
+
+      self.usesHeartbeats = True
+      self.lastHeartbeat = time.time()
+      self.missedHeartbeats = 0
+      self.sendsSinceHeartbeat = 0
+
+
+   def updateMissedHeartbeats(self, now):
+      '''Updates and returns the number of heartbeats the view missed'''
+
+      if self.usesHeartbeats:
+         self.missedHeartbeats = int((now - self.lastHeartbeat) * 1000 / KuatroServer.HEARTBEAT_INTERVAL)
+
+      return self.missedHeartbeats
+
+
+   def isBackedOff(self, now):
+      '''Returns True if a coordinate message to this view should be skipped.  A view that missed
+         SUSPECT_AFTER heartbeats gets one message per backoff interval, and the interval doubles
+         with every further missed heartbeat.'''
+
+      if self.missedHeartbeats < KuatroServer.SUSPECT_AFTER:
+         return False
+
+      if now < self.nextSendTime:
+         return True
+
+      interval = min(KuatroServer.MIN_BACKOFF_INTERVAL * 2 ** (self.missedHeartbeats - KuatroServer.SUSPECT_AFTER), KuatroServer.MAX_BACKOFF_INTERVAL)
+      self.nextSendTime = now + interval / 1000.0
+      return False
+
+
+   def countSend(self):
+      '''Counts a message sent to the view'''
+
+      self.sends = self.sends + 1
+      self.sendsSinceHeartbeat = self.sendsSinceHeartbeat + 1
+
+
 ##### Instantiate a Server
 if __name__ == '__main__':
    kuatroServer = KuatroServer(verbose=1)
\ No newline at end of file
@@ -0,0 +1,157 @@
+# kuatroShardBenchmark.py       Version  1.0     19-Oct-2026
+#
+# Measures the throughput of the sharded Kuatro Server (see kuatroShardedServer.py) as
+# Ingest Workers are added.  For 1, 2, ..., maxWorkers workers, the benchmark starts that many
+# worker processes next to one coordinator (in this process) with one registered view.  Every
+# worker generates synthetic load for its own devices: it feeds coordinate updates straight
+# into its moveUser() callback as fast as it can, so the measurement covers calibration,
+# filtering, frame forwarding, merging and fan-out, but not the clients' UDP traffic.
+#
+# For every number of workers it reports:
+#
+#     ingest/s   - coordinate updates calibrated per second (all workers together)
+#     merged/s   - user coordinates merged into the Virtual World by the coordinator per second
+#     view/s     - coordinate messages received by the view per second
+#
+# To run it:
+#
+#     sh jython.sh kuatroShardBenchmark.py [maxWorkers] [devicesPerWorker] [usersPerDevice] [seconds]
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroShardedServer import *
+from kuatroMessage import KuatroMessage
+from osc import OscIn
+import subprocess
+import random
+import time
+import sys
+
+COORDINATOR_PORT = 50590
+FIRST_WORKER_PORT = 50591
+VIEW_PORT = 60690
+
+
+class BenchmarkCoordinator(KuatroCoordinator):
+   '''A coordinator that records when the first and the last frame of a round arrived'''
+
+   def reset(self):
+      self.framesIn = 0
+      self.updatesIn = 0
+      self.firstFrameTime = None
+      self.lastFrameTime = None
+
+   def mergeFrame(self, message):
+      KuatroCoordinator.mergeFrame(self, message)
+
+      now = time.time()
+      if self.firstFrameTime is None:
+         self.firstFrameTime = now
+      self.lastFrameTime = now
+
+
+class BenchmarkView():
+   '''A view that only counts coordinate messages'''
+
+   def __init__(self, port):
+      self.received = 0
+      self.oscIn = OscIn(port)
+      self.oscIn.onInput(KuatroServer.USER_COORDINATES_MESSAGE, self.count)
+
+   def count(self, message):
+      self.received = self.received + 1
+
+
+def runWorker(workerID, port, devices, usersPerDevice, seconds):
+   '''Worker process: generates synthetic load and prints the number of updates it calibrated'''
+
+   worker = KuatroIngestWorker(workerID, port, "localhost", COORDINATOR_PORT)
+
+   # devices with Kinect-like calibration data and users at random positions
+   positions = {}
+   for d in range(devices):
+      clientID = "%s-device%d" % (workerID, d)
+      worker.calibrateDevice(KuatroMessage(KuatroServer.CALIBRATE_DEVICE_MESSAGE, [clientID, -5000, -1000, 0, 5000, -1000, 15000]))
+
+      for u in range(usersPerDevice):
+         x, z = random.uniform(-5000, 5000), random.uniform(0, 15000)
+         positions[(u, clientID)] = [x, z]
+         worker.addUser(KuatroMessage(KuatroServer.NEW_USER_MESSAGE, [u, x, 0, z, clientID]))
+
+   time.sleep(1.0)   # give the coordinator time to add the users
+
+   # feed random walks to the worker for the given number of seconds
+   updates = 0
+   start = time.time()
+   end = start + seconds
+   while time.time() < end:
+      for (userID, clientID), position in positions.items():
+         position[0] = min(5000, max(-5000, position[0] + random.uniform(-50, 50)))
+         position[1] = min(15000, max(0, position[1] + random.uniform(-50, 50)))
+         worker.moveUser(KuatroMessage(KuatroServer.USER_COORDINATES_MESSAGE, [userID, position[0], 0, position[1], clientID]))
+      updates = updates + len(positions)
+   elapsed = time.time() - start
+
+   time.sleep(0.5)   # let the last frame go out
+   worker.stop()
+
+   print "INGESTED", updates, elapsed
+   sys.stdout.flush()
+
+
+def runBenchmark(maxWorkers, devices, usersPerDevice, seconds):
+   '''Runs the benchmark for 1...maxWorkers workers and prints the results'''
+
+   coordinator = BenchmarkCoordinator(COORDINATOR_PORT)
+   view = BenchmarkView(VIEW_PORT)
+   coordinator.registerView(KuatroMessage(KuatroServer.REGISTER_VIEW_MESSAGE, ["localhost", VIEW_PORT]))
+
+   results = []
+   for workers in range(1, maxWorkers + 1):
+
+      coordinator.reset()
+      view.received = 0
+
+      # start the workers (each in its own process)
+      processes = []
+      for w in range(workers):
+         workerID = "round%d-worker%d" % (workers, w)
+         command = [sys.executable, sys.argv[0], "--worker", workerID, str(FIRST_WORKER_PORT + w),
+                    str(devices), str(usersPerDevice), str(seconds)]
+         processes.append(subprocess.Popen(command, stdout = subprocess.PIPE))
+
+      # and collect how much load they generated
+      ingestRate = 0.0
+      for process in processes:
+         output = process.communicate()[0]
+         for line in output.splitlines():
+            if line.startswith("INGESTED"):
+               fields = line.split()
+               ingestRate = ingestRate + int(fields[1]) / float(fields[2])
+
+      duration = 0
+      if coordinator.firstFrameTime is not None:
+         duration = coordinator.lastFrameTime - coordinator.firstFrameTime
+      duration = max(duration, 0.001)
+
+      results.append((workers, ingestRate, coordinator.updatesIn / duration, view.received / duration))
+
+   print
+   print "Sharded Kuatro Server throughput (%d devices per worker, %d users per device, %d seconds)" % (devices, usersPerDevice, seconds)
+   print "%8s %12s %12s %12s" % ("workers", "ingest/s", "merged/s", "view/s")
+   for workers, ingestRate, mergeRate, viewRate in results:
+      print "%8d %12.0f %12.0f %12.0f" % (workers, ingestRate, mergeRate, viewRate)
+
+
+if __name__ == '__main__':
+
+   if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+      runWorker(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]), float(sys.argv[6]))
+
+   else:
+      maxWorkers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+      devices = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+      usersPerDevice = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+      seconds = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+      runBenchmark(maxWorkers, devices, usersPerDevice, seconds)
@@ -0,0 +1,409 @@
+# kuatroShardedServer.py       Version  1.0     19-Oct-2026
+#
+# A sharded Kuatro Server for large (e.g. multi-room) installations.  A single KuatroServer
+# does calibration, mapping and fan-out for every device through one OscIn callback path,
+# so it is bound to one core.  In sharded mode the work is split across processes:
+#
+#   - Several Ingest Workers (KuatroIngestWorker), each running in its own process.  A worker
+#     owns a subset of the client devices (the clients send to the worker's port instead of the
+#     server's), does the calibration and filtering for them, and forwards compact per-frame
+#     results to the coordinator.
+#
+#   - One Coordinator (KuatroCoordinator) that merges the users of all workers into the Virtual
+#     World and does the view fan-out.  Views register with the coordinator exactly as they
+#     register with a KuatroServer.
+#
+# Worker-to-Coordinator API:
+#
+#     /kuatro/shard/registerWorker , workerID, ipAddress, port          (reliable)
+#     /kuatro/shard/newUser , workerID, userID, x, y, z                 (reliable, calibrated coordinates)
+#     /kuatro/shard/lostUser , workerID, userID                         (reliable)
+#     /kuatro/shard/frame , workerID, n, userID, x, y, frameID, captureTime, userID, ...   (one message per frame, latest coordinates only)
+#     /kuatro/shard/joints , workerID, jointMask, n, userID, x, y, z, ..., userID, ...   (calibrated skeleton joints, as they arrive)
+#     /kuatro/shard/occupancy , workerID, clientID, width, height, run, run, ...        (occupancy grids of calibrated clients, as they arrive)
+#
+# Frame IDs and capture times (see kuatroLatency.py) travel with the coordinates.  Workers keep their
+# clocks aligned with the coordinator's, and forward capture times on the coordinator's clock (frameID
+# and captureTime are -1 for coordinates without them, or while the worker's clock is not synchronized).
+#
+# Views register with the coordinator for joints and occupancy maps exactly as with a KuatroServer;
+# workers forward the joints of every client frame and every occupancy grid, the coordinator sends
+# each view the joints it asked for, and merges the grids of all workers into one occupancy map.
+#
+# To start a sharded installation, start the coordinator and the workers as separate processes:
+#
+#     sh jython.sh kuatroShardedServer.py coordinator [port]
+#     sh jython.sh kuatroShardedServer.py worker <workerID> <port> [coordinatorIP] [coordinatorPort]
+#
+# and point each client at the port of one worker (see workerPortForDevice).
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroServer import *
+from kuatroLatency import ClockSync
+from threading import Thread, Lock
+import time
+
+
+##### OSC Namespace #####
+REGISTER_WORKER_MESSAGE = "/kuatro/shard/registerWorker"
+SHARD_NEW_USER_MESSAGE = "/kuatro/shard/newUser"
+SHARD_LOST_USER_MESSAGE = "/kuatro/shard/lostUser"
+SHARD_FRAME_MESSAGE = "/kuatro/shard/frame"
+SHARD_JOINTS_MESSAGE = "/kuatro/shard/joints"
+SHARD_OCCUPANCY_MESSAGE = "/kuatro/shard/occupancy"
+
+
+def workerPortForDevice(clientID, workerPorts):
+   '''Returns the port of the worker that owns the device clientID, so that all
+      clients (and restarted clients) agree on the assignment of devices to workers'''
+
+   checksum = 0
+   for character in str(clientID):     # a simple checksum, since hash() of strings differs between Python versions
+      checksum = (checksum * 31 + ord(character)) % 1000003
+
+   return workerPorts[checksum % len(workerPorts)]
+
+
+class KuatroIngestWorker(KuatroServer):
+   '''A KuatroServer that owns a subset of the client devices.  Instead of sending to views,
+      it forwards new / lost users (reliably), per-frame coordinates, skeleton joints and occupancy grids to the coordinator.'''
+
+   FRAME_RATE = 30           # frames forwarded to the coordinator per second
+   USERS_PER_FRAME_MESSAGE = 100   # users per frame message (keeps each message well below the UDP packet size)
+
+   def __init__(self, workerID, port = 50510, coordinatorIP = "localhost", coordinatorPort = 50505, deadband = 1.0, verbose = 0):
+
+      KuatroServer.__init__(self, port, verbose)
+
+      self.workerID = workerID      # unique ID of this worker
+      self.deadband = deadband      # users that moved less than this (in Virtual World units) since the last frame are not forwarded
+
+      self.frame = {}               # maps user ID to its newest (x, y, frameID, captureTime) since the last frame (latest wins)
+      self.lastForwarded = {}       # maps user ID to the (x, y) last forwarded to the coordinator
+      self.frameLock = Lock()
+
+      # counters
+      self.updatesIn = 0            # coordinate updates received from clients
+      self.updatesOut = 0           # coordinate updates forwarded to the coordinator
+      self.updatesFiltered = 0      # coordinate updates not forwarded (superseded within a frame, or within the deadband)
+      self.framesOut = 0            # frame messages sent to the coordinator
+
+      # connect to the coordinator (the acks come back to this worker's port)
+      self.coordinator = self.endpoint.createOut(coordinatorIP, coordinatorPort)
+      self.coordinator.sendReliable(REGISTER_WORKER_MESSAGE, self.workerID, self.findIpAddress(), port)
+
+      # keep this worker's clock aligned with the coordinator's (capture times are forwarded on the coordinator's clock)
+      self.clock = ClockSync(self.dispatcher, self.coordinator, self.findIpAddress(), port)
+
+      # setup thread to forward frames
+      self.isRunning = True
+      self.frameThread = Thread(target = self.run)
+      self.frameThread.setDaemon(True)
+      self.frameThread.start()
+
+
+   def sendReliableMessage(self, address, *args):
+      '''Forwards new and lost users to the coordinator (instead of sending them to views)'''
+
+      if address == KuatroServer.NEW_USER_MESSAGE:
+         userID, x, y, z = args[0:4]
+         self.coordinator.sendReliable(SHARD_NEW_USER_MESSAGE, self.workerID, userID, x, y, z)
+
+      elif address == KuatroServer.LOST_USER_MESSAGE:
+         userID = args[0]
+
+         self.frameLock.acquire()
+         try:
+            if userID in self.frame:            # coordinates of a lost user are of no use anymore
+               del self.frame[userID]
+            if userID in self.lastForwarded:
+               del self.lastForwarded[userID]
+         finally:
+            self.frameLock.release()
+
+         self.coordinator.sendReliable(SHARD_LOST_USER_MESSAGE, self.workerID, userID)
+
+
+   def sendMessage(self, address, *args):
+      '''Keeps the newest calibrated coordinates of each user until the next frame is forwarded'''
+
+      if address == KuatroServer.USER_COORDINATES_MESSAGE:
+         userID, x, y = args[0:3]
+         frameID, captureTime = -1, -1
+         if len(args) > 6:                 # (userID, x, y, z, worldSeq, frameID, captureTime, sendTime)
+            frameID, captureTime = args[5], args[6]
+
+         self.frameLock.acquire()
+         try:
+            if userID in self.frame:
+               self.updatesFiltered = self.updatesFiltered + 1   # superseded within this frame
+            self.frame[userID] = (x, y, frameID, captureTime)
+            self.updatesIn = self.updatesIn + 1
+         finally:
+            self.frameLock.release()
+
+
+   def sendJoints(self, mask, users):
+      '''Forwards the calibrated joints of users, i.e. a list of (userID, [x, y, z, ...]) with the joints in mask,
+         to the coordinator (which sends them to the views that asked for joints)'''
+
+      joints = jointCount(mask)
+      usersPerMessage = KuatroServer.JOINT_USERS_PER_MESSAGE
+      for i in range(0, len(users), usersPerMessage):
+
+         part = users[i : i + usersPerMessage]
+         args = [self.workerID, mask, len(part)]
+         for userID, coordinates in part:
+            args.append(userID)
+            args.extend(coordinates[0 : joints * 3])
+
+         self.coordinator.sendMessage(SHARD_JOINTS_MESSAGE, *args)
+
+
+   def updateOccupancy(self, message):
+      '''Forwards the occupancy grid of a calibrated client to the coordinator (which merges the grids into the
+         occupancy map it sends to views)'''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      clientID = args[0]
+
+      if clientID in self.deviceCalibrationData:   # grids cover the calibrated space of the device, so they map to the Virtual World
+         self.coordinator.sendMessage(SHARD_OCCUPANCY_MESSAGE, self.workerID, *args)
+
+
+   def sendFrame(self):
+      '''Forwards the coordinates of all users that moved since the last frame to the coordinator'''
+
+      offset = None                 # from this worker's clock to the coordinator's
+      if self.clock.isSynchronized():
+         offset = self.clock.estimator.getOffset()
+
+      users = []
+
+      self.frameLock.acquire()      # (lost users are removed from lastForwarded by the ingest thread)
+      try:
+         frame = self.frame
+         self.frame = {}
+
+         for userID, (x, y, frameID, captureTime) in frame.items():
+
+            last = self.lastForwarded.get(userID)
+            if last and abs(x - last[0]) < self.deadband and abs(y - last[1]) < self.deadband:
+               self.updatesFiltered = self.updatesFiltered + 1   # filter jitter
+               continue
+
+            self.lastForwarded[userID] = (x, y)
+            if captureTime < 0 or offset is None:
+               frameID, captureTime = -1, -1
+            else:
+               captureTime = int(captureTime + offset)
+            users.append((userID, x, y, frameID, captureTime))
+      finally:
+         self.frameLock.release()
+
+      usersPerMessage = KuatroIngestWorker.USERS_PER_FRAME_MESSAGE
+      for i in range(0, len(users), usersPerMessage):
+
+         part = users[i : i + usersPerMessage]
+         args = [self.workerID, len(part)]
+         for user in part:
+            args.extend(user)
+
+         self.coordinator.sendMessage(SHARD_FRAME_MESSAGE, *args)
+         self.framesOut = self.framesOut + 1
+
+      self.updatesOut = self.updatesOut + len(users)
+
+
+   def run(self):
+      '''Forwards a frame every 1/FRAME_RATE seconds (via a seperate thread)'''
+
+      delay = 1.0 / KuatroIngestWorker.FRAME_RATE
+      nextFrame = time.time() + delay
+
+      while self.isRunning:
+         time.sleep(max(0, nextFrame - time.time()))
+         nextFrame = nextFrame + delay
+         self.sendFrame()
+
+
+   def stop(self):
+      '''Stops forwarding frames'''
+
+      self.isRunning = False
+      self.clock.stop()
+
+
+   def getWorkerStats(self):
+      '''Returns a dictionary with the worker counters'''
+
+      return {"updatesIn" : self.updatesIn, "updatesOut" : self.updatesOut, "updatesFiltered" : self.updatesFiltered,
+              "framesOut" : self.framesOut, "users" : len(self.virtualUsers)}
+
+
+class KuatroCoordinator(KuatroServer):
+   '''A KuatroServer that receives calibrated users from Ingest Workers (instead of clients),
+      merges them into one Virtual World, and sends it to the registered views.'''
+
+   def __init__(self, port = 50505, verbose = 0):
+
+      KuatroServer.__init__(self, port, verbose)
+
+      self.workers = {}          # maps a worker ID to the (ipAddress, port) of the worker
+
+      # counters
+      self.framesIn = 0          # frame messages received from workers
+      self.updatesIn = 0         # user coordinates received in frames
+
+      # the Worker-to-Coordinator API (users are stored in deviceUsers as (userID, workerID))
+      self.endpoint.onInput(REGISTER_WORKER_MESSAGE, self.registerWorker)
+      self.endpoint.onInput(SHARD_NEW_USER_MESSAGE, self.addWorkerUser)
+      self.endpoint.onInput(SHARD_LOST_USER_MESSAGE, self.removeWorkerUser)
+      self.dispatcher.onInput(SHARD_FRAME_MESSAGE, self.mergeFrame)   # frames are lossy, the next one replaces a lost one
+      self.dispatcher.onInput(SHARD_JOINTS_MESSAGE, self.mergeJoints)         # joints are lossy as well
+      self.dispatcher.onInput(SHARD_OCCUPANCY_MESSAGE, self.mergeOccupancy)   # and so are occupancy grids
+
+
+   def registerWorker(self, message):
+      ''' Registers an Ingest Worker.  The OSC Message should contain the values:
+               workerID, ipAddress, port
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      workerID = args[0]
+      ipAddress = args[1]
+      port = args[2]
+
+      self.workers[workerID] = (ipAddress, port)
+
+      print "Worker Registered:", workerID, ipAddress, port
+
+
+   def addWorkerUser(self, message):
+      ''' Adds a user from a worker to the Virtual World.  The OSC Message should contain the values:
+               workerID, userID, x, y, z
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      workerID = args[0]
+      userID = args[1]
+      x = args[2]
+      y = args[3]
+      z = args[4]
+
+      self.addDeviceUser((userID, workerID), x, y, z)   # coordinates are already calibrated by the worker
+
+
+   def removeWorkerUser(self, message):
+      ''' Removes a user of a worker from the Virtual World.  The OSC Message should contain the values:
+               workerID, userID
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      workerID = args[0]
+      userID = args[1]
+
+      self.removeDeviceUser((userID, workerID))
+
+
+   def mergeFrame(self, message):
+      ''' Merges a frame of user coordinates from a worker into the Virtual World.  The OSC Message
+          should contain the values:
+               workerID, n, userID, x, y, frameID, captureTime, userID, ... (n users; frameID and captureTime
+               are -1 for coordinates without a capture time)
+      '''
+
+      receiveTime = milliseconds()
+
+      # parse arguments from OSC Message
+      args = list(message.getArguments())
+      workerID = args[0]
+      n = args[1]
+
+      for i in range(2, 2 + n * 5, 5):   # each user takes 5 arguments: userID, x, y, frameID, captureTime
+         frameID = args[i + 3]
+         captureTime = args[i + 4]
+         if captureTime < 0:
+            frameID = None
+            captureTime = None
+         else:
+            self.latencyStats.add("toServer", receiveTime - captureTime)   # (capture to coordinator, through the worker)
+
+         self.moveDeviceUser((args[i], workerID), args[i + 1], args[i + 2], 0, frameID, captureTime, receiveTime)
+
+      self.framesIn = self.framesIn + 1
+      self.updatesIn = self.updatesIn + n
+
+
+   def mergeJoints(self, message):
+      ''' Sends the calibrated joints of users of a worker to the views that asked for joints.  The OSC Message
+          should contain the values:
+               workerID, jointMask, n, userID, x, y, z, x, y, z, ..., userID, ... (n users)
+      '''
+
+      # parse arguments from OSC Message
+      args = list(message.getArguments())
+      workerID = args[0]
+      mask = args[1]
+      n = args[2]
+
+      joints = jointCount(mask)
+      users = []      # list of (virtualWorldUserID, [x, y, z, x, y, z, ...])
+
+      i = 3
+      for u in range(n):
+         virtualWorldUserID = self.deviceUsers.get((args[i], workerID))
+         if virtualWorldUserID is not None:    # verify that user exists in device users
+            users.append((virtualWorldUserID, args[i + 1 : i + 1 + joints * 3]))
+         i = i + 1 + joints * 3                # each user takes 1 + 3 * joints arguments
+
+      if users:
+         self.sendJoints(mask, users)
+
+
+   def mergeOccupancy(self, message):
+      ''' Keeps the latest occupancy grid of a client of a worker, to merge into the occupancy map sent to views
+          (see sendOccupancyMap).  The OSC Message should contain the values:
+               workerID, clientID, width, height, run, run, run, ... (see kuatroOccupancy.py)
+      '''
+
+      # parse arguments from OSC Message
+      args = message.getArguments()
+      workerID = args[0]
+      clientID = args[1]
+      width = args[2]
+      height = args[3]
+
+      self.occupancyGrids[(clientID, workerID)] = (width, height, list(args[4:]), time.time())   # (workers only forward grids of calibrated clients)
+
+
+   def getCoordinatorStats(self):
+      '''Returns a dictionary with the coordinator counters'''
+
+      return {"workers" : len(self.workers), "framesIn" : self.framesIn, "updatesIn" : self.updatesIn,
+              "users" : len(self.virtualUsers)}
+
+
+##### Start a Coordinator or a Worker
+if __name__ == '__main__':
+
+   if len(sys.argv) > 2 and sys.argv[1] == "worker":
+      workerID = sys.argv[2]
+      port = int(sys.argv[3]) if len(sys.argv) > 3 else 50510
+      coordinatorIP = sys.argv[4] if len(sys.argv) > 4 else "localhost"
+      coordinatorPort = int(sys.argv[5]) if len(sys.argv) > 5 else 50505
+      worker = KuatroIngestWorker(workerID, port, coordinatorIP, coordinatorPort, verbose = 1)
+
+   elif len(sys.argv) > 1 and sys.argv[1] == "coordinator":
+      port = int(sys.argv[2]) if len(sys.argv) > 2 else 50505
+      coordinator = KuatroCoordinator(port, verbose = 1)
+
+   else:
+      print "Usage:  kuatroShardedServer.py coordinator [port]"
+      print "        kuatroShardedServer.py worker <workerID> <port> [coordinatorIP] [coordinatorPort]"
@@ -0,0 +1,204 @@
+# kuatroSoundMapping.py       Version  1.0     19-Oct-2026
+#
+# Maps the users of the Virtual World straight to the sound of theGlaser, for installations
+# where the Kuatro Server and theGlaser run in the same process (e.g., kuatroBegin.py).
+# Instead of sending user coordinates over OSC to a view, which sends more OSC to theGlaser,
+# a KuatroSoundMapping reads the users of the server and evaluates a list of mapping rules
+# against all of them, once per control tick of theGlaser.  The values of all rules are
+# applied to theGlaser in one batch per parameter (only values that changed are applied).
+#
+# Mapping rules:
+#
+#     DistanceVolumeRule(audioIndex, x, y, radius)  - the closer the nearest user is to (x, y),
+#                                                     the louder the audio sample (silent beyond radius)
+#     PositionPanningRule(audioIndex)               - the average x of the users pans the audio sample
+#     ZoneMixRule(zones, emptyPreset, seconds)      - the zone with the most users chooses the preset
+#                                                     (mix) theGlaser morphs to
+#
+# A rule is any object with an evaluate(users, mapping) method, where users is a list of
+# (x, y, z) coordinates, and mapping offers setValue(parameter, audioIndex, value) and
+# morph(preset, seconds).
+#
+# Usage:
+#
+#     mapping = KuatroSoundMapping(server, glaser, [PositionPanningRule(1)])   # (rules may be given up front)
+#     mapping.addRule(DistanceVolumeRule(0, 500, 375, 400))
+#     mapping.addRule(PositionPanningRule(0))
+#     mapping.addRule(ZoneMixRule([(0, 0, 500, 750, "left"), (500, 0, 1000, 750, "right")], "empty"))
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from music import mapValue
+from threading import Lock
+import math
+
+
+class KuatroSoundMapping():
+
+   def __init__(self, server, glaser, rules = []):
+
+      self.server = server       # the KuatroServer whose users are mapped
+      self.glaser = glaser       # theGlaser whose audio samples are controlled
+
+      self.rules = list(rules)   # the mapping rules, evaluated in order
+      self.lock = Lock()
+
+      self.values = {}           # maps a parameter to the values of this tick, {audioIndex : value}
+      self.lastValues = {}       # maps (parameter, audioIndex) to the value last applied
+      self.preset = None         # preset last morphed to
+
+      # counters
+      self.ticks = 0
+      self.applied = 0           # values applied to theGlaser (values that did not change are not applied)
+
+      # evaluate the rules once per control tick of theGlaser
+      self.glaser.controlEngine.tickListener = self.tick
+
+
+   def addRule(self, rule):
+      '''Adds a mapping rule'''
+
+      self.lock.acquire()
+      try:
+         self.rules.append(rule)
+      finally:
+         self.lock.release()
+
+
+   def removeRule(self, rule):
+      '''Removes a mapping rule'''
+
+      self.lock.acquire()
+      try:
+         self.rules.remove(rule)
+      finally:
+         self.lock.release()
+
+
+   def tick(self):
+      '''Evaluates all rules against the current users, and applies the values that changed to theGlaser'''
+
+      users = self.server.virtualUsers.values()   # copy, since users may change while we evaluate
+
+      self.lock.acquire()
+      try:
+         self.values = {}
+         for rule in self.rules:
+            rule.evaluate(users, self)
+         values = self.values
+      finally:
+         self.lock.release()
+
+      for parameter, parameterValues in values.items():
+
+         changed = {}
+         for audioIndex, value in parameterValues.items():
+            if self.lastValues.get((parameter, audioIndex)) != value:
+               self.lastValues[(parameter, audioIndex)] = value
+               changed[audioIndex] = value
+
+         if changed:
+            self.glaser.setFaders(parameter, changed)
+            self.applied = self.applied + len(changed)
+
+      self.ticks = self.ticks + 1
+
+
+   def setValue(self, parameter, audioIndex, value):
+      '''Called by rules; sets a parameter of an audio sample for this tick (later rules override earlier ones)'''
+
+      if parameter not in self.values:
+         self.values[parameter] = {}
+      self.values[parameter][audioIndex] = value
+
+
+   def morph(self, preset, seconds):
+      '''Called by rules; morphs theGlaser to a preset (if it is not the preset last morphed to)'''
+
+      if preset is not None and preset != self.preset:
+         self.preset = preset
+         self.glaser.morph(preset, seconds)
+
+
+   def getMappingStats(self):
+      '''Returns a dictionary with the mapping counters'''
+
+      return {"rules" : len(self.rules), "ticks" : self.ticks, "applied" : self.applied, "preset" : self.preset}
+
+
+class DistanceVolumeRule():
+   '''The closer the nearest user is to the point (x, y), the louder the audio sample (silent beyond radius)'''
+
+   def __init__(self, audioIndex, x, y, radius, minVolume = 0, maxVolume = 127):
+
+      self.audioIndex = audioIndex
+      self.x = x
+      self.y = y
+      self.radius = radius
+      self.minVolume = minVolume
+      self.maxVolume = maxVolume
+
+
+   def evaluate(self, users, mapping):
+
+      volume = self.minVolume
+
+      if users:
+         distance = min([math.hypot(x - self.x, y - self.y) for (x, y, z) in users])
+         if distance < self.radius:
+            volume = int(mapValue(distance, 0, self.radius, self.maxVolume, self.minVolume))
+
+      mapping.setValue("volume", self.audioIndex, volume)
+
+
+class PositionPanningRule():
+   '''The average x of the users pans the audio sample (centered when there are no users)'''
+
+   def __init__(self, audioIndex, minX = 0, maxX = 1000, minPanning = 0, maxPanning = 127):
+
+      self.audioIndex = audioIndex
+      self.minX = minX
+      self.maxX = maxX
+      self.minPanning = minPanning
+      self.maxPanning = maxPanning
+
+
+   def evaluate(self, users, mapping):
+
+      if users:
+         x = sum([x for (x, y, z) in users]) / float(len(users))
+         x = max(self.minX, min(self.maxX, x))
+         panning = int(mapValue(x, self.minX, self.maxX, self.minPanning, self.maxPanning))
+      else:
+         panning = (self.minPanning + self.maxPanning) / 2
+
+      mapping.setValue("panning", self.audioIndex, panning)
+
+
+class ZoneMixRule():
+   '''The zone with the most users chooses the preset theGlaser morphs to; zones is a list of
+      (x1, y1, x2, y2, preset).  When no zone has users, theGlaser morphs to emptyPreset (if any).'''
+
+   def __init__(self, zones, emptyPreset = None, seconds = 2.0):
+
+      self.zones = zones
+      self.emptyPreset = emptyPreset
+      self.seconds = seconds      # morph time
+
+
+   def evaluate(self, users, mapping):
+
+      preset = self.emptyPreset
+      mostUsers = 0
+
+      for (x1, y1, x2, y2, zonePreset) in self.zones:
+         count = 0
+         for (x, y, z) in users:
+            if x1 <= x < x2 and y1 <= y < y2:
+               count = count + 1
+         if count > mostUsers:    # (on a tie, the first zone wins)
+            mostUsers = count
+            preset = zonePreset
+
+      mapping.morph(preset, self.seconds)
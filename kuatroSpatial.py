@@ -0,0 +1,265 @@
+# kuatroSpatial.py       Version  1.0     19-Oct-2026
+#
+# Spatial queries over the users of the Virtual World.  A GridIndex divides the Virtual World
+# into square cells and keeps the users in each cell, so a query only looks at the users in
+# the cells it overlaps, instead of at every user.  The Kuatro Server keeps a GridIndex of
+# its users (updated as they move, a user changes cells only when it crosses a cell border),
+# and answers queries from registered views:
+#
+#     radius    the users within radius of x, y
+#     nearest   the k users nearest to x, y
+#     rect      the users within the rectangle x1, y1 - x2, y2
+#
+# A view may also add standing queries, whose results the server pushes to the view whenever
+# the set of users in the result changes (e.g., "everyone within 200 of the speaker"):
+#
+#     view to server:   /kuatro/queryRadius , ipAddress, port, queryID, x, y, radius
+#                       /kuatro/queryNearest , ipAddress, port, queryID, x, y, k
+#                       /kuatro/queryRect , ipAddress, port, queryID, x1, y1, x2, y2
+#                       /kuatro/addStandingQuery , ipAddress, port, queryID, kind, parameters...   (kind is "radius", "nearest" or "rect")
+#                       /kuatro/removeStandingQuery , ipAddress, port, queryID
+#     server to view:   /kuatro/queryResult , queryID, part, parts, userID, x, y, userID, x, y, ...
+#
+# Results are sorted by distance (from x, y, or from the center of the rectangle), and split into
+# parts of at most 100 users.  All query messages are sent reliably.
+#
+# Usage:
+#
+#     index = GridIndex(50)
+#     index.move(userID, x, y)
+#     users = index.queryRadius(500, 375, 200)        # [(userID, x, y), ...]
+#     query = StandingQuery("nearest", [500, 375, 3])
+#     if query.update(index):
+#        ...                                          # query.result changed
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from threading import Lock
+import math
+
+QUERY_KINDS = {"radius" : 3, "nearest" : 3, "rect" : 4}   # the kinds of queries, and the number of parameters of each
+
+
+class GridIndex():
+   '''A uniform grid of square cells over the Virtual World, and the users in each cell'''
+
+   def __init__(self, cellSize = 50):
+
+      self.cellSize = cellSize   # width (and height) of a cell, in Virtual World units
+      self.cells = {}            # maps a cell, (column, row), to the set of userIDs in it (cells without users are removed)
+      self.positions = {}        # maps a userID to its (x, y, cell)
+      self.lock = Lock()         # (users move on the OSC thread, queries arrive on the reliability thread)
+
+
+   def move(self, userID, x, y):
+      '''Adds a user at x, y, or moves it there'''
+
+      cell = self.__cell__(x, y)
+
+      self.lock.acquire()
+      try:
+         if userID in self.positions:
+            oldCell = self.positions[userID][2]
+            if oldCell != cell:                # (most moves stay within the cell)
+               self.__removeFromCell__(userID, oldCell)
+               self.cells.setdefault(cell, set()).add(userID)
+         else:
+            self.cells.setdefault(cell, set()).add(userID)
+
+         self.positions[userID] = (x, y, cell)
+      finally:
+         self.lock.release()
+
+
+   def remove(self, userID):
+
+      self.lock.acquire()
+      try:
+         if userID in self.positions:
+            self.__removeFromCell__(userID, self.positions[userID][2])
+            del self.positions[userID]
+      finally:
+         self.lock.release()
+
+
+   def getPosition(self, userID):
+      '''Returns the (x, y) of a user (None for unknown users)'''
+
+      position = self.positions.get(userID)
+      if position is None:
+         return None
+      return position[0], position[1]
+
+
+   def queryRadius(self, x, y, radius):
+      '''Returns the users within radius of x, y, as a list of (userID, x, y), nearest first'''
+
+      users = []
+      for userID, userX, userY in self.__usersInCells__(x - radius, y - radius, x + radius, y + radius):
+         distance = math.hypot(userX - x, userY - y)
+         if distance <= radius:
+            users.append((distance, userID, userX, userY))
+
+      users.sort()
+      return [(userID, userX, userY) for distance, userID, userX, userY in users]
+
+
+   def queryRect(self, x1, y1, x2, y2):
+      '''Returns the users within the rectangle x1, y1 - x2, y2, as a list of (userID, x, y), nearest to its center first'''
+
+      left, right = min(x1, x2), max(x1, x2)
+      top, bottom = min(y1, y2), max(y1, y2)
+      centerX, centerY = (left + right) / 2.0, (top + bottom) / 2.0
+
+      users = []
+      for userID, userX, userY in self.__usersInCells__(left, top, right, bottom):
+         if left <= userX <= right and top <= userY <= bottom:
+            users.append((math.hypot(userX - centerX, userY - centerY), userID, userX, userY))
+
+      users.sort()
+      return [(userID, userX, userY) for distance, userID, userX, userY in users]
+
+
+   def queryNearest(self, x, y, k):
+      '''Returns the k users nearest to x, y (fewer, if there are fewer users), as a list of (userID, x, y), nearest first'''
+
+      column, row = self.__cell__(x, y)
+
+      self.lock.acquire()
+      try:
+         if k <= 0 or not self.cells:
+            return []
+         lastRing = max([max(abs(cell[0] - column), abs(cell[1] - row)) for cell in self.cells.keys()])   # the ring of the farthest cell with users
+      finally:
+         self.lock.release()
+
+      # search rings of cells around the cell of x, y, until the k nearest users found so far are
+      # nearer than any user in the next ring could be (or all cells with users have been searched)
+      candidates = []
+      for ring in range(lastRing + 1):
+
+         self.lock.acquire()
+         try:
+            for cell in self.__ring__(column, row, ring):
+               for userID in self.cells.get(cell, ()):
+                  userX, userY = self.positions[userID][0:2]
+                  candidates.append((math.hypot(userX - x, userY - y), userID, userX, userY))
+         finally:
+            self.lock.release()
+
+         candidates.sort()
+         covered = ring * self.cellSize      # every user within this distance of x, y has been found
+         if len(candidates) >= k and candidates[k - 1][0] <= covered:
+            break
+
+      return [(userID, userX, userY) for distance, userID, userX, userY in candidates[:k]]
+
+
+   def query(self, kind, parameters):
+      '''Returns the result of a query of kind ("radius", "nearest" or "rect") with its parameters'''
+
+      if kind == "radius":
+         return self.queryRadius(*parameters)
+      elif kind == "nearest":
+         return self.queryNearest(parameters[0], parameters[1], int(parameters[2]))
+      elif kind == "rect":
+         return self.queryRect(*parameters)
+
+      raise ValueError("Unknown query kind " + str(kind) + "; kinds are " + str(QUERY_KINDS.keys()))
+
+
+   def __cell__(self, x, y):
+      return int(math.floor(x / float(self.cellSize))), int(math.floor(y / float(self.cellSize)))
+
+
+   def __removeFromCell__(self, userID, cell):
+
+      users = self.cells[cell]
+      users.discard(userID)
+      if not users:
+         del self.cells[cell]
+
+
+   def __usersInCells__(self, left, top, right, bottom):
+      '''Returns the users in the cells overlapping the rectangle, as a list of (userID, x, y)'''
+
+      firstColumn, firstRow = self.__cell__(left, top)
+      lastColumn, lastRow = self.__cell__(right, bottom)
+
+      users = []
+      self.lock.acquire()
+      try:
+         if (lastColumn - firstColumn + 1) * (lastRow - firstRow + 1) > len(self.cells):
+            cells = [cell for cell in self.cells.keys()       # (a large area, so only visit the cells with users)
+                     if firstColumn <= cell[0] <= lastColumn and firstRow <= cell[1] <= lastRow]
+         else:
+            cells = [(column, row) for column in range(firstColumn, lastColumn + 1) for row in range(firstRow, lastRow + 1)]
+
+         for cell in cells:
+            for userID in self.cells.get(cell, ()):
+               users.append((userID, self.positions[userID][0], self.positions[userID][1]))
+      finally:
+         self.lock.release()
+
+      return users
+
+
+   def __ring__(self, column, row, ring):
+      '''Returns the cells at ring distance (in cells) from column, row'''
+
+      if ring == 0:
+         return [(column, row)]
+
+      cells = []
+      for i in range(-ring, ring + 1):
+         cells.append((column + i, row - ring))
+         cells.append((column + i, row + ring))
+      for i in range(-ring + 1, ring):
+         cells.append((column - ring, row + i))
+         cells.append((column + ring, row + i))
+      return cells
+
+
+class StandingQuery():
+   '''A query whose result is kept up to date, to push it whenever the set of users in it changes'''
+
+   def __init__(self, kind, parameters):
+
+      if kind not in QUERY_KINDS:
+         raise ValueError("Unknown query kind " + str(kind) + "; kinds are " + str(QUERY_KINDS.keys()))
+
+      self.kind = kind
+      self.parameters = parameters
+      self.result = []           # the last result, [(userID, x, y), ...]
+      self.users = set()         # and the users in it
+
+
+   def update(self, index, userID = None):
+      '''Updates the result after userID moved (or was added or removed), or after any change (userID None).
+         Returns True if the set of users in the result changed.'''
+
+      if userID is not None and self.kind != "nearest":
+         # only the moved user can enter or leave a radius or rect query, so check just that user
+         position = index.getPosition(userID)
+         isIn = position is not None and self.includes(position[0], position[1])
+         if isIn == (userID in self.users):
+            return False
+
+      self.result = index.query(self.kind, self.parameters)
+      users = set([user[0] for user in self.result])
+      changed = users != self.users
+      self.users = users
+
+      return changed
+
+
+   def includes(self, x, y):
+      '''Returns True if x, y is within a radius or rect query'''
+
+      if self.kind == "radius":
+         queryX, queryY, radius = self.parameters
+         return math.hypot(x - queryX, y - queryY) <= radius
+      else:
+         x1, y1, x2, y2 = self.parameters
+         return min(x1, x2) <= x <= max(x1, x2) and min(y1, y2) <= y <= max(y1, y2)
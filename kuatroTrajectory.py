@@ -0,0 +1,194 @@
+# kuatroTrajectory.py       Version  1.0     19-Oct-2026
+#
+# The recent trajectories of users, and their motion (velocity, speed and heading).  A
+# TrajectoryHistory keeps the positions of every user over the last few seconds in a ring
+# buffer, i.e. three preallocated arrays of doubles (time, x, y) per user, so its memory is
+# fixed per user no matter how long the user stays, and the ring buffers of lost users are
+# reused for new users.  Positions arriving faster than sampleRate are left out (so the ring
+# buffer always covers the last seconds).
+#
+# The Kuatro Server keeps a TrajectoryHistory of its users, and answers motion and trajectory
+# queries from registered views:
+#
+#     view to server:   /kuatro/queryMotion , ipAddress, port, queryID, userID        (userID is optional; all users if omitted)
+#                       /kuatro/queryTrajectory , ipAddress, port, queryID, userID, seconds
+#     server to view:   /kuatro/userMotion , queryID, part, parts, userID, vx, vy, speed, heading, userID, ...
+#                       /kuatro/trajectory , queryID, part, parts, age, x, y, age, x, y, ...
+#
+# Velocity (vx, vy) and speed are in Virtual World units per second, measured over the last
+# quarter second; heading is in degrees (0 is along the x axis, 90 along the y axis).  The
+# trajectory is oldest first; age is the seconds since the position was recorded.
+#
+# Usage:
+#
+#     history = TrajectoryHistory(5)
+#     history.add(userID, x, y)
+#     vx, vy, speed, heading = history.getMotion(userID)
+#     path = history.getPath(userID, 2.0)        # [(age, x, y), ...]
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from threading import Lock
+import array
+import math
+import time
+
+
+class Trajectory():
+   '''A ring buffer of the last capacity positions (time, x, y) of a user'''
+
+   def __init__(self, capacity):
+
+      self.capacity = capacity
+      self.times = array.array('d', [0.0] * capacity)
+      self.xs = array.array('d', [0.0] * capacity)
+      self.ys = array.array('d', [0.0] * capacity)
+      self.count = 0     # positions in the ring buffer
+      self.next = 0      # where the next position goes (overwriting the oldest, once the ring buffer is full)
+
+
+   def clear(self):
+      self.count = 0
+      self.next = 0
+
+
+   def add(self, t, x, y):
+
+      self.times[self.next] = t
+      self.xs[self.next] = x
+      self.ys[self.next] = y
+      self.next = (self.next + 1) % self.capacity
+      self.count = min(self.count + 1, self.capacity)
+
+
+   def getLastTime(self):
+      if self.count == 0:
+         return None
+      return self.times[(self.next - 1) % self.capacity]
+
+
+   def get(self, i):
+      '''Returns the i-th newest position, (t, x, y) (i = 0 is the newest)'''
+
+      j = (self.next - 1 - i) % self.capacity
+      return self.times[j], self.xs[j], self.ys[j]
+
+
+   def getVelocity(self, window):
+      '''Returns the velocity (vx, vy) over the last window seconds (0, 0 with fewer than two positions)'''
+
+      if self.count < 2:
+         return 0.0, 0.0
+
+      t0, x0, y0 = self.get(0)
+      for i in range(1, self.count):          # find the newest position at least window seconds older (or the oldest)
+         t, x, y = self.get(i)
+         if t0 - t >= window:
+            break
+
+      if t0 <= t:
+         return 0.0, 0.0
+      return (x0 - x) / (t0 - t), (y0 - y) / (t0 - t)
+
+
+   def getPath(self, since):
+      '''Returns the positions since time since, oldest first, as a list of (t, x, y)'''
+
+      path = []
+      for i in range(self.count):
+         t, x, y = self.get(i)
+         if t < since:
+            break
+         path.append((t, x, y))
+
+      path.reverse()
+      return path
+
+
+class TrajectoryHistory():
+   '''The trajectories of the last seconds of all users'''
+
+   MOTION_WINDOW = 0.25   # seconds velocity is measured over (smooths sensor jitter)
+
+   def __init__(self, seconds = 5, sampleRate = 60):
+
+      self.seconds = seconds
+      self.minInterval = 1.0 / sampleRate              # positions closer in time are left out
+      self.capacity = int(seconds * sampleRate) + 1    # positions per trajectory (3 doubles each)
+      self.trajectories = {}                           # maps a userID to its Trajectory
+      self.spare = []                                  # Trajectories of lost users, to reuse
+      self.lock = Lock()                               # (users move on the OSC thread, queries arrive on the reliability thread)
+
+
+   def add(self, userID, x, y, t = None):
+      '''Adds the position of a user at time t (now, by default)'''
+
+      if t is None:
+         t = time.time()
+
+      self.lock.acquire()
+      try:
+         trajectory = self.trajectories.get(userID)
+         if trajectory is None:
+            if self.spare:
+               trajectory = self.spare.pop()
+            else:
+               trajectory = Trajectory(self.capacity)
+            self.trajectories[userID] = trajectory
+
+         last = trajectory.getLastTime()
+         if last is None or t - last >= self.minInterval:
+            trajectory.add(t, x, y)
+      finally:
+         self.lock.release()
+
+
+   def remove(self, userID):
+
+      self.lock.acquire()
+      try:
+         if userID in self.trajectories:
+            trajectory = self.trajectories.pop(userID)
+            trajectory.clear()
+            self.spare.append(trajectory)
+      finally:
+         self.lock.release()
+
+
+   def getUserIDs(self):
+      return self.trajectories.keys()
+
+
+   def getMotion(self, userID):
+      '''Returns the motion of a user, (vx, vy, speed, heading) (None for unknown users)'''
+
+      self.lock.acquire()
+      try:
+         if userID not in self.trajectories:
+            return None
+         vx, vy = self.trajectories[userID].getVelocity(TrajectoryHistory.MOTION_WINDOW)
+      finally:
+         self.lock.release()
+
+      return vx, vy, math.hypot(vx, vy), math.degrees(math.atan2(vy, vx)) % 360
+
+
+   def getPath(self, userID, seconds = None):
+      '''Returns the positions of a user over the last seconds (all it has, by default), oldest first,
+         as a list of (age, x, y), where age is the seconds since the position was recorded'''
+
+      if seconds is None:
+         seconds = self.seconds
+
+      now = time.time()
+
+      self.lock.acquire()
+      try:
+         if userID not in self.trajectories:
+            return []
+         path = self.trajectories[userID].getPath(now - seconds)
+      finally:
+         self.lock.release()
+
+      return [(now - t, x, y) for t, x, y in path]
@@ -0,0 +1,136 @@
+# kuatroTransport.py       Version  1.0     19-Oct-2026
+#
+# Transports carry Kuatro messages between clients, the server and views.  A transport
+# creates the In ports components listen on and the Out ports they send through:
+#
+#     transport.createIn(port)                - an In port, with onInput(address, function) (like OscIn)
+#     transport.createOut(ipAddress, port)    - an Out port, with sendMessage(address, *args) (like OscOut)
+#
+# OscTransport (the default) uses OSC over UDP, for installations spread over several
+# computers (or processes).  MemoryTransport is an in-memory publish / subscribe bus for
+# components running in the same process (e.g., kuatroBegin.py): messages are passed as
+# KuatroMessage objects, so they are never encoded, sent through a loopback socket, and
+# decoded again.  Like OscIn, every MemoryIn delivers its messages on its own thread, so
+# callbacks run the same way with either transport.  Since all components share one
+# process, MemoryTransport tells In ports apart by port only (the IP Address is ignored).
+#
+# Usage:
+#
+#     transport = MemoryTransport()
+#     server = KuatroServer(transport = transport)
+#     view = KuatroBasicView(transport = transport)
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from osc import OscIn, OscOut
+from kuatroMessage import KuatroMessage
+from threading import Thread, Lock
+import Queue
+import re
+
+
+class OscTransport():
+   '''Sends messages as OSC over UDP'''
+
+   def createIn(self, port):
+      return OscIn(port)
+
+   def createOut(self, ipAddress, port):
+      return OscOut(ipAddress, port)
+
+
+class MemoryTransport():
+   '''An in-memory publish / subscribe bus for components in the same process'''
+
+   def __init__(self):
+
+      self.ins = {}          # maps a port to the MemoryIn listening on it
+      self.lock = Lock()
+
+      # counters
+      self.published = 0     # messages sent through the bus
+      self.dropped = 0       # messages sent to ports nobody listens on (like UDP, they are lost)
+
+
+   def createIn(self, port):
+
+      self.lock.acquire()
+      try:
+         if port in self.ins:
+            raise ValueError("Port " + str(port) + " is already in use")
+         memoryIn = MemoryIn(port)
+         self.ins[port] = memoryIn
+      finally:
+         self.lock.release()
+
+      return memoryIn
+
+
+   def createOut(self, ipAddress, port):
+      return MemoryOut(self, port)
+
+
+   def publish(self, port, address, arguments):
+      '''Delivers a message to the In port listening on port (if any)'''
+
+      memoryIn = self.ins.get(port)
+      if memoryIn is None:
+         self.dropped = self.dropped + 1
+         return
+
+      memoryIn.post(KuatroMessage(address, arguments))
+      self.published = self.published + 1
+
+
+class MemoryIn():
+   '''An In port of a MemoryTransport; delivers messages to its callbacks on its own thread'''
+
+   def __init__(self, port):
+
+      self.port = port
+      self.routes = []              # list of (compiled address pattern, function), like the addresses of OscIn
+      self.queue = Queue.Queue()    # messages waiting to be delivered
+
+      # setup thread to deliver messages
+      self.deliveryThread = Thread(target = self.run)
+      self.deliveryThread.setDaemon(True)
+      self.deliveryThread.start()
+
+
+   def onInput(self, address, function):
+      '''Registers a callback for messages sent to address (a regular expression, as with OscIn)'''
+
+      self.routes.append((re.compile(address + "$"), function))
+
+
+   def post(self, message):
+      self.queue.put(message)
+
+
+   def run(self):
+      '''Delivers the posted messages in order (via a seperate thread)'''
+
+      while True:
+         message = self.queue.get()
+         address = message.getAddress()
+         for pattern, function in self.routes:
+            if pattern.match(address):
+               try:
+                  function(message)
+               except Exception, e:
+                  print "Error delivering", address, "on port", self.port
+                  print e
+
+
+class MemoryOut():
+   '''An Out port of a MemoryTransport'''
+
+   def __init__(self, transport, port):
+
+      self.transport = transport
+      self.port = port
+
+
+   def sendMessage(self, address, *args):
+      self.transport.publish(self.port, address, list(args))
@@ -0,0 +1,102 @@
+# kuatroTransportBenchmark.py       Version  1.0     19-Oct-2026
+#
+# Measures the end-to-end latency of a coordinate update, from a client through the Kuatro
+# Server to a view, for the two transports (see kuatroTransport.py):
+#
+#     osc      - OSC over UDP (through the loopback interface)
+#     memory   - the in-memory bus (KuatroMessage objects passed between threads)
+#
+# For each transport the benchmark starts a KuatroServer and a view in this process, and
+# sends one /kuatro/userCoordinates message at a time from a client Out port, waiting for
+# it to arrive at the view before sending the next one.  It reports the median, 95th and
+# 99th percentile, and maximum latency.
+#
+# To run it:
+#
+#     sh jython.sh kuatroTransportBenchmark.py [messages]
+#
+#     See README file for full instructions on using the Kuatro System
+
+
+from kuatroServer import *
+from kuatroTransport import OscTransport, MemoryTransport
+from kuatroMessage import KuatroMessage
+from threading import Event
+import time
+import sys
+
+CLIENT_ID = "benchmarkClient"
+
+
+class BenchmarkView():
+   '''A view that signals the arrival of every coordinate message'''
+
+   def __init__(self, transport, port):
+      self.arrived = Event()
+      self.dispatcher = KuatroDispatcher(transport.createIn(port))
+      self.dispatcher.onInput(KuatroServer.USER_COORDINATES_MESSAGE, self.arrive)
+
+   def arrive(self, message):
+      self.arrived.set()
+
+
+def measureLatencies(transport, serverPort, viewPort, messageCount):
+   '''Returns the sorted end-to-end latencies (in milliseconds) of messageCount coordinate updates'''
+
+   server = KuatroServer(serverPort, transport = transport)
+   view = BenchmarkView(transport, viewPort)
+   server.registerView(KuatroMessage(KuatroServer.REGISTER_VIEW_MESSAGE, ["localhost", viewPort]))
+
+   # one calibrated device with one user
+   server.calibrateDevice(KuatroMessage(KuatroServer.CALIBRATE_DEVICE_MESSAGE, [CLIENT_ID, -5000, -1000, 0, 5000, -1000, 15000]))
+   server.addUser(KuatroMessage(KuatroServer.NEW_USER_MESSAGE, [0, 0, 0, 7500, CLIENT_ID]))
+
+   client = transport.createOut("localhost", serverPort)
+
+   latencies = []
+   for i in range(messageCount + 100):      # the first 100 messages warm up (let the JIT compile the code paths)
+
+      view.arrived.clear()
+      start = time.time()
+      client.sendMessage(KuatroServer.USER_COORDINATES_MESSAGE, 0, float(i % 1000), 0, 7500.0, CLIENT_ID)
+      view.arrived.wait(1.0)
+      latency = (time.time() - start) * 1000
+
+      if i >= 100 and view.arrived.isSet():   # (lost messages are not counted)
+         latencies.append(latency)
+
+   server.livenessTimer.stop()
+   server.occupancyTimer.stop()
+   server.ingest.stop()
+   server.endpoint.stop()
+
+   latencies.sort()
+   return latencies
+
+
+def percentile(latencies, fraction):
+   return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def runBenchmark(messageCount):
+   '''Runs the benchmark for both transports and prints the results'''
+
+   print "End-to-end latency, client -> server -> view (%d messages per transport)" % messageCount
+   print "%10s %10s %10s %10s %10s %10s" % ("transport", "received", "p50 (ms)", "p95 (ms)", "p99 (ms)", "max (ms)")
+
+   for name, transport, serverPort, viewPort in [("osc", OscTransport(), 50595, 60695),
+                                                 ("memory", MemoryTransport(), 50596, 60696)]:
+
+      latencies = measureLatencies(transport, serverPort, viewPort, messageCount)
+
+      if latencies:
+         print "%10s %10d %10.3f %10.3f %10.3f %10.3f" % (name, len(latencies), percentile(latencies, 0.50),
+               percentile(latencies, 0.95), percentile(latencies, 0.99), latencies[-1])
+      else:
+         print "%10s %10d" % (name, 0)
+
+
+if __name__ == '__main__':
+
+   messageCount = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+   runBenchmark(messageCount)
@@ -1,4 +1,4 @@
-# theGlaser.py        Version 1.6     25-Jun-2015      Seth Stoudenmier and Bill Manaris
+# theGlaser.py        Version 1.13    19-Oct-2026      Seth Stoudenmier and Bill Manaris
 #
 #
 # The "Glaser" is a specific instrument designed in order to facilitate exploring various sounds and quickly
@@ -27,10 +27,59 @@
 #              -/stopAudio/<Fader ID>, oscStopAudio
 #              -/pauseAudio/<Fader ID>, oscPauseAudio
 #              -/resumeAudio/<Fader ID>, oscResumeAudio
+#              -/prefetchAudio/<Fader ID>, oscPrefetchAudio
+#
+#                   The bulk addresses set a parameter of many faders with one message (applied in one pass,
+#                   with one GUI update per fader)
+#              -/glaser/volume <value for fader 1> <value for fader 2> ..., oscSetAllFaders
+#              -/glaser/frequency <value for fader 1> <value for fader 2> ..., oscSetAllFaders
+#              -/glaser/panning <value for fader 1> <value for fader 2> ..., oscSetAllFaders
+#              -/glaser/volume/sparse <Fader ID> <value> <Fader ID> <value> ..., oscSetSomeFaders
+#              -/glaser/frequency/sparse <Fader ID> <value> <Fader ID> <value> ..., oscSetSomeFaders
+#              -/glaser/panning/sparse <Fader ID> <value> <Fader ID> <value> ..., oscSetSomeFaders
+#              -/glaser/prefetch <Fader ID> <Fader ID> ... (no Fader IDs means all), oscPrefetch
+#
+#                   Presets are snapshots of all faders and of the play / loop state of all audio samples
+#              -/glaser/savePreset <preset>, oscSavePreset
+#              -/glaser/morph <preset> <seconds>, oscMorph
+#              -/glaser/recallPreset <preset>, oscRecallPreset (i.e., a morph of 0 seconds)
+#
+#              -/glaser/voiceStats, oscVoiceStats (prints the trigger latencies of the voice pools)
 #
 #
 # REVISIONS:
 #
+#  1.13     19-Oct-2026 Fader panels are refreshed on a timer (refreshRate times per second, on the GUI thread) with
+#                       the latest value of each changed fader, instead of after every control tick.  Panels that are
+#                       not visible are skipped (their values wait until the panel is shown again).
+#
+#  1.12     19-Oct-2026 Sample descriptors with voices > 1 become voice pools (see glaserVoices.py), i.e. several
+#                       preloaded voices of the same sound, so that /playAudio re-triggers no longer cut off the sound
+#                       that is playing.  Triggers are timestamped on arrival, and getVoiceStats() reports the latency
+#                       from arrival to audio start.  Transport messages are only printed when verbose.
+#
+#  1.11     19-Oct-2026 Added presets (see glaserPresets.py).  savePreset() keeps every fader and the play / loop
+#                       state of every audio sample under a name (stored in presetFile, if given), and morph() has the
+#                       control-rate engine ramp every parameter to a preset over some seconds.  Audio samples that
+#                       the preset plays start at the beginning of the morph (fading in from volume 0), and the
+#                       ones it stops (or pauses) are stopped at the end.
+#
+#  1.10     19-Oct-2026 The audioList may contain sample descriptors (SampleDescriptor objects, or filenames) instead
+#                       of AudioSamples.  These are decoded on first play / loop (or on a prefetch hint), and kept in
+#                       a cache of at most cacheSize bytes that releases the least recently used samples that are not
+#                       playing (see glaserSamples.py).
+#
+#  1.9      19-Oct-2026 Volume, frequency, and panning values (from OSC and from the faders) are now targets of a
+#                       control-rate engine (see glaserControl.py), which ramps each audio sample toward its latest
+#                       target over slewTime milliseconds, with at most one write per parameter per control tick.
+#                       Fader GUI updates are coalesced to one per fader per tick.
+#
+#  1.8      19-Oct-2026 Added the bulk /glaser/<parameter> addresses to set all (or a sparse list of) faders
+#                       with one message
+#
+#  1.7      19-Oct-2026 OSC messages are routed through a KuatroDispatcher, i.e. one hash lookup per
+#                       message instead of matching the message against all 8 x N addresses
+#
 #  1.6      25-Jun-2015 (ss) Added more OSC features to Glaser to control each sound individually
 #
 #  1.5      18-Nov-2014 (ss) OSC is now properly working. Left out minor part that prohibited OSC from working
@@ -63,16 +112,39 @@ from music import *
 from gui import *
 from osc import *
 from guicontrols import *
+from kuatroDispatcher import KuatroDispatcher
+from glaserControl import ControlRateEngine
+from glaserSamples import SampleDescriptor, SampleCache, LazyAudioSample
+from glaserPresets import PresetBank
+from glaserVoices import VoicePool
+from timer import Timer
+from threading import Lock
+from java.awt import Frame
+import time
 
 class theGlaser:
    
-   def __init__(self, audioList, showPanels=True, panelWidth=400, panelHeight=600):
+   def __init__(self, audioList, showPanels=True, panelWidth=400, panelHeight=600, controlRate=100, slewTime=50, verbose=False,
+                cacheSize=256*1024*1024, presetFile=None, refreshRate=30):
 
       # initialize the OSC for this instance of theGlaser
       self.oscIn = OscIn(57115)
+      self.dispatcher = KuatroDispatcher(self.oscIn)   # routes each message to its fader function through one hash lookup
       
+      # initialize the cache of decoded audio samples; sample descriptors (or filenames) in the audioList are
+      # decoded on first use, and released again (if not playing) when the cache is over cacheSize bytes
+      self.sampleCache = SampleCache(cacheSize)
+
       # initialize the list of audio samples
-      self.audioList = audioList
+      self.audioList = [self.__toAudioSample__(audio) for audio in audioList]
+
+      # the transport state of each audio sample ("stopped", "playing", "looping", or "paused"), kept for presets
+      self.transport = ["stopped"] * len(self.audioList)
+      self.pausedTransport = {}     # maps the index of a paused audio sample to its state before the pause
+
+      # initialize the presets (stored in presetFile, if given); morphCount identifies the latest morph
+      self.presets = PresetBank(presetFile)
+      self.morphCount = 0
 
       # initialize the min and max volume range
       self.minVolume = 0
@@ -90,6 +162,18 @@ class theGlaser:
       # saving whether or not to show panels
       self.showPanels = showPanels
 
+      # saving whether or not to print every OSC value received
+      self.verbose = verbose
+
+      # fader values waiting to be shown on the panels; maps (parameter, audioIndex) to the latest value
+      self.pendingFaderValues = {}
+      self.faderLock = Lock()
+      self.refreshingFaders = False   # True while the refresh timer sets the faders (their callbacks then do nothing)
+
+      # initialize the control-rate engine; it ramps the audio samples toward the values set by OSC
+      # and the faders (controlRate ticks per second, slewTime milliseconds to reach a new value)
+      self.controlEngine = ControlRateEngine(self.audioList, controlRate, slewTime)
+
       if (self.showPanels):
 
          # initialize all of the lists to hold the faders
@@ -123,93 +207,354 @@ class theGlaser:
          self.__createFrequencyDisplay__(self.audioList)
          self.__createPanningDisplay__(self.audioList)
 
+         # refresh the faders refreshRate times per second (the timer runs on the GUI thread), so that
+         # high-rate OSC never causes more than one repaint per fader per refresh
+         self.refreshTimer = Timer(int(1000 / refreshRate), self.__updateFaders__)
+         self.refreshTimer.start()
+
       # initialize the osc capabilities
       # loops for each audiosample creating an osc function for volume, frequency, and panning
-      # that is referenced by a oscIn.onInput() statement
+      # that is referenced by a dispatcher.onInput() statement
       for i in range(len(audioList)):
 
          # osc volume function for the fader at position i in the audioList
          def oscSetVolume(message, audioIndex=i):
             args = message.getArguments()
             volume = args[0]
-
-            if self.showPanels:
-               self.audioList[audioIndex].setVolume(volume)
-               self.volumeFaders[audioIndex].setValue(volume)
-            else:
-               self.audioList[audioIndex].setVolume(volume)
+            self.setFaders("volume", {audioIndex: volume})
 
          # osc frequency function for the fader at position i in the audioList
          def oscSetFrequency(message, audioIndex=i):
             args = message.getArguments()
             frequency = args[0]
-            if self.showPanels:
-               self.audioList[audioIndex].setFrequency(frequency)
-               self.frequencyFaders[audioIndex].setValue(frequency)
-            else:
-               self.audioList[audioIndex].setFrequency(frequency)
+            self.setFaders("frequency", {audioIndex: frequency})
 
-            print("Audio " + str(audioIndex+1) + " frequency set:", frequency)
+            if self.verbose:
+               print("Audio " + str(audioIndex+1) + " frequency set:", frequency)
 
          # osc panning function for the fader at position i in the audioList
          def oscSetPanning(message, audioIndex=i):
             args = message.getArguments()
             panning = args[0]
-            if self.showPanels:
-               self.audioList[audioIndex].setPanning(panning)
-               self.panningFaders[audioIndex].setValue(panning)
-            else:
-               self.audioList[audioIndex].setPanning(panning)
+            self.setFaders("panning", {audioIndex: panning})
 
          # osc play function for audiosamples assigned to each fader
          def oscPlayAudio(message, audioIndex=i):
-            audioList[audioIndex].play()
-            print("Audio " + str(audioIndex) + " play")
+            triggerTime = time.time()     # arrival of the trigger (to measure the latency of voice pools)
+            self.setTransport(audioIndex, "playing", triggerTime)
+            if self.verbose:
+               print("Audio " + str(audioIndex) + " play")
 
          # osc loop function for audiosamples assigned to each fader
          def oscLoopAudio(message, audioIndex=i):
-            audioList[audioIndex].loop()
-            print("Audio " + str(audioIndex) + " loop")
+            self.setTransport(audioIndex, "looping")
+            if self.verbose:
+               print("Audio " + str(audioIndex) + " loop")
 
          # osc stop function for audiosamples assigned to each fader
          def oscStopAudio(message, audioIndex=i):
-            audioList[audioIndex].stop()
-            print("Audio " + str(audioIndex) + " stop")
+            self.setTransport(audioIndex, "stopped")
+            if self.verbose:
+               print("Audio " + str(audioIndex) + " stop")
 
          # osc puase function for audiosamples assigned to each fader
          def oscPauseAudio(message, audioIndex=i):
-            audioList[audioIndex].pause()
-            print("Audio " + str(audioIndex) + " pause")
+            self.setTransport(audioIndex, "paused")
+            if self.verbose:
+               print("Audio " + str(audioIndex) + " pause")
 
          # osc resume function for audiosamples assigned to each fader
          def oscResumeAudio(message, audioIndex=i):
-            audioList[audioIndex].resume()
-            print("Audio " + str(audioIndex) + " resume")
+            self.setTransport(audioIndex, "resume")
+            if self.verbose:
+               print("Audio " + str(audioIndex) + " resume")
+
+         # osc prefetch function for audiosamples assigned to each fader (decodes the sample before it is needed)
+         def oscPrefetchAudio(message, audioIndex=i):
+            self.prefetch([audioIndex])
+
+         # dispatcher.onInput() statements made for each audiosample and fader combination
+         self.dispatcher.onInput("/volumeFader/" + str(i +1), oscSetVolume)
+         self.dispatcher.onInput("/frequencyFader/" + str(i +1), oscSetFrequency)
+         self.dispatcher.onInput("/panningFader/" + str(i +1), oscSetPanning)
+         self.dispatcher.onInput("/playAudio/" + str(i +1), oscPlayAudio)
+         self.dispatcher.onInput("/loopAudio/" + str(i +1), oscLoopAudio)
+         self.dispatcher.onInput("/stopAudio/" + str(i +1), oscStopAudio)
+         self.dispatcher.onInput("/pauseAudio/" + str(i +1), oscPauseAudio)
+         self.dispatcher.onInput("/resumeAudio/" + str(i +1), oscResumeAudio)
+         self.dispatcher.onInput("/prefetchAudio/" + str(i +1), oscPrefetchAudio)
+
+      # the bulk osc functions; one message sets a parameter of many faders
+      for parameter in ["volume", "frequency", "panning"]:
+
+         # osc function that takes one value per fader, i.e. <value for fader 1> <value for fader 2> ...
+         def oscSetAllFaders(message, parameter=parameter):
+            args = message.getArguments()
+            values = {}
+            for audioIndex in range(min(len(args), len(self.audioList))):
+               values[audioIndex] = args[audioIndex]
+            self.setFaders(parameter, values)
 
-         # oscIn.onInput() statements made for each audiosample and fader combination
-         self.oscIn.onInput("/volumeFader/" + str(i +1), oscSetVolume)
-         self.oscIn.onInput("/frequencyFader/" + str(i +1), oscSetFrequency)
-         self.oscIn.onInput("/panningFader/" + str(i +1), oscSetPanning)
-         self.oscIn.onInput("/playAudio/" + str(i +1), oscPlayAudio)
-         self.oscIn.onInput("/loopAudio/" + str(i +1), oscLoopAudio)
-         self.oscIn.onInput("/stopAudio/" + str(i +1), oscStopAudio)
-         self.oscIn.onInput("/pauseAudio/" + str(i +1), oscPauseAudio)
-         self.oscIn.onInput("/resumeAudio/" + str(i +1), oscResumeAudio)
+         # osc function that takes a sparse list of fader / value pairs, i.e. <Fader ID> <value> <Fader ID> <value> ...
+         def oscSetSomeFaders(message, parameter=parameter):
+            args = message.getArguments()
+            values = {}
+            for i in range(0, len(args) - 1, 2):
+               values[int(args[i]) - 1] = args[i + 1]    # Fader IDs range from 1...number of faders (if an ID repeats, the last value wins)
+            self.setFaders(parameter, values)
+
+         self.dispatcher.onInput("/glaser/" + parameter, oscSetAllFaders)
+         self.dispatcher.onInput("/glaser/" + parameter + "/sparse", oscSetSomeFaders)
+
+      # osc prefetch function for many audiosamples, i.e. <Fader ID> <Fader ID> ... (or all, if there are no Fader IDs)
+      def oscPrefetch(message):
+         args = message.getArguments()
+         if len(args) == 0:
+            self.prefetch(range(len(self.audioList)))
+         else:
+            self.prefetch([int(faderID) - 1 for faderID in args])
+
+      self.dispatcher.onInput("/glaser/prefetch", oscPrefetch)
+
+      # osc preset functions, i.e. <preset> to save or recall a preset, and <preset> <seconds> to morph to it
+      def oscSavePreset(message):
+         args = message.getArguments()
+         self.savePreset(args[0])
+
+      def oscMorph(message):
+         args = message.getArguments()
+         seconds = args[1] if len(args) > 1 else 0
+         self.morph(args[0], seconds)
+
+      def oscRecallPreset(message):
+         args = message.getArguments()
+         self.morph(args[0], 0)
+
+      self.dispatcher.onInput("/glaser/savePreset", oscSavePreset)
+      self.dispatcher.onInput("/glaser/morph", oscMorph)
+      self.dispatcher.onInput("/glaser/recallPreset", oscRecallPreset)
+
+      # osc function that prints the trigger latencies of the voice pools
+      def oscVoiceStats(message):
+         for faderID, stats in self.getVoiceStats().items():
+            print "Voices of fader", faderID, stats
+
+      self.dispatcher.onInput("/glaser/voiceStats", oscVoiceStats)
+
+
+   # decodes the audio samples at the given indexes in the background (if they are sample descriptors), so that
+   # their first play starts without delay
+   def prefetch(self, audioIndexes):
+      for audioIndex in audioIndexes:
+         if 0 <= audioIndex < len(self.audioList) and isinstance(self.audioList[audioIndex], LazyAudioSample):
+            self.audioList[audioIndex].prefetch()
+
+   # plays, loops, stops, pauses, or resumes an audio sample, and remembers its transport state for presets;
+   # state is "playing", "looping", "stopped", "paused", or "resume" (which goes back to the state before the pause);
+   # triggerTime is the arrival time of a play trigger (voice pools measure their latency from it)
+   def setTransport(self, audioIndex, state, triggerTime=None):
+      audio = self.audioList[audioIndex]
+
+      if state == "playing":
+         if isinstance(audio, VoicePool):
+            audio.play(triggerTime)
+         else:
+            audio.play()
+      elif state == "looping":
+         audio.loop()
+      elif state == "stopped":
+         audio.stop()
+      elif state == "paused":
+         audio.pause()
+         if self.getTransport(audioIndex) not in ["playing", "looping"]:
+            return                                                  # nothing to pause
+         self.pausedTransport[audioIndex] = self.transport[audioIndex]
+      elif state == "resume":
+         audio.resume()
+         if self.transport[audioIndex] != "paused":
+            return                                                  # nothing to resume
+         state = self.pausedTransport.pop(audioIndex, "playing")
+
+      self.transport[audioIndex] = state
+
+   # returns the transport state of an audio sample (a sample that was played once and ended is "stopped")
+   def getTransport(self, audioIndex):
+      state = self.transport[audioIndex]
+      if state == "playing" and not self.audioList[audioIndex].isPlaying():
+         state = "stopped"
+      return state
+
+   # returns a preset of the current mixer, i.e. the value (target) of every fader and the transport state
+   # of every audio sample
+   def getPreset(self):
+      preset = {}
+      for parameter in ["volume", "frequency", "panning"]:
+         preset[parameter] = [self.controlEngine.getTarget(parameter, audioIndex) for audioIndex in range(len(self.audioList))]
+      preset["transport"] = [self.getTransport(audioIndex) for audioIndex in range(len(self.audioList))]
+      return preset
+
+   # saves the current mixer as a preset with the given name
+   def savePreset(self, name):
+      self.presets.save(name, self.getPreset())
+      print "Preset saved:", name
+
+   # ramps every fader from its current value to the preset with the given name over some seconds (0 recalls the
+   # preset at once).  Audio samples the preset plays start now, fading in from volume 0 if they were silent, and
+   # audio samples the preset stops (or pauses) are stopped at the end of the morph.
+   def morph(self, name, seconds=0):
+      preset = self.presets.get(name)
+      if preset is None:
+         print "Unknown preset:", name
+         return
+
+      slewTime = int(seconds * 1000)
+      self.morphCount = self.morphCount + 1
+      audioCount = min(len(self.audioList), len(preset["transport"]))   # the preset may be of a different audioList
+
+      # start the audio samples the preset plays (silent ones start at volume 0, so they fade in)
+      for audioIndex in range(audioCount):
+         state = preset["transport"][audioIndex]
+         current = self.getTransport(audioIndex)
+         if state in ["playing", "looping"] and current not in ["playing", "looping"]:
+            if current == "paused":
+               self.setTransport(audioIndex, "resume")
+            else:
+               self.controlEngine.setValue("volume", audioIndex, self.minVolume)   # (now, not on the next tick, so it starts silent)
+               self.setTransport(audioIndex, state)
+
+      # ramp every fader to the preset
+      for parameter in ["volume", "frequency", "panning"]:
+         values = {}
+         for audioIndex in range(audioCount):
+            values[audioIndex] = preset[parameter][audioIndex]
+         self.setFaders(parameter, values, slewTime)
+
+      # stop (or pause) the audio samples the preset does not play, once they have faded out
+      if slewTime > 0:
+         timer = Timer(slewTime, self.__endMorph__, [self.morphCount, preset["transport"][:audioCount]], False)
+         timer.start()
+      else:
+         self.__endMorph__(self.morphCount, preset["transport"][:audioCount])
+
+      if self.verbose:
+         print "Morphing to preset", name, "in", seconds, "seconds"
+
+   # called at the end of a morph; stops (or pauses) the audio samples the preset does not play, unless a later
+   # morph has started since
+   def __endMorph__(self, morphCount, states):
+      if morphCount != self.morphCount:
+         return
+
+      for audioIndex in range(len(states)):
+         state = states[audioIndex]
+         current = self.getTransport(audioIndex)
+         if state in ["stopped", "paused"] and current in ["playing", "looping"]:
+            self.setTransport(audioIndex, state)
+
+   # returns the trigger statistics (latencies in milliseconds) of the voice pools, by Fader ID
+   def getVoiceStats(self):
+      stats = {}
+      for audioIndex in range(len(self.audioList)):
+         if isinstance(self.audioList[audioIndex], VoicePool):
+            stats[audioIndex + 1] = self.audioList[audioIndex].getLatencyStats()
+      return stats
+
+   # returns the audio sample for an entry of the audioList; AudioSamples are used as they are, sample
+   # descriptors with more than one voice become (preloaded) VoicePools, and other sample descriptors
+   # (and filenames) become LazyAudioSamples that share this Glaser's sample cache
+   def __toAudioSample__(self, audio):
+      if isinstance(audio, SampleDescriptor) and audio.voices > 1:
+         return VoicePool(audio)
+      if isinstance(audio, SampleDescriptor) or isinstance(audio, basestring):
+         return LazyAudioSample(audio, self.sampleCache)
+      return audio
+
+   # sets a parameter ("volume", "frequency", or "panning") of many audio samples in one pass;
+   # values maps the index of each audio sample to its new value.  The values become targets of the
+   # control-rate engine (latest wins), and each fader on the panels is updated once per refresh.
+   def setFaders(self, parameter, values, slewTime=None):
+      audioIndexes = [audioIndex for audioIndex in values.keys() if 0 <= audioIndex < len(self.audioList)]
+
+      for audioIndex in audioIndexes:
+         self.controlEngine.setTarget(parameter, audioIndex, values[audioIndex], slewTime)
+
+      if self.showPanels:
+         self.faderLock.acquire()
+         try:
+            for audioIndex in audioIndexes:
+               self.pendingFaderValues[(parameter, audioIndex)] = values[audioIndex]
+         finally:
+            self.faderLock.release()
+
+   # called by the refresh timer (on the GUI thread); shows the latest value of each changed fader on the visible
+   # panels (the values of hidden panels are kept until the panel is visible again)
+   def __updateFaders__(self):
+      if not self.pendingFaderValues:
+         return
+
+      visible = {}
+      for parameter in ["volume", "frequency", "panning"]:
+         visible[parameter] = self.__isPanelVisible__(self.__getDisplay__(parameter))
+
+      self.faderLock.acquire()
+      try:
+         pendingFaderValues = {}
+         for key, value in self.pendingFaderValues.items():
+            if visible[key[0]]:
+               pendingFaderValues[key] = value
+               del self.pendingFaderValues[key]
+      finally:
+         self.faderLock.release()
+
+      self.refreshingFaders = True
+      try:
+         for (parameter, audioIndex), value in pendingFaderValues.items():
+            self.__getFaders__(parameter)[audioIndex].setValue(value)
+      finally:
+         self.refreshingFaders = False
+
+   # returns True if a panel is on the screen (i.e., shown, and not minimized)
+   def __isPanelVisible__(self, display):
+      frame = display.display     # the window of the Display
+      return frame.isShowing() and (frame.getExtendedState() & Frame.ICONIFIED) == 0
+
+   # returns the panel of a parameter ("volume", "frequency", or "panning")
+   def __getDisplay__(self, parameter):
+      if parameter == "volume":
+         return self.volumeDisplay
+      elif parameter == "frequency":
+         return self.frequencyDisplay
+      elif parameter == "panning":
+         return self.panningDisplay
+
+   # returns the list of faders for a parameter ("volume", "frequency", or "panning")
+   def __getFaders__(self, parameter):
+      if parameter == "volume":
+         return self.volumeFaders
+      elif parameter == "frequency":
+         return self.frequencyFaders
+      elif parameter == "panning":
+         return self.panningFaders
 
 
    # creates the volume display relative to the number of audio samples
    def __createVolumeDisplay__(self, audioList):
-      volumeDisplay = Display("Volume", self.panelWidth, self.panelHeight)
-      volumeDisplay.setColor(self.panelBackground)
+      self.volumeDisplay = Display("Volume", self.panelWidth, self.panelHeight)
+      self.volumeDisplay.setColor(self.panelBackground)
       x1 = self.gap        # the coordinates for the first VFader; x1 and x2 will be
       y1 = self.gap        # incremented with the addition of more VFaders
       x2 = x1 + self.faderWidth
       y2 = y1 + self.faderHeight
       for i in range(len(self.audioList)):
-         fader = VFader(x1, y1, x2, y2, self.minVolume, self.maxVolume, self.minVolume, audioList[i].setVolume,
+         # function called when the fader is moved; the control-rate engine ramps the audio sample to the new value
+         def setVolume(value, audioIndex=i):
+            if not self.refreshingFaders:   # (not a refresh showing the target)
+               self.controlEngine.setTarget("volume", audioIndex, value)
+
+         fader = VFader(x1, y1, x2, y2, self.minVolume, self.maxVolume, self.minVolume, setVolume,
                        self.volumeOutline, self.faderBackground, self.volumeForeground)
          self.volumeFaders.append(fader)
-         volumeDisplay.add(fader)
+         self.volumeDisplay.add(fader)
          x1 += self.gap + self.faderWidth
          x2 += self.gap + self.faderWidth
 
@@ -225,20 +570,25 @@ class theGlaser:
       
    # creates the frequency display relative to the number of audio samples
    def __createFrequencyDisplay__(self, audioList):
-      frequencyDisplay = Display("Frequency", self.panelWidth, self.panelHeight)
-      frequencyDisplay.setColor(self.panelBackground)
+      self.frequencyDisplay = Display("Frequency", self.panelWidth, self.panelHeight)
+      self.frequencyDisplay.setColor(self.panelBackground)
       x1 = self.gap        # the coordinates for the first VFader; x1 and x2 will be
       y1 = self.gap        # incremented with the addition of more VFaders
       x2 = x1 + self.faderWidth
       y2 = y1 + self.faderHeight
       for i in range(len(self.audioList)):
-         minFrequency = audioList[i].getFrequency() /2
-         maxFrequency = audioList[i].getFrequency() *2
+         minFrequency = self.audioList[i].getFrequency() /2
+         maxFrequency = self.audioList[i].getFrequency() *2
          print i, "orig freq:", self.audioList[i].getFrequency()
-         fader = VFader(x1, y1, x2, y2, minFrequency, maxFrequency, minFrequency, audioList[i].setFrequency,
+         # function called when the fader is moved; the control-rate engine ramps the audio sample to the new value
+         def setFrequency(value, audioIndex=i):
+            if not self.refreshingFaders:   # (not a refresh showing the target)
+               self.controlEngine.setTarget("frequency", audioIndex, value)
+
+         fader = VFader(x1, y1, x2, y2, minFrequency, maxFrequency, minFrequency, setFrequency,
                                             self.frequencyOutline, self.faderBackground, self.frequencyForeground)
          self.frequencyFaders.append(fader)
-         frequencyDisplay.add(fader)
+         self.frequencyDisplay.add(fader)
          x1 += self.gap + self.faderWidth
          x2 += self.gap + self.faderWidth
 
@@ -256,17 +606,22 @@ class theGlaser:
    # since panning is thought of in a horizontal notion the faderWidth is used for the fader's height
    # and the faderHeight is used for the fader's width
    def __createPanningDisplay__(self, audioList):
-      panningDisplay = Display("Panning", self.panelHeight, self.panelWidth)
-      panningDisplay.setColor(self.panelBackground)
+      self.panningDisplay = Display("Panning", self.panelHeight, self.panelWidth)
+      self.panningDisplay.setColor(self.panelBackground)
       x1 = self.gap        # the coordinates for the first VFader; x1 and x2 will be
       y1 = self.gap        # incremented with the addition of more VFaders
       x2 = x1 + self.faderHeight
       y2 = y1 + self.faderWidth
       for i in range(len(self.audioList)):
+         # function called when the fader is moved; the control-rate engine ramps the audio sample to the new value
+         def setPanning(value, audioIndex=i):
+            if not self.refreshingFaders:   # (not a refresh showing the target)
+               self.controlEngine.setTarget("panning", audioIndex, value)
+
          fader = HFader(x1, y1, x2, y2, self.minPanning, self.maxPanning, (int)(self.maxPanning /2),
-                        audioList[i].setPanning, self.panningOutline, self.faderBackground, self.panningForeground)
+                        setPanning, self.panningOutline, self.faderBackground, self.panningForeground)
          self.panningFaders.append(fader)
-         panningDisplay.add(fader)
+         self.panningDisplay.add(fader)
          y1 += self.gap + self.faderWidth
          y2 += self.gap + self.faderWidth
 